@@ -11,6 +11,14 @@ load_dotenv(find_dotenv())
 
 stack_name_suffix = os.getenv("STACK_NAME_SUFFIX")
 tags = [kv.split(":", 1) for kv in os.environ.get("AWS_TAGS", "").split(",")]
+provisioned_concurrency_schedule = {
+    expression: int(capacity)
+    for expression, capacity in [
+        item.rsplit("=", 1)
+        for item in os.getenv("PROVISIONED_CONCURRENCY_SCHEDULE", "").split(";")
+        if item
+    ]
+}
 
 
 app = cdk.App()
@@ -25,6 +33,42 @@ BacklogGoogleChatStack(
     zone_name=os.getenv("ZONE_NAME"),
     log_level=os.getenv("LOG_LEVEL"),
     sentry_dsn=os.getenv("SENTRY_DSN"),
+    metrics_space_ids=[
+        space_id
+        for space_id in os.getenv("METRICS_SPACE_IDS", "").split(",")
+        if space_id
+    ],
+    tenant_ssm_prefix=os.getenv("TENANT_SSM_PREFIX"),
+    tenant_table_name=os.getenv("TENANT_TABLE_NAME"),
+    architecture=os.getenv("LAMBDA_ARCHITECTURE"),
+    memory_size=(
+        int(os.environ["LAMBDA_MEMORY_SIZE"])
+        if os.getenv("LAMBDA_MEMORY_SIZE")
+        else None
+    ),
+    provisioned_concurrency=(
+        int(os.environ["PROVISIONED_CONCURRENCY"])
+        if os.getenv("PROVISIONED_CONCURRENCY")
+        else None
+    ),
+    provisioned_concurrency_schedule=provisioned_concurrency_schedule,
+    snap_start=os.getenv("SNAP_START", "").lower() == "true",
+    frontend=os.getenv("API_FRONTEND"),
+    retry_queue=os.getenv("RETRY_QUEUE", "").lower() == "true",
+    circuit_breaker_table_name=os.getenv("CIRCUIT_BREAKER_TABLE_NAME"),
+    webhook_secret_ssm_prefix=os.getenv("WEBHOOK_SECRET_SSM_PREFIX"),
+    max_request_bytes=(
+        int(os.environ["MAX_REQUEST_BYTES"])
+        if os.getenv("MAX_REQUEST_BYTES")
+        else None
+    ),
+    event_rules=os.getenv("EVENT_RULES"),
+    digest_table_name=os.getenv("DIGEST_TABLE_NAME"),
+    digest_schedule=os.getenv("DIGEST_SCHEDULE"),
+    thread_updates=os.getenv("THREAD_UPDATES", "").lower() == "true",
+    edit_window=(
+        int(os.environ["EDIT_WINDOW"]) if os.getenv("EDIT_WINDOW") else None
+    ),
     env=cdk.Environment(
         account=app.account,
         region=app.region,
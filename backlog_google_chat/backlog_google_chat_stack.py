@@ -2,16 +2,34 @@ import typing
 
 from aws_cdk import (
     aws_apigateway as apigateway,
+    aws_apigatewayv2 as apigatewayv2,
+    aws_apigatewayv2_integrations as apigatewayv2_integrations,
+    aws_applicationautoscaling as appscaling,
     aws_certificatemanager as acm,
+    aws_cloudwatch as cloudwatch,
+    aws_events as events,
+    aws_iam as iam,
+    aws_kms as kms,
     aws_lambda as lambda_,
     aws_lambda_python as lambda_python,
     aws_logs as logs,
     aws_route53 as route53,
     aws_route53_targets as route53_targets,
+    aws_sqs as sqs,
     core as cdk,
 )
 
 DEFAULT_GOOGLE_CHAT_API = "https://chat.googleapis.com"
+METRICS_NAMESPACE = "BacklogGoogleChat"
+SERVICE_NAME = "backlog-google-chat"
+X86_64 = "x86_64"
+ARM_64 = "arm64"
+REST_API = "rest"
+HTTP_API = "http"
+FUNCTION_URL = "function_url"
+RETRY_FUNCTION_TIMEOUT_SECONDS = 30
+DIGEST_FUNCTION_TIMEOUT_SECONDS = 300
+DEFAULT_DIGEST_SCHEDULE = "rate(1 hour)"
 
 
 class BacklogGoogleChatStack(cdk.Stack):
@@ -27,6 +45,26 @@ class BacklogGoogleChatStack(cdk.Stack):
         zone_name: typing.Optional[str] = None,
         log_level: typing.Optional[str] = None,
         sentry_dsn: typing.Optional[str] = None,
+        metrics_space_ids: typing.Optional[typing.List[str]] = None,
+        tenant_ssm_prefix: typing.Optional[str] = None,
+        tenant_table_name: typing.Optional[str] = None,
+        architecture: typing.Optional[str] = None,
+        memory_size: typing.Optional[int] = None,
+        provisioned_concurrency: typing.Optional[int] = None,
+        provisioned_concurrency_schedule: typing.Optional[
+            typing.Dict[str, int]
+        ] = None,
+        snap_start: bool = False,
+        frontend: typing.Optional[str] = None,
+        retry_queue: bool = False,
+        circuit_breaker_table_name: typing.Optional[str] = None,
+        webhook_secret_ssm_prefix: typing.Optional[str] = None,
+        max_request_bytes: typing.Optional[int] = None,
+        event_rules: typing.Optional[str] = None,
+        digest_table_name: typing.Optional[str] = None,
+        digest_schedule: typing.Optional[str] = None,
+        thread_updates: bool = False,
+        edit_window: typing.Optional[int] = None,
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -34,6 +72,76 @@ class BacklogGoogleChatStack(cdk.Stack):
         log_level = log_level or "INFO"
         backlog_base_url = backlog_base_url or "https://backlog.com"
         google_chat_api = google_chat_api or DEFAULT_GOOGLE_CHAT_API
+        architecture = architecture or X86_64
+        if architecture not in [X86_64, ARM_64]:
+            raise ValueError(f"unsupported architecture `{architecture}`")
+        if snap_start and provisioned_concurrency:
+            raise ValueError(
+                "snap_start cannot be combined with provisioned_concurrency"
+            )
+        frontend = frontend or REST_API
+        if frontend not in [REST_API, HTTP_API, FUNCTION_URL]:
+            raise ValueError(f"unsupported frontend `{frontend}`")
+        if frontend == FUNCTION_URL and domain_name:
+            raise ValueError(
+                "custom domains are not supported with function_url"
+            )
+        if provisioned_concurrency_schedule and not provisioned_concurrency:
+            raise ValueError(
+                "provisioned_concurrency_schedule needs provisioned_concurrency"
+            )
+
+        environment = {
+            "BACKLOG_BASE_URL": backlog_base_url,
+            "GOOGLE_CHAT_API": google_chat_api,
+            "LOG_LEVEL": log_level,
+            "POWERTOOLS_METRICS_NAMESPACE": METRICS_NAMESPACE,
+            "POWERTOOLS_SERVICE_NAME": SERVICE_NAME,
+            "SENTRY_DSN": sentry_dsn or "",
+            "METRICS_SPACE_IDS": ",".join(metrics_space_ids or []),
+            "TENANT_SSM_PREFIX": tenant_ssm_prefix or "",
+            "TENANT_TABLE_NAME": tenant_table_name or "",
+            "API_FRONTEND": frontend,
+            "CIRCUIT_BREAKER_TABLE_NAME": circuit_breaker_table_name or "",
+            "WEBHOOK_SECRET_SSM_PREFIX": webhook_secret_ssm_prefix or "",
+        }
+        if max_request_bytes:
+            environment["MAX_REQUEST_BYTES"] = str(max_request_bytes)
+        if event_rules:
+            environment["EVENT_RULES"] = event_rules
+        digest_key = None
+        if digest_table_name:
+            environment["DIGEST_TABLE_NAME"] = digest_table_name
+            # encrypts the Chat credentials of the digested events
+            digest_key = kms.Key(self, "DigestKey", enable_key_rotation=True)
+            environment["DIGEST_KEY_ID"] = digest_key.key_arn
+        if thread_updates:
+            environment["THREAD_UPDATES"] = "true"
+        if edit_window:
+            environment["EDIT_WINDOW"] = str(edit_window)
+        queue = dead_letter_queue = None
+        if retry_queue:
+            # FIFO keeps the split messages of a space in order
+            dead_letter_queue = sqs.Queue(
+                self,
+                "RetryDeadLetterQueue",
+                fifo=True,
+                encryption=sqs.QueueEncryption.KMS_MANAGED,
+                retention_period=cdk.Duration.days(14),
+            )
+            queue = sqs.Queue(
+                self,
+                "RetryQueue",
+                fifo=True,
+                encryption=sqs.QueueEncryption.KMS_MANAGED,
+                visibility_timeout=cdk.Duration.seconds(
+                    6 * RETRY_FUNCTION_TIMEOUT_SECONDS
+                ),
+                dead_letter_queue=sqs.DeadLetterQueue(
+                    max_receive_count=5, queue=dead_letter_queue
+                ),
+            )
+            environment["RETRY_QUEUE_URL"] = queue.queue_url
 
         function = lambda_python.PythonFunction(
             self,
@@ -41,33 +149,166 @@ class BacklogGoogleChatStack(cdk.Stack):
             entry="src/messages",
             index="index.py",
             handler="lambda_handler",
-            runtime=lambda_.Runtime.PYTHON_3_9,
-            environment={
-                "BACKLOG_BASE_URL": backlog_base_url,
-                "GOOGLE_CHAT_API": google_chat_api,
-                "LOG_LEVEL": log_level,
-                "POWERTOOLS_SERVICE_NAME": "backlog-google-chat",
-                "SENTRY_DSN": sentry_dsn or "",
-            },
+            runtime=self._runtime(architecture, snap_start),
+            memory_size=memory_size,
+            environment=environment,
             log_retention=logs.RetentionDays.ONE_MONTH,
         )
+        if tenant_ssm_prefix:
+            function.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=["ssm:GetParameter"],
+                    resources=[
+                        self.format_arn(
+                            service="ssm",
+                            resource="parameter",
+                            resource_name=f"{tenant_ssm_prefix.strip('/')}/*",
+                        )
+                    ],
+                )
+            )
+        if webhook_secret_ssm_prefix:
+            function.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=["ssm:GetParametersByPath"],
+                    resources=[
+                        self.format_arn(
+                            service="ssm",
+                            resource="parameter",
+                            resource_name=webhook_secret_ssm_prefix.strip("/"),
+                        )
+                    ],
+                )
+            )
+        if tenant_table_name:
+            function.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=["dynamodb:GetItem"],
+                    resources=[
+                        self.format_arn(
+                            service="dynamodb",
+                            resource="table",
+                            resource_name=tenant_table_name,
+                        )
+                    ],
+                )
+            )
+
+        cfn_function = function.node.default_child
+        if architecture == ARM_64:
+            cfn_function.add_property_override("Architectures", [ARM_64])
+        if snap_start:
+            cfn_function.add_property_override(
+                "SnapStart", {"ApplyOn": "PublishedVersions"}
+            )
+
+        delivering_functions = [function]
+        if queue:
+            queue.grant_send_messages(function)
+            delivering_functions.append(
+                self._add_retry_function(
+                    queue, environment, architecture, memory_size
+                )
+            )
+        if digest_table_name and digest_key:
+            function.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=["dynamodb:PutItem"],
+                    resources=[self._table_arn(digest_table_name)],
+                )
+            )
+            digest_key.grant_encrypt(function)
+            delivering_functions.append(
+                self._add_digest_function(
+                    digest_table_name,
+                    digest_key,
+                    digest_schedule or DEFAULT_DIGEST_SCHEDULE,
+                    environment,
+                    architecture,
+                    memory_size,
+                )
+            )
+        if circuit_breaker_table_name:
+            for delivering_function in delivering_functions:
+                delivering_function.add_to_role_policy(
+                    iam.PolicyStatement(
+                        actions=["dynamodb:GetItem", "dynamodb:PutItem"],
+                        resources=[
+                            self.format_arn(
+                                service="dynamodb",
+                                resource="table",
+                                resource_name=circuit_breaker_table_name,
+                            )
+                        ],
+                    )
+                )
+
+        handler: lambda_.IFunction = function
+        if provisioned_concurrency or snap_start:
+            alias = lambda_.Alias(
+                self,
+                "LiveAlias",
+                alias_name="live",
+                version=function.current_version,
+                provisioned_concurrent_executions=provisioned_concurrency,
+            )
+            if provisioned_concurrency_schedule:
+                scaling = alias.add_auto_scaling(
+                    min_capacity=provisioned_concurrency,
+                    max_capacity=max(
+                        provisioned_concurrency,
+                        *provisioned_concurrency_schedule.values(),
+                    ),
+                )
+                for i, (expression, capacity) in enumerate(
+                    provisioned_concurrency_schedule.items()
+                ):
+                    scaling.scale_on_schedule(
+                        f"ProvisionedConcurrencySchedule{i}",
+                        schedule=appscaling.Schedule.expression(expression),
+                        min_capacity=capacity,
+                    )
+            handler = alias
+
+        self._add_monitoring(dead_letter_queue)
+
+        if frontend == REST_API:
+            self._add_rest_api(
+                handler, domain_name, certificate_arn, hosted_zone_id, zone_name
+            )
+        elif frontend == HTTP_API:
+            self._add_http_api(
+                handler, domain_name, certificate_arn, hosted_zone_id, zone_name
+            )
+        else:
+            self._add_function_url(function, handler)
 
+    def _add_rest_api(
+        self,
+        handler: lambda_.IFunction,
+        domain_name: typing.Optional[str],
+        certificate_arn: typing.Optional[str],
+        hosted_zone_id: typing.Optional[str],
+        zone_name: typing.Optional[str],
+    ) -> None:
         api = apigateway.RestApi(
             self,
             "RestApi",
         )
-        message_resource = (
-            api.root.add_resource("v1")
-            .add_resource("spaces")
-            .add_resource("{space_id}")
-            .add_resource("messages")
-        )
-        message_resource.add_method(
-            http_method="POST",
-            integration=apigateway.LambdaIntegration(
-                handler=function,
-            ),
+        v1_resource = api.root.add_resource("v1")
+        integration = apigateway.LambdaIntegration(
+            handler=handler,
         )
+        for spaces_resource in [
+            v1_resource,
+            v1_resource.add_resource("tenants").add_resource("{tenant_id}"),
+        ]:
+            spaces_resource.add_resource("spaces").add_resource(
+                "{space_id}"
+            ).add_resource("messages").add_method(
+                http_method="POST",
+                integration=integration,
+            )
 
         if domain_name and certificate_arn:
             domain_name_alias = api.add_domain_name(
@@ -103,3 +344,356 @@ class BacklogGoogleChatStack(cdk.Stack):
                         zone_name=zone_name,
                     ),
                 )
+
+    def _add_http_api(
+        self,
+        handler: lambda_.IFunction,
+        domain_name: typing.Optional[str],
+        certificate_arn: typing.Optional[str],
+        hosted_zone_id: typing.Optional[str],
+        zone_name: typing.Optional[str],
+    ) -> None:
+        api_domain_name = None
+        if domain_name and certificate_arn:
+            # HTTP APIs only have regional endpoints, so the certificate
+            # must be in the region of the stack
+            api_domain_name = apigatewayv2.DomainName(
+                self,
+                "DomainName",
+                domain_name=domain_name,
+                certificate=acm.Certificate.from_certificate_arn(
+                    self,
+                    "Certificate",
+                    certificate_arn=certificate_arn,
+                ),
+            )
+
+        api = apigatewayv2.HttpApi(
+            self,
+            "HttpApi",
+            default_domain_mapping=(
+                apigatewayv2.DomainMappingOptions(domain_name=api_domain_name)
+                if api_domain_name
+                else None
+            ),
+        )
+        integration = apigatewayv2_integrations.LambdaProxyIntegration(
+            handler=handler,
+        )
+        for path in [
+            "/v1/spaces/{space_id}/messages",
+            "/v1/tenants/{tenant_id}/spaces/{space_id}/messages",
+        ]:
+            api.add_routes(
+                path=path,
+                methods=[apigatewayv2.HttpMethod.POST],
+                integration=integration,
+            )
+        cdk.CfnOutput(self, "HttpApiUrl", value=api.url)
+
+        if api_domain_name:
+            cdk.CfnOutput(
+                self,
+                "DomainNameAliasDomainName",
+                value=api_domain_name.regional_domain_name,
+            )
+
+            if hosted_zone_id and zone_name:
+                route53.ARecord(
+                    self,
+                    "ARecord",
+                    record_name=domain_name,
+                    target=route53.RecordTarget.from_alias(
+                        route53_targets.ApiGatewayv2DomainProperties(
+                            api_domain_name.regional_domain_name,
+                            api_domain_name.regional_hosted_zone_id,
+                        )
+                    ),
+                    zone=route53.HostedZone.from_hosted_zone_attributes(
+                        self,
+                        "HostedZone",
+                        hosted_zone_id=hosted_zone_id,
+                        zone_name=zone_name,
+                    ),
+                )
+
+    def _add_function_url(
+        self, function: lambda_.Function, handler: lambda_.IFunction
+    ) -> None:
+        # CDK v1 has no construct for function URLs yet
+        properties: typing.Dict[str, typing.Any] = {
+            "AuthType": "NONE",
+            "TargetFunctionArn": function.function_arn,
+        }
+        if isinstance(handler, lambda_.Alias):
+            properties["Qualifier"] = handler.alias_name
+        function_url = cdk.CfnResource(
+            self,
+            "FunctionUrl",
+            type="AWS::Lambda::Url",
+            properties=properties,
+        )
+        # the qualifier names the alias without referencing it
+        function_url.node.add_dependency(handler)
+        permission = lambda_.CfnPermission(
+            self,
+            "FunctionUrlPermission",
+            action="lambda:InvokeFunctionUrl",
+            function_name=handler.function_arn,
+            principal="*",
+        )
+        permission.add_property_override("FunctionUrlAuthType", "NONE")
+        cdk.CfnOutput(
+            self,
+            "FunctionUrlOutput",
+            value=function_url.get_att("FunctionUrl").to_string(),
+        )
+
+    def _add_retry_function(
+        self,
+        queue: sqs.Queue,
+        environment: typing.Dict[str, str],
+        architecture: str,
+        memory_size: typing.Optional[int],
+    ) -> lambda_python.PythonFunction:
+        retry_function = lambda_python.PythonFunction(
+            self,
+            "RetryFunction",
+            entry="src/messages",
+            index="index.py",
+            handler="retry_handler",
+            runtime=self._runtime(architecture, False),
+            memory_size=memory_size,
+            timeout=cdk.Duration.seconds(RETRY_FUNCTION_TIMEOUT_SECONDS),
+            environment=environment,
+            log_retention=logs.RetentionDays.ONE_MONTH,
+        )
+        if architecture == ARM_64:
+            retry_function.node.default_child.add_property_override(
+                "Architectures", [ARM_64]
+            )
+        queue.grant_consume_messages(retry_function)
+        retry_function.add_event_source_mapping(
+            "RetryQueueEventSource",
+            event_source_arn=queue.queue_arn,
+            batch_size=10,
+            report_batch_item_failures=True,
+        )
+        return retry_function
+
+    def _add_digest_function(
+        self,
+        table_name: str,
+        key: kms.IKey,
+        schedule: str,
+        environment: typing.Dict[str, str],
+        architecture: str,
+        memory_size: typing.Optional[int],
+    ) -> lambda_python.PythonFunction:
+        digest_function = lambda_python.PythonFunction(
+            self,
+            "DigestFunction",
+            entry="src/messages",
+            index="index.py",
+            handler="digest_handler",
+            runtime=self._runtime(architecture, False),
+            memory_size=memory_size,
+            timeout=cdk.Duration.seconds(DIGEST_FUNCTION_TIMEOUT_SECONDS),
+            environment=environment,
+            log_retention=logs.RetentionDays.ONE_MONTH,
+        )
+        if architecture == ARM_64:
+            digest_function.node.default_child.add_property_override(
+                "Architectures", [ARM_64]
+            )
+        digest_function.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:Scan", "dynamodb:BatchWriteItem"],
+                resources=[self._table_arn(table_name)],
+            )
+        )
+        key.grant_decrypt(digest_function)
+        # aws-events-targets is not a dependency, so the target is
+        # declared on the CloudFormation rule
+        rule = events.CfnRule(
+            self,
+            "DigestSchedule",
+            schedule_expression=schedule,
+            targets=[
+                events.CfnRule.TargetProperty(
+                    arn=digest_function.function_arn, id="DigestFunction"
+                )
+            ],
+        )
+        digest_function.add_permission(
+            "DigestSchedulePermission",
+            principal=iam.ServicePrincipal("events.amazonaws.com"),
+            source_arn=rule.attr_arn,
+        )
+        return digest_function
+
+    def _table_arn(self, table_name: str) -> str:
+        return self.format_arn(
+            service="dynamodb", resource="table", resource_name=table_name
+        )
+
+    @staticmethod
+    def _runtime(architecture: str, snap_start: bool) -> lambda_.Runtime:
+        if architecture == X86_64 and not snap_start:
+            return lambda_.Runtime.PYTHON_3_9
+        # SnapStart needs Python 3.12 or later, and arm64 functions need
+        # their dependencies bundled on arm64
+        name = "python3.12" if snap_start else "python3.9"
+        return lambda_.Runtime(
+            name,
+            lambda_.RuntimeFamily.PYTHON,
+            bundling_docker_image=(
+                f"public.ecr.aws/sam/build-{name}:latest-{architecture}"
+            ),
+        )
+
+    def _add_monitoring(
+        self, dead_letter_queue: typing.Optional[sqs.Queue]
+    ) -> None:
+        def service_metric(
+            metric_name: str, statistic: str = "Sum"
+        ) -> cloudwatch.Metric:
+            return cloudwatch.Metric(
+                namespace=METRICS_NAMESPACE,
+                metric_name=metric_name,
+                dimensions_map={"service": SERVICE_NAME},
+                statistic=statistic,
+                period=cdk.Duration.minutes(5),
+            )
+
+        cloudwatch.Dashboard(
+            self,
+            "Dashboard",
+            widgets=[
+                [
+                    cloudwatch.GraphWidget(
+                        title="Events",
+                        left=[
+                            service_metric(f"Events{name}")
+                            for name in [
+                                "Unauthorized",
+                                "TooLarge",
+                                "Invalid",
+                                "Received",
+                                "Rejected",
+                                "Ignored",
+                                "Filtered",
+                                "Digested",
+                                "Edited",
+                                "Rendered",
+                                "Delivered",
+                                "ShortCircuited",
+                                "Spilled",
+                                "Retried",
+                                "Failed",
+                                "Truncated",
+                            ]
+                        ],
+                        width=12,
+                    ),
+                    cloudwatch.GraphWidget(
+                        title="Payload bytes",
+                        left=[
+                            service_metric("PayloadBytes", "Average"),
+                            service_metric("PayloadBytes", "Maximum"),
+                        ],
+                        right=[service_metric("CappedFields")],
+                        width=12,
+                    ),
+                ],
+                [
+                    cloudwatch.GraphWidget(
+                        title="Stage latency (p95)",
+                        left=[
+                            service_metric(f"{name}Latency", "p95")
+                            for name in [
+                                "Parse",
+                                "Render",
+                                "Serialize",
+                                "Http",
+                            ]
+                        ],
+                        width=12,
+                    ),
+                    cloudwatch.GraphWidget(
+                        title="HTTP breakdown (p95)",
+                        left=[
+                            service_metric(metric_name, "p95")
+                            for metric_name in [
+                                "HttpConnectLatency",
+                                "HttpTlsLatency",
+                                "HttpTimeToFirstByte",
+                            ]
+                        ],
+                        right=[service_metric("TimeoutBudgetUsed", "p95")],
+                        width=12,
+                    ),
+                ],
+                [
+                    cloudwatch.GraphWidget(
+                        title="Render cache",
+                        left=[
+                            service_metric("RenderCacheHits"),
+                            service_metric("RenderCacheMisses"),
+                        ],
+                        right=[
+                            cloudwatch.MathExpression(
+                                expression="100 * hits / (hits + misses)",
+                                using_metrics={
+                                    "hits": service_metric("RenderCacheHits"),
+                                    "misses": service_metric(
+                                        "RenderCacheMisses"
+                                    ),
+                                },
+                                label="Hit rate (%)",
+                                period=cdk.Duration.minutes(5),
+                            )
+                        ],
+                        width=12,
+                    ),
+                ],
+            ],
+        )
+
+        cloudwatch.Alarm(
+            self,
+            "FailedEventsAlarm",
+            metric=service_metric("EventsFailed"),
+            threshold=1,
+            evaluation_periods=1,
+            comparison_operator=(
+                cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD
+            ),
+            treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+            alarm_description="Messages could not be delivered to Google Chat",
+        )
+        cloudwatch.Alarm(
+            self,
+            "HttpLatencyAlarm",
+            metric=service_metric("HttpLatency", "p95"),
+            threshold=3000,
+            evaluation_periods=3,
+            comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+            treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+            alarm_description="Google Chat API p95 latency is above 3 seconds",
+        )
+        if dead_letter_queue:
+            cloudwatch.Alarm(
+                self,
+                "RetryDeadLetterQueueAlarm",
+                metric=(
+                    dead_letter_queue.metric_approximate_number_of_messages_visible()  # noqa
+                ),
+                threshold=1,
+                evaluation_periods=1,
+                comparison_operator=(
+                    cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD
+                ),
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+                alarm_description="Spilled messages could not be retried",
+            )
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Parse a batch of generated webhook events.
+
+Also times the date fields alone, with the previous split-and-int parser
+and with the cached parser used by the models, and the ``created``
+timestamps alone, with strptime, with the parser used by the models and
+with the same parser behind a cache.
+
+    $ python benchmarks/bench_dates.py --count 10000
+"""
+
+import argparse
+import functools
+import sys
+import time
+import typing
+from datetime import date, datetime
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[1]
+sys.path.append(str(root_dir / "src" / "messages"))
+sys.path.append(str(root_dir / "tools"))
+
+import models  # noqa: E402
+from event_generator import EventGenerator  # noqa: E402
+
+
+def _date_values(raw: typing.Any) -> typing.Iterator[str]:
+    if isinstance(raw, dict):
+        for key, value in raw.items():
+            if key in ["startDate", "dueDate", "releaseDueDate"]:
+                if isinstance(value, str) and models._maybe_null(value):
+                    yield value
+            else:
+                yield from _date_values(value)
+    elif isinstance(raw, list):
+        for value in raw:
+            yield from _date_values(value)
+
+
+def _best(repeat: int, func: typing.Callable[[], typing.Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    raws = list(EventGenerator(seed=args.seed).stream(args.count))
+    dates = [value for raw in raws for value in _date_values(raw)]
+
+    split_dates = _best(
+        args.repeat,
+        lambda: [date(*map(int, value.split("-"))) for value in dates],
+    )
+    cached_dates = _best(
+        args.repeat, lambda: [models._parse_date(value) for value in dates]
+    )
+    created = [raw["created"] for raw in raws]
+    strptime_created = _best(
+        args.repeat,
+        lambda: [
+            datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z") for value in created
+        ],
+    )
+    parsed_created = _best(
+        args.repeat, lambda: [models._parse_timestamp(v) for v in created]
+    )
+    cached_timestamp = functools.lru_cache(maxsize=1024)(
+        models._parse_timestamp
+    )
+    cached_created = _best(
+        args.repeat, lambda: [cached_timestamp(v) for v in created]
+    )
+    one_by_one = _best(
+        args.repeat, lambda: [models.WebhookEvent.from_raw(r) for r in raws]
+    )
+
+    print(f"events:                 {len(raws)}")
+    print(f"date fields:            {len(dates)} ({len(set(dates))} distinct)")
+    print(f"dates, split and int:   {split_dates:.2f} ms")
+    print(f"dates, cached parser:   {cached_dates:.2f} ms")
+    print(
+        f"created fields:         {len(created)} ({len(set(created))} distinct)"
+    )
+    print(f"created, strptime:      {strptime_created:.2f} ms")
+    print(f"created, fromisoformat: {parsed_created:.2f} ms")
+    print(f"created, cached:        {cached_created:.2f} ms")
+    print(f"from_raw per event:     {one_by_one:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Compare the in-function latency of the REST API, HTTP API and function
+URL front-ends with the local load test harness.
+
+Each front-end runs in fresh worker processes, so that index picks the
+matching powertools resolver. Only the work done inside the function is
+measured; the latency saved by API Gateway itself shows up in deployed
+stacks only.
+
+    $ python benchmarks/bench_frontends.py --count 2000
+"""
+
+import argparse
+import sys
+import typing
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "tools"))
+
+import load_test  # noqa: E402
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    events = list(load_test.EventGenerator(seed=args.seed).stream(args.count))
+
+    print(f"{'front-end':<16}{'p50':>9}{'p95':>9}{'p99':>9}{'events/s':>10}")
+    with load_test.StubChatServer() as stub:
+        for frontend, event_wrapper in load_test.EVENT_WRAPPERS.items():
+            report = load_test.run(
+                events,
+                workers=args.workers,
+                environ={
+                    "BACKLOG_BASE_URL": "https://example.backlog.com",
+                    "GOOGLE_CHAT_API": stub.url,
+                    "LOG_LEVEL": "WARNING",
+                    "POWERTOOLS_TRACE_DISABLED": "true",
+                    "API_FRONTEND": frontend,
+                },
+                event_wrapper=event_wrapper,
+                quiet=True,
+            )
+            total = report["total"]
+            print(
+                f"{frontend:<16}{total['p50_ms']:>9.2f}{total['p95_ms']:>9.2f}"
+                f"{total['p99_ms']:>9.2f}{report['throughput_rps']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
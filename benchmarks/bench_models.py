@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Parse a BulkUpdateIssueContent with many id-valued changes.
+
+Reports parse time, the memory held by the parsed content, and how many
+Status / Priority / Resolution instances the parse had to create.
+
+    $ python benchmarks/bench_models.py --changes 10000
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+import typing
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "messages"))
+
+import models  # noqa: E402
+
+
+def bulk_update_payload(changes: int) -> typing.Dict[str, typing.Any]:
+    fields = [
+        ("status", ["1", "2", "3", "4"]),
+        ("priority", ["2", "3", "4"]),
+        ("resolution", ["0", "1", "2", "3", "4"]),
+    ]
+    raw_changes = []
+    for i in range(changes):
+        field_name, values = fields[i % len(fields)]
+        raw_changes.append(
+            {
+                "field": field_name,
+                "type": "standard",
+                "old_value": values[i % len(values)],
+                "new_value": values[(i + 1) % len(values)],
+            }
+        )
+    return {
+        "tx_id": "1",
+        "link": [{"id": "1", "key_id": "1", "title": "issue"}],
+        "changes": raw_changes,
+    }
+
+
+def id_model_instances(raw: typing.Dict[str, typing.Any]) -> int:
+    """Count Status / Priority / Resolution instances created by a parse."""
+    created = 0
+    originals = {}
+
+    def counting(original: typing.Callable) -> typing.Callable:
+        def __init__(self, *args, **kwargs) -> None:
+            nonlocal created
+            created += 1
+            original(self, *args, **kwargs)
+
+        return __init__
+
+    for model in [models.Status, models.Priority, models.Resolution]:
+        originals[model] = model.__init__
+        model.__init__ = counting(model.__init__)
+    try:
+        models.BulkUpdateIssueContent.from_raw(raw)
+    finally:
+        for model, original in originals.items():
+            model.__init__ = original
+    return created
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--changes", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    raw = bulk_update_payload(args.changes)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        models.BulkUpdateIssueContent.from_raw(raw)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    content = models.BulkUpdateIssueContent.from_raw(raw)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"changes:                {len(content.changes)}")
+    print(f"best parse time:        {min(timings) * 1000:.2f} ms")
+    print(f"retained after parse:   {current / 1024:.1f} KiB")
+    print(f"peak while parse:       {peak / 1024:.1f} KiB")
+    print(f"id model instances:     {id_model_instances(raw)}")
+
+
+if __name__ == "__main__":
+    main()
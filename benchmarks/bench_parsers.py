@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Parse generated webhook events, grouped by event type.
+
+Reports the best time per event of WebhookEvent.from_raw for each type
+and the throughput over the whole mix.
+
+    $ python benchmarks/bench_parsers.py --count 2000 --repeat 20
+"""
+
+import argparse
+import collections
+import sys
+import time
+import typing
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[1]
+sys.path.append(str(root_dir / "src" / "messages"))
+sys.path.append(str(root_dir / "tools"))
+
+import models  # noqa: E402
+from event_generator import SUPPORTED_EVENT_TYPES, EventGenerator  # noqa: E402
+
+
+def _best(repeat: int, func: typing.Callable[[], typing.Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    generator = EventGenerator(seed=args.seed)
+    by_type: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]] = (
+        collections.defaultdict(list)
+    )
+    for event_type in SUPPORTED_EVENT_TYPES:
+        for _ in range(args.count // len(SUPPORTED_EVENT_TYPES)):
+            by_type[event_type.name].append(generator.generate(event_type))
+    mix = list(generator.stream(args.count))
+
+    from_raw = models.WebhookEvent.from_raw
+    for name, raws in by_type.items():
+        seconds = _best(args.repeat, lambda: [from_raw(raw) for raw in raws])
+        print(f"{name.lower() + ':':<24}{seconds / len(raws) * 1e6:8.2f} us")
+    seconds = _best(args.repeat, lambda: [from_raw(raw) for raw in mix])
+    print(f"{'mix:':<24}{len(mix) / seconds:8.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
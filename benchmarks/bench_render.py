@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Parse, render and encode every case of the event corpus.
+
+Checks the messages against the corpus first, then reports the time
+taken by each case and the throughput over the whole corpus.
+
+    $ python benchmarks/bench_render.py --repeat 200
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import typing
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src" / "messages"))
+sys.path.append(str(ROOT_DIR / "tools"))
+os.environ.setdefault("GOOGLE_CHAT_API", "https://chat.googleapis.com")
+os.environ.setdefault("POWERTOOLS_TRACE_DISABLED", "true")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import event_corpus  # noqa: E402
+import index  # noqa: E402
+
+BASE_URL = "https://backlog.com"
+
+
+def render(case: event_corpus.Case) -> typing.Tuple[bytes, ...]:
+    return tuple(index.render(case.event, BASE_URL))
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    cases = event_corpus.cases()
+    for case in cases:
+        assert [
+            json.loads(data) for data in render(case)
+        ] == case.messages, case.name
+
+    best: typing.Dict[str, float] = {}
+    # the metrics recorded by render are flushed to stdout once full
+    with contextlib.redirect_stdout(io.StringIO()):
+        for case in cases:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                render(case)
+                timings.append(time.perf_counter() - start)
+            best[case.name] = min(timings)
+
+    for name, seconds in best.items():
+        print(f"{name + ':':<36}{seconds * 1_000_000:8.1f} us")
+    print(f"{'corpus:':<36}{len(best) / sum(best.values()):8.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Filter generated events through a large rule set.
+
+Compares interpreting the rule dicts for every event with the compiled
+RuleSet, and both with the full model parse that filtered events skip.
+
+    $ python benchmarks/bench_rules.py --rules 1000 --count 2000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+import typing
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src" / "messages"))
+sys.path.append(str(ROOT_DIR / "tools"))
+
+import models  # noqa: E402
+import rules  # noqa: E402
+from event_generator import EventGenerator  # noqa: E402
+from events import EventType  # noqa: E402
+from exceptions import UnsupportedEventType  # noqa: E402
+
+SPACE_ID = "AAAA"
+
+
+def generate_rules(
+    count: int, seed: int
+) -> typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]]:
+    generator = random.Random(seed)
+    space_rules = []
+    for i in range(count):
+        rule: typing.Dict[str, typing.Any] = {
+            "event_types": generator.sample([t.name for t in EventType], 2),
+            "project_keys": [f"P{i}"],
+        }
+        condition = generator.choice(
+            ["issue_types", "assignees", "changed_fields", "summary"]
+        )
+        rule[condition] = {
+            "issue_types": ["バグ"],
+            "assignees": [f"user{i}"],
+            "changed_fields": ["status"],
+            "summary": f"^\\[{i}\\]",
+        }[condition]
+        space_rules.append(rule)
+    return {SPACE_ID: space_rules}
+
+
+def interpret(
+    raw_rules: typing.List[typing.Dict[str, typing.Any]],
+    event: typing.Dict[str, typing.Any],
+) -> bool:
+    """Evaluate the rule dicts as they are, without compiling them."""
+    content = event.get("content") or {}
+    for rule in raw_rules:
+        if "event_types" in rule and event["type"] not in [
+            EventType[name].value for name in rule["event_types"]
+        ]:
+            continue
+        if (
+            "project_keys" in rule
+            and event["project"]["projectKey"] not in rule["project_keys"]
+        ):
+            continue
+        if "issue_types" in rule and (
+            (content.get("issueType") or {}).get("name")
+            not in rule["issue_types"]
+        ):
+            continue
+        if "assignees" in rule and (
+            (content.get("assignee") or {}).get("name") not in rule["assignees"]
+        ):
+            continue
+        if "changed_fields" in rule and not any(
+            change["field"] in rule["changed_fields"]
+            for change in content.get("changes") or []
+        ):
+            continue
+        if "summary" in rule and not re.search(
+            rule["summary"], content.get("summary") or ""
+        ):
+            continue
+        return rule.get("action", rules.DROP) == rules.DELIVER
+    return True
+
+
+def parse(event: typing.Dict[str, typing.Any]) -> None:
+    try:
+        models.WebhookEvent.from_raw(event)
+    except UnsupportedEventType:
+        pass
+    models.field_caps.drain()
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=1000)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    raw_rules = generate_rules(args.rules, args.seed)
+    # every event matches the last rule with its event type
+    raw_rules[SPACE_ID].append({"project_keys": ["TEST"]})
+    events = list(EventGenerator(seed=args.seed).stream(args.count))
+
+    start = time.perf_counter()
+    rules.compile_rules(raw_rules)
+    compile_ms = (time.perf_counter() - start) * 1000
+    rule_set = rules.compile_rules(raw_rules)
+    assert [interpret(raw_rules[SPACE_ID], event) for event in events] == [
+        rule_set.allows(SPACE_ID, event) for event in events
+    ]
+
+    print(f"{'compile ' + str(args.rules) + ' rules:':<24}{compile_ms:.2f} ms")
+    for name, func in [
+        ("interpret rule dicts", lambda e: interpret(raw_rules[SPACE_ID], e)),
+        ("compiled RuleSet", lambda e: rule_set.allows(SPACE_ID, e)),
+        ("full model parse", parse),
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for event in events:
+                func(event)
+            timings.append(time.perf_counter() - start)
+        per_event = min(timings) / len(events) * 1_000_000
+        print(f"{name + ':':<24}{per_event:.2f} us/event")
+
+
+if __name__ == "__main__":
+    main()
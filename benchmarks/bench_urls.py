@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Build the issue links of a large bulk update.
+
+Compares formatting every URL from the base URL, as the handlers used to,
+with the prefixes of a cached BacklogUrls.
+
+    $ python benchmarks/bench_urls.py --links 10000
+"""
+
+import argparse
+import sys
+import time
+import typing
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "messages"))
+
+import backlog_urls  # noqa: E402
+
+BASE_URL = "https://example.backlog.jp/"
+PROJECT_KEY = "TEST"
+
+
+def format_each(key_ids: typing.List[int]) -> typing.List[str]:
+    links = []
+    for key_id in key_ids:
+        base_url = BASE_URL
+        if base_url.endswith("/"):
+            base_url = base_url[:-1]
+        links.append(f"{base_url}/view/{PROJECT_KEY}-{key_id}")
+    return links
+
+
+def cached_builder(key_ids: typing.List[int]) -> typing.List[str]:
+    return backlog_urls.for_project(BASE_URL, PROJECT_KEY).issues(key_ids)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    key_ids = list(range(1, args.links + 1))
+    assert format_each(key_ids) == cached_builder(key_ids)
+
+    for name, func in [
+        ("format each link", format_each),
+        ("cached BacklogUrls", cached_builder),
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            func(key_ids)
+            timings.append(time.perf_counter() - start)
+        print(f"{name + ':':<24}{min(timings) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Fuzz parsing and rendering with near-valid webhook payloads.
+
+Draws events of every supported type with one field removed or replaced
+by a value of another type, parses and renders each of them, and counts
+how they ended. Any exception other than InvalidPayload and
+UnsupportedEventType is a crash: the payload is printed and the script
+exits with 1. Also reports the parse throughput of the valid and the
+near-valid payloads.
+
+    $ python benchmarks/fuzz_models.py --examples 2000 --seed 1
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import typing
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src" / "messages"))
+sys.path.append(str(ROOT_DIR / "tools"))
+os.environ.setdefault("GOOGLE_CHAT_API", "https://chat.googleapis.com")
+os.environ.setdefault("POWERTOOLS_TRACE_DISABLED", "true")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import event_strategies  # noqa: E402
+import index  # noqa: E402
+import models  # noqa: E402
+from exceptions import InvalidPayload, UnsupportedEventType  # noqa: E402
+from hypothesis import (  # noqa: E402
+    Phase,
+    given,
+    seed,
+    settings,
+    strategies as st,
+)
+
+BASE_URL = "https://backlog.com"
+
+
+def draw(
+    strategy: st.SearchStrategy, examples: int, random_seed: int
+) -> typing.List[typing.Any]:
+    drawn: typing.List[typing.Any] = []
+
+    @seed(random_seed)
+    @settings(
+        max_examples=examples,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate],
+    )
+    @given(strategy)
+    def collect(value: typing.Any) -> None:
+        drawn.append(value)
+
+    collect()
+    return drawn
+
+
+def outcome(raw: typing.Dict[str, typing.Any]) -> str:
+    try:
+        tuple(index.render(raw, BASE_URL))
+    except InvalidPayload:
+        return "invalid"
+    except UnsupportedEventType:
+        return "unsupported"
+    except Exception:
+        return "crashed"
+    return "rendered"
+
+
+def parse_rate(raws: typing.Sequence[typing.Dict[str, typing.Any]]) -> float:
+    start = time.perf_counter()
+    for raw in raws:
+        try:
+            models.WebhookEvent.from_raw(raw)
+        except (InvalidPayload, UnsupportedEventType):
+            pass
+    return len(raws) / (time.perf_counter() - start)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--examples", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    valid = draw(event_strategies.events(), args.examples, args.seed)
+    near_valid = draw(
+        event_strategies.near_valid_events(), args.examples, args.seed
+    )
+
+    outcomes: typing.Counter[str] = collections.Counter()
+    crashes = []
+    # the metrics recorded by render are flushed to stdout once full
+    with contextlib.redirect_stdout(io.StringIO()):
+        for raw in near_valid:
+            result = outcome(raw)
+            outcomes[result] += 1
+            if result == "crashed":
+                crashes.append(raw)
+
+    for result in ["rendered", "invalid", "unsupported", "crashed"]:
+        print(f"{result + ':':<14}{outcomes[result]:8d}")
+    print(f"{'valid:':<14}{parse_rate(valid):8.0f} parses/s")
+    print(f"{'near-valid:':<14}{parse_rate(near_valid):8.0f} parses/s")
+
+    for raw in crashes:
+        print(json.dumps(raw, ensure_ascii=False), file=sys.stderr)
+    if crashes:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
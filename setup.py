@@ -16,12 +16,20 @@ setuptools.setup(
     install_requires=[
         "aws-cdk.assertions==1.122.0",
         "aws-cdk.aws-apigateway==1.122.0",
+        "aws-cdk.aws-apigatewayv2==1.122.0",
+        "aws-cdk.aws-apigatewayv2-integrations==1.122.0",
+        "aws-cdk.aws-applicationautoscaling==1.122.0",
         "aws-cdk.aws-certificatemanager==1.122.0",
+        "aws-cdk.aws-cloudwatch==1.122.0",
+        "aws-cdk.aws-events==1.122.0",
+        "aws-cdk.aws-iam==1.122.0",
+        "aws-cdk.aws-kms==1.122.0",
         "aws-cdk.aws-lambda==1.122.0",
         "aws-cdk.aws-lambda-python==1.122.0",
         "aws-cdk.aws-logs==1.122.0",
         "aws-cdk.aws-route53==1.122.0",
         "aws-cdk.aws-route53-targets==1.122.0",
+        "aws-cdk.aws-sqs==1.122.0",
         "aws-cdk.core==1.122.0",
         "python-dotenv",
     ],
@@ -0,0 +1,117 @@
+import hmac
+import os
+import time
+import typing
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+SECRET_HEADER = "X-Webhook-Secret"
+SECRET_QUERY = "secret"
+
+
+class SsmSecretStore:
+    """Per space secrets stored in the SSM parameters
+    ``{prefix}/{space_id}``.
+
+    A parameter can hold several comma separated secrets, so that a new
+    secret can be added before the old one is removed.
+    """
+
+    def __init__(self, prefix: str, client: typing.Any = None) -> None:
+        self.prefix = prefix.rstrip("/")
+        self.client = client or boto3.client("ssm")
+
+    def load_all(self) -> typing.Dict[str, typing.List[str]]:
+        secrets = {}
+        paginator = self.client.get_paginator("get_parameters_by_path")
+        for page in paginator.paginate(Path=self.prefix, WithDecryption=True):
+            for parameter in page["Parameters"]:
+                space_id = parameter["Name"][len(self.prefix) + 1 :]
+                secrets[space_id] = [
+                    secret.strip()
+                    for secret in parameter["Value"].split(",")
+                    if secret.strip()
+                ]
+        return secrets
+
+
+class SecretCache:
+    """All secrets, loaded at once and kept in process for ``ttl`` seconds.
+
+    Loading every secret at once keeps lookups for unknown spaces off the
+    store. When the store fails, the last loaded secrets are served.
+    """
+
+    def __init__(
+        self,
+        store: typing.Any,
+        ttl: float = 300.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.store = store
+        self.ttl = ttl
+        self.clock = clock
+        self._expires = 0.0
+        self._secrets: typing.Optional[
+            typing.Dict[str, typing.Tuple[bytes, ...]]
+        ] = None
+
+    def get(self, space_id: str) -> typing.Tuple[bytes, ...]:
+        now = self.clock()
+        if self._expires <= now:
+            try:
+                raw = self.store.load_all()
+            except (BotoCoreError, ClientError):
+                if self._secrets is None:
+                    raise
+            else:
+                self._secrets = {
+                    key: tuple(secret.encode("utf-8") for secret in values)
+                    for key, values in raw.items()
+                }
+                self._expires = now + self.ttl
+        return (self._secrets or {}).get(space_id, ())
+
+
+class WebhookAuthenticator:
+    """Checks the shared secret of a space before the body is read.
+
+    Without secrets every request is accepted.
+    """
+
+    def __init__(self, secrets: typing.Optional[SecretCache] = None) -> None:
+        self.secrets = secrets
+
+    @property
+    def enabled(self) -> bool:
+        return self.secrets is not None
+
+    def verify(self, space_id: str, provided: typing.Optional[str]) -> bool:
+        if self.secrets is None:
+            return True
+        if not provided:
+            return False
+        expected = self.secrets.get(space_id)
+        provided_bytes = provided.encode("utf-8")
+        # compare with every secret so that the time does not tell which
+        # one, or how many, matched
+        matches = [hmac.compare_digest(provided_bytes, s) for s in expected]
+        return any(matches)
+
+
+def from_environ(
+    environ: typing.Mapping[str, str] = os.environ,
+) -> WebhookAuthenticator:
+    """Build the authenticator of the function.
+
+    Secrets are read from ``WEBHOOK_SECRET_SSM_PREFIX`` when set.
+    """
+    if not environ.get("WEBHOOK_SECRET_SSM_PREFIX"):
+        return WebhookAuthenticator()
+    return WebhookAuthenticator(
+        SecretCache(
+            SsmSecretStore(environ["WEBHOOK_SECRET_SSM_PREFIX"]),
+            ttl=float(environ.get("WEBHOOK_SECRET_CACHE_TTL", "300")),
+        )
+    )
@@ -0,0 +1,61 @@
+import functools
+import typing
+
+
+class BacklogUrls:
+    """Links into one Backlog project, with the URL prefixes built once."""
+
+    def __init__(self, base_url: str, project_key: str) -> None:
+        if base_url.endswith("/"):
+            base_url = base_url[:-1]
+        self.base_url = base_url
+        self.project_key = project_key
+        self.project = f"{base_url}/projects/{project_key}"
+        self._issue = f"{base_url}/view/{project_key}-"
+        self._shared_file = (
+            f"{base_url}/ViewSharedFile.action"
+            f"?projectKey={project_key}&sharedFileId="
+        )
+        self._wiki = f"{base_url}/alias/wiki/"
+        self._wiki_diff = f"{base_url}/alias/wiki/diff/"
+        self._subversion_commit = f"{base_url}/rev/{project_key}/"
+        self._git = f"{base_url}/git/{project_key}/"
+
+    def issue(self, key_id: typing.Any) -> str:
+        return f"{self._issue}{key_id}"
+
+    def issues(self, key_ids: typing.Iterable[typing.Any]) -> typing.List[str]:
+        prefix = self._issue
+        return [f"{prefix}{key_id}" for key_id in key_ids]
+
+    def issue_comment(self, key_id: typing.Any, comment_id: typing.Any) -> str:
+        return f"{self._issue}{key_id}#comment-{comment_id}"
+
+    def shared_file(self, shared_file_id: typing.Any) -> str:
+        return f"{self._shared_file}{shared_file_id}"
+
+    def wiki(self, wiki_id: typing.Any) -> str:
+        return f"{self._wiki}{wiki_id}"
+
+    def wiki_diff(self, wiki_id: typing.Any, version: int) -> str:
+        return f"{self._wiki_diff}{wiki_id}/{version - 1}...{version}"
+
+    def subversion_commit(self, rev: typing.Any) -> str:
+        return f"{self._subversion_commit}{rev}"
+
+    def git_repository(self, repository: str) -> str:
+        return f"{self._git}{repository}"
+
+    def git_branch(self, repository: str, ref: str) -> str:
+        return f"{self._git}{repository}/tree/{ref.split('/')[-1]}"
+
+    def git_commit(self, repository: str, rev: str) -> str:
+        return f"{self._git}{repository}/commit/{rev}"
+
+    def pull_request(self, repository: str, number: int) -> str:
+        return f"{self._git}{repository}/pullRequests/{number}"
+
+
+@functools.lru_cache(maxsize=128)
+def for_project(base_url: str, project_key: str) -> BacklogUrls:
+    return BacklogUrls(base_url, project_key)
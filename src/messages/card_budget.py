@@ -0,0 +1,157 @@
+import heapq
+import json
+import typing
+
+import gchat_utils
+
+# Google Chat rejects messages larger than 32,000 bytes
+MAX_MESSAGE_BYTES = 32_000
+TRUNCATED_MARKER = "… (truncated)"
+OPEN_LINK_TEXT = "Backlog で開く"
+MIN_KEPT_BYTES = 256
+
+
+def encode(message: typing.Any) -> bytes:
+    return json.dumps(
+        message, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encoded_size(value: typing.Any) -> int:
+    return len(encode(value))
+
+
+class _TextSlot:
+    def __init__(
+        self,
+        owner: typing.Dict[str, typing.Any],
+        key: str,
+        widgets: typing.List[typing.Dict[str, typing.Any]],
+        index: int,
+        order: int,
+    ) -> None:
+        self.owner = owner
+        self.key = key
+        self.widgets = widgets
+        self.index = index
+        self.order = order
+        self.size = encoded_size(owner[key])
+
+    def __lt__(self, other: "_TextSlot") -> bool:
+        # reversed so that heapq pops the largest slot first
+        return self.size > other.size
+
+
+def _walk(message: typing.Dict[str, typing.Any]) -> typing.List[_TextSlot]:
+    slots: typing.List[_TextSlot] = []
+    for card in message.get("cards", []):
+        for section in card.get("sections", []):
+            widgets = section.get("widgets", [])
+            for index, widget in enumerate(widgets):
+                if "textParagraph" in widget:
+                    owner, key = widget["textParagraph"], "text"
+                elif "keyValue" in widget:
+                    owner, key = widget["keyValue"], "content"
+                else:
+                    continue
+                slots.append(_TextSlot(owner, key, widgets, index, len(slots)))
+    return slots
+
+
+def _truncate(text: str, max_bytes: int) -> str:
+    """Cut text so that its JSON encoded form, marker included, fits."""
+    marker_size = encoded_size(TRUNCATED_MARKER) - 2
+    budget = max(max_bytes - marker_size, 2)
+    while True:
+        data = text.encode("utf-8")[: max(budget - 2, 0)]
+        truncated = data.decode("utf-8", errors="ignore") + TRUNCATED_MARKER
+        size = encoded_size(truncated)
+        if size <= max_bytes or not data:
+            return truncated
+        # escaped characters take more room than their UTF-8 form
+        budget -= size - max_bytes
+
+
+def fit(
+    message: typing.Dict[str, typing.Any],
+    max_bytes: int = MAX_MESSAGE_BYTES,
+    link: typing.Optional[str] = None,
+) -> typing.Tuple[bytes, bool]:
+    """Encode a message, trimming its largest text widgets if it is too big.
+
+    Returns the encoded message and whether anything was truncated. Each
+    trimmed widget gets a marker and, given the ``link`` of the event, a
+    button opening it, so the full text stays reachable in Backlog.
+    """
+    data = encode(message)
+    if len(data) <= max_bytes:
+        return data, False
+
+    slots = _walk(message)
+    button = gchat_utils.text_button_link(text=OPEN_LINK_TEXT, url=link or "")
+    paragraph_button_size = encoded_size({"buttons": [button]}) + 1
+    key_value_button_size = encoded_size(button) + len('"button":,')
+
+    excess = len(data) - max_bytes
+    heapq.heapify(slots)
+    truncated: typing.List[_TextSlot] = []
+    while excess > 0 and slots:
+        slot = heapq.heappop(slots)
+        if slot.size <= MIN_KEPT_BYTES:
+            break
+        if link:
+            if slot.key == "text":
+                excess += paragraph_button_size
+            elif "button" not in slot.owner:
+                excess += key_value_button_size
+        target = max(slot.size - excess, MIN_KEPT_BYTES)
+        slot.owner[slot.key] = _truncate(slot.owner[slot.key], target)
+        excess -= slot.size - encoded_size(slot.owner[slot.key])
+        truncated.append(slot)
+
+    if link:
+        for slot in truncated:
+            if slot.key == "content":
+                slot.owner.setdefault("button", button)
+        # insert paragraph buttons back to front to keep indexes valid
+        paragraphs = sorted(
+            [slot for slot in truncated if slot.key == "text"],
+            key=lambda slot: slot.order,
+            reverse=True,
+        )
+        for slot in paragraphs:
+            slot.widgets.insert(slot.index + 1, {"buttons": [button]})
+
+    return encode(message), bool(truncated)
+
+
+def paginate(
+    widgets: typing.Iterable[typing.Dict[str, typing.Any]],
+    build: typing.Callable[
+        [typing.List[typing.Dict[str, typing.Any]], int],
+        typing.Dict[str, typing.Any],
+    ],
+    max_bytes: int = MAX_MESSAGE_BYTES,
+) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+    """Pack a stream of widgets into messages of at most max_bytes each.
+
+    ``build(widgets, page)`` returns the message for a page. It is called
+    once with no widgets to size the page frame, and once with the widgets
+    that fit. Widgets are consumed lazily and each message is yielded as
+    soon as it is full, so only the widgets of one page are built at a
+    time; whether the pages are kept is up to the caller.
+    """
+    page = 0
+    page_widgets: typing.List[typing.Dict[str, typing.Any]] = []
+    size = encoded_size(build([], page))
+    for widget in widgets:
+        widget_size = encoded_size(widget) + (1 if page_widgets else 0)
+        if page_widgets and size + widget_size > max_bytes:
+            yield build(page_widgets, page)
+            page += 1
+            page_widgets = []
+            size = encoded_size(build([], page))
+            widget_size -= 1
+        page_widgets.append(widget)
+        size += widget_size
+    yield build(page_widgets, page)
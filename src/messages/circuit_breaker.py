@@ -0,0 +1,207 @@
+import os
+import time
+import typing
+from dataclasses import dataclass, replace
+
+import boto3
+from aws_lambda_powertools import Logger
+from botocore.exceptions import BotoCoreError, ClientError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+GLOBAL = "global"
+
+logger = Logger(child=True)
+
+
+@dataclass(frozen=True)
+class BreakerState:
+    state: str = CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    probes: int = 0
+
+
+class InMemoryStateStore:
+    """Breaker states private to the container."""
+
+    def __init__(self) -> None:
+        self._states: typing.Dict[str, BreakerState] = {}
+
+    def load(self, key: str) -> typing.Optional[BreakerState]:
+        return self._states.get(key)
+
+    def save(self, key: str, state: BreakerState) -> None:
+        self._states[key] = state
+
+
+class DynamoDBStateStore:
+    """Breaker states shared by warm containers, one item per key.
+
+    Items are keyed by ``breaker_id`` and carry an ``expires_at`` epoch
+    that can be used as the TTL attribute of the table. Concurrent updates
+    are last-writer-wins, which is good enough for a breaker.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        client: typing.Any = None,
+        ttl: int = 86_400,
+    ) -> None:
+        self.table_name = table_name
+        self.client = client or boto3.client("dynamodb")
+        self.ttl = ttl
+
+    def load(self, key: str) -> typing.Optional[BreakerState]:
+        item = self.client.get_item(
+            TableName=self.table_name,
+            Key={"breaker_id": {"S": key}},
+            ConsistentRead=True,
+        ).get("Item")
+        if not item:
+            return None
+        return BreakerState(
+            state=item["state"]["S"],
+            failures=int(item["failures"]["N"]),
+            opened_at=float(item["opened_at"]["N"]),
+            probes=int(item["probes"]["N"]),
+        )
+
+    def save(self, key: str, state: BreakerState) -> None:
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "breaker_id": {"S": key},
+                "state": {"S": state.state},
+                "failures": {"N": str(state.failures)},
+                "opened_at": {"N": str(state.opened_at)},
+                "probes": {"N": str(state.probes)},
+                "expires_at": {"N": str(int(time.time()) + self.ttl)},
+            },
+        )
+
+
+class CircuitBreaker:
+    """Closed, open and half-open breakers for each space and overall.
+
+    A key opens after ``failure_threshold`` consecutive failures, the
+    global breaker after ``global_failure_threshold`` failures across all
+    spaces. An open breaker rejects requests for ``recovery_timeout``
+    seconds, then lets ``half_open_probes`` requests through every
+    ``recovery_timeout`` seconds. The first probe to succeed closes it, a
+    failed probe opens it again.
+
+    States are read from the store at most every ``sync_interval`` seconds
+    and written on every change. When the store fails, the breaker keeps
+    working on the states it has in memory.
+    """
+
+    def __init__(
+        self,
+        store: typing.Any = None,
+        failure_threshold: int = 5,
+        global_failure_threshold: int = 20,
+        recovery_timeout: float = 30.0,
+        half_open_probes: int = 1,
+        sync_interval: float = 1.0,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store or InMemoryStateStore()
+        self.failure_threshold = failure_threshold
+        self.global_failure_threshold = global_failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self._states: typing.Dict[str, typing.Tuple[float, BreakerState]] = {}
+
+    def state(self, key: str) -> BreakerState:
+        now = self.clock()
+        synced, state = self._states.get(key, (0.0, BreakerState()))
+        if now - synced >= self.sync_interval:
+            try:
+                state = self.store.load(key) or BreakerState()
+            except (BotoCoreError, ClientError) as e:
+                logger.warning(f"could not load circuit breaker state: {e}")
+            self._states[key] = (now, state)
+        return state
+
+    def allow(self, key: str) -> bool:
+        """Whether a request for ``key`` may be sent.
+
+        Half-open breakers count the request as one of their probes.
+        """
+        return self._allow(GLOBAL) and self._allow(key)
+
+    def record_success(self, key: str) -> None:
+        for breaker_key in [GLOBAL, key]:
+            if self.state(breaker_key) != BreakerState():
+                self._save(breaker_key, BreakerState())
+
+    def record_failure(self, key: str) -> None:
+        for breaker_key, threshold in [
+            (GLOBAL, self.global_failure_threshold),
+            (key, self.failure_threshold),
+        ]:
+            state = self.state(breaker_key)
+            failures = state.failures + 1
+            if state.state == HALF_OPEN or failures >= threshold:
+                state = BreakerState(OPEN, failures, self.clock())
+            else:
+                state = replace(state, failures=failures)
+            self._save(breaker_key, state)
+
+    def _allow(self, key: str) -> bool:
+        state = self.state(key)
+        if state.state == CLOSED:
+            return True
+        now = self.clock()
+        if state.state == OPEN or state.probes >= self.half_open_probes:
+            if now - state.opened_at < self.recovery_timeout:
+                return False
+            # a new round of probes, also when the last probes never
+            # reported back, e.g. because their container was recycled
+            state = BreakerState(HALF_OPEN, state.failures, now)
+        self._save(key, replace(state, probes=state.probes + 1))
+        return True
+
+    def _save(self, key: str, state: BreakerState) -> None:
+        previous = self._states.get(key, (0.0, BreakerState()))[1]
+        if previous.state != state.state:
+            logger.info(
+                {
+                    "message": "Circuit breaker state changed",
+                    "breaker": key,
+                    "from": previous.state,
+                    "to": state.state,
+                }
+            )
+        self._states[key] = (self.clock(), state)
+        try:
+            self.store.save(key, state)
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"could not save circuit breaker state: {e}")
+
+
+def from_environ(
+    environ: typing.Mapping[str, str] = os.environ,
+) -> CircuitBreaker:
+    """Build the circuit breaker of the function.
+
+    States are shared through ``CIRCUIT_BREAKER_TABLE_NAME`` when set.
+    """
+    return CircuitBreaker(
+        store=(
+            DynamoDBStateStore(environ["CIRCUIT_BREAKER_TABLE_NAME"])
+            if environ.get("CIRCUIT_BREAKER_TABLE_NAME")
+            else None
+        ),
+        failure_threshold=int(environ.get("CIRCUIT_FAILURE_THRESHOLD", "5")),
+        global_failure_threshold=int(
+            environ.get("CIRCUIT_GLOBAL_FAILURE_THRESHOLD", "20")
+        ),
+        recovery_timeout=float(environ.get("CIRCUIT_RECOVERY_TIMEOUT", "30")),
+        half_open_probes=int(environ.get("CIRCUIT_HALF_OPEN_PROBES", "1")),
+    )
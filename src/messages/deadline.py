@@ -0,0 +1,60 @@
+import os
+import typing
+
+from exceptions import BudgetExhausted
+
+# requests recommends a connect timeout slightly above a multiple of 3 s,
+# the TCP retransmission window
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_RESERVE_MS = 500
+MIN_READ_TIMEOUT = 0.5
+
+
+class TimeoutBudget:
+    """Derives HTTP timeouts from the remaining time of the invocation.
+
+    ``reserve_ms`` is kept back for the work left after the request, such as
+    spilling the message to the retry queue and flushing metrics. The
+    connect timeout takes at most a third of what is left and the read
+    timeout gets the rest, both capped by their configured maximum.
+    """
+
+    def __init__(
+        self,
+        remaining_ms: typing.Callable[[], int],
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        reserve_ms: int = DEFAULT_RESERVE_MS,
+    ) -> None:
+        self.remaining_ms = remaining_ms
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.reserve_ms = reserve_ms
+
+    def timeouts(self) -> typing.Tuple[float, float]:
+        """Return the ``(connect, read)`` timeouts for the next request."""
+        available = (self.remaining_ms() - self.reserve_ms) / 1000
+        connect = min(self.connect_timeout, available / 3)
+        read = min(self.read_timeout, available - connect)
+        if read < MIN_READ_TIMEOUT:
+            raise BudgetExhausted(
+                f"{max(available, 0):.3f}s left before the Lambda deadline"
+            )
+        return connect, read
+
+
+def from_environ(
+    remaining_ms: typing.Callable[[], int],
+    environ: typing.Mapping[str, str] = os.environ,
+) -> TimeoutBudget:
+    return TimeoutBudget(
+        remaining_ms,
+        connect_timeout=float(
+            environ.get("HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)
+        ),
+        read_timeout=float(
+            environ.get("HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)
+        ),
+        reserve_ms=int(environ.get("DEADLINE_RESERVE_MS", DEFAULT_RESERVE_MS)),
+    )
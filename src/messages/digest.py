@@ -0,0 +1,249 @@
+import collections
+import dataclasses
+import json
+import os
+import time
+import typing
+from dataclasses import asdict, dataclass
+
+import boto3
+import gchat_utils
+
+# BatchWriteItem takes at most 25 requests
+_BATCH_SIZE = 25
+MAX_ENTRIES_PER_MESSAGE = 50
+# query parameters of the webhook URL that authenticate to Google Chat
+CREDENTIALS = frozenset(["key", "token"])
+
+
+@dataclass(frozen=True)
+class DigestEntry:
+    """One event of a digest, reduced to the header of its message."""
+
+    path: str
+    query: typing.Dict[str, str]
+    created: str
+    text: str
+    title: str
+    subtitle: str
+    url: typing.Optional[str] = None
+
+    @classmethod
+    def from_message(
+        cls,
+        path: str,
+        query: typing.Dict[str, str],
+        created: str,
+        message: typing.Dict[str, typing.Any],
+    ):
+        header = message["cards"][0].get("header", {})
+        return cls(
+            path=path,
+            query=query,
+            created=created,
+            text=message["text"],
+            title=header.get("title", ""),
+            subtitle=header.get("subtitle", ""),
+            url=_first_link(message),
+        )
+
+    @classmethod
+    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
+        return cls(
+            path=raw["path"],
+            query=raw["query"],
+            created=raw["created"],
+            text=raw["text"],
+            title=raw["title"],
+            subtitle=raw["subtitle"],
+            url=raw.get("url"),
+        )
+
+    def to_raw(self) -> typing.Dict[str, typing.Any]:
+        return asdict(self)
+
+
+def _first_link(message: typing.Dict[str, typing.Any]) -> typing.Optional[str]:
+    # the handlers put the link to the event in the buttons of the last
+    # section
+    for section in reversed(message["cards"][0].get("sections", [])):
+        for widget in section.get("widgets", []):
+            for button in widget.get("buttons", []):
+                return button["textButton"]["onClick"]["openLink"]["url"]
+    return None
+
+
+class DynamoDBDigestStore:
+    """Digest entries waiting for the next flush.
+
+    Items are keyed by ``digest_id``, the message path of the space, and
+    ``entry_id``, the creation time and id of the event, so that the
+    entries of a space sort in the order of their events. Entries carry
+    an ``expires_at`` epoch that can be used as the TTL attribute of the
+    table, in case a space keeps failing.
+
+    The Chat credentials of the entries are encrypted with the KMS key
+    ``key_id``, bound to the space, and stored apart in ``credentials``.
+    The ciphertext of the last ``max_ciphertexts`` credentials is reused.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        key_id: str,
+        client: typing.Any = None,
+        kms_client: typing.Any = None,
+        ttl: int = 7 * 86_400,
+        max_ciphertexts: int = 64,
+    ) -> None:
+        self.table_name = table_name
+        self.key_id = key_id
+        self.client = client or boto3.client("dynamodb")
+        self.kms_client = kms_client or boto3.client("kms")
+        self.ttl = ttl
+        self.max_ciphertexts = max_ciphertexts
+        self._ciphertexts: typing.OrderedDict[
+            typing.Tuple[str, typing.FrozenSet[typing.Tuple[str, str]]],
+            bytes,
+        ] = collections.OrderedDict()
+
+    def add(self, entry: DigestEntry, event_id: typing.Any) -> None:
+        credentials = {
+            key: value
+            for key, value in entry.query.items()
+            if key in CREDENTIALS
+        }
+        raw = entry.to_raw()
+        raw["query"] = {
+            key: value
+            for key, value in entry.query.items()
+            if key not in CREDENTIALS
+        }
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "digest_id": {"S": entry.path},
+                "entry_id": {"S": f"{entry.created}#{event_id}"},
+                "entry": {"S": json.dumps(raw, ensure_ascii=False)},
+                "credentials": {"B": self._encrypt(entry.path, credentials)},
+                "expires_at": {"N": str(int(time.time()) + self.ttl)},
+            },
+        )
+
+    def pending(
+        self,
+    ) -> typing.Dict[str, typing.List[typing.Tuple[str, DigestEntry]]]:
+        """The entries of every space, oldest first."""
+        digests: typing.Dict[
+            str, typing.List[typing.Tuple[str, DigestEntry]]
+        ] = {}
+        decrypted: typing.Dict[bytes, typing.Dict[str, str]] = {}
+        paginator = self.client.get_paginator("scan")
+        for page in paginator.paginate(
+            TableName=self.table_name, ConsistentRead=True
+        ):
+            for item in page["Items"]:
+                path = item["digest_id"]["S"]
+                entry = DigestEntry.from_raw(json.loads(item["entry"]["S"]))
+                if "credentials" in item:
+                    ciphertext = item["credentials"]["B"]
+                    if ciphertext not in decrypted:
+                        decrypted[ciphertext] = self._decrypt(path, ciphertext)
+                    entry = dataclasses.replace(
+                        entry, query={**entry.query, **decrypted[ciphertext]}
+                    )
+                digests.setdefault(path, []).append(
+                    (item["entry_id"]["S"], entry)
+                )
+        for entries in digests.values():
+            entries.sort(key=lambda entry: entry[0])
+        return digests
+
+    def _encrypt(self, path: str, credentials: typing.Dict[str, str]) -> bytes:
+        cache_key = (path, frozenset(credentials.items()))
+        ciphertext = self._ciphertexts.get(cache_key)
+        if ciphertext is None:
+            ciphertext = self.kms_client.encrypt(
+                KeyId=self.key_id,
+                Plaintext=json.dumps(credentials).encode("utf-8"),
+                EncryptionContext={"digest_id": path},
+            )["CiphertextBlob"]
+        self._ciphertexts[cache_key] = ciphertext
+        self._ciphertexts.move_to_end(cache_key)
+        while len(self._ciphertexts) > self.max_ciphertexts:
+            self._ciphertexts.popitem(last=False)
+        return ciphertext
+
+    def _decrypt(self, path: str, ciphertext: bytes) -> typing.Dict[str, str]:
+        # the context fails the decryption of credentials copied from the
+        # item of another space
+        plaintext = self.kms_client.decrypt(
+            CiphertextBlob=ciphertext,
+            EncryptionContext={"digest_id": path},
+        )["Plaintext"]
+        return json.loads(plaintext)
+
+    def remove(self, digest_id: str, entry_ids: typing.List[str]) -> None:
+        for start in range(0, len(entry_ids), _BATCH_SIZE):
+            deletes = [
+                {
+                    "DeleteRequest": {
+                        "Key": {
+                            "digest_id": {"S": digest_id},
+                            "entry_id": {"S": entry_id},
+                        }
+                    }
+                }
+                for entry_id in entry_ids[start : start + _BATCH_SIZE]
+            ]
+            while deletes:
+                response = self.client.batch_write_item(
+                    RequestItems={self.table_name: deletes}
+                )
+                deletes = response.get("UnprocessedItems", {}).get(
+                    self.table_name, []
+                )
+
+
+def digest_message(entries: typing.List[DigestEntry]) -> typing.Dict:
+    """A card listing the entries of a space."""
+    widgets = [
+        gchat_utils.key_value(
+            top_label=entry.text,
+            content=entry.title,
+            bottom_label=entry.subtitle,
+            button=(
+                gchat_utils.text_button_link(text="開く", url=entry.url)
+                if entry.url
+                else None
+            ),
+        )
+        for entry in entries
+    ]
+    return {
+        "text": f"{len(entries)} 件の更新のまとめ",
+        "cards": [
+            {
+                "header": {
+                    "title": "更新のまとめ",
+                    "subtitle": f"{entries[0].created} 〜 {entries[-1].created}",
+                },
+                "sections": [{"widgets": widgets}],
+            }
+        ],
+    }
+
+
+def from_environ(
+    environ: typing.Mapping[str, str] = os.environ,
+) -> typing.Optional[DynamoDBDigestStore]:
+    """Build the digest store of the function.
+
+    Digests are disabled unless ``DIGEST_TABLE_NAME`` is set, in which
+    case ``DIGEST_KEY_ID`` is the KMS key of the Chat credentials.
+    """
+    if not environ.get("DIGEST_TABLE_NAME"):
+        return None
+    return DynamoDBDigestStore(
+        environ["DIGEST_TABLE_NAME"], environ["DIGEST_KEY_ID"]
+    )
@@ -0,0 +1,145 @@
+import collections
+import os
+import time
+import typing
+from dataclasses import dataclass
+
+import threads
+from events import EventType
+
+# fields of the message replaced by an edit
+UPDATE_MASK = "text,cards"
+
+EditKey = typing.Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class Edit:
+    """A posted message that the next updates of its issue edit in place.
+
+    ``changes`` are the raw changes shown by the message, merged over the
+    updates that edited it.
+    """
+
+    name: str
+    expires: float
+    changes: typing.Tuple[typing.Dict[str, typing.Any], ...] = ()
+
+
+def key(
+    path: str, raw: typing.Dict[str, typing.Any]
+) -> typing.Optional[EditKey]:
+    """The key of an issue update in a space, None for the other events.
+
+    Updates with a comment are posted as they are, so that merging the
+    changes of later updates never hides a comment.
+    """
+    if raw.get("type") != EventType.UPDATE_ISSUE.value:
+        return None
+    content = raw.get("content")
+    if not isinstance(content, dict) or content.get("comment"):
+        return None
+    changes = content.get("changes")
+    if not isinstance(changes, list) or not all(
+        isinstance(change, dict) for change in changes
+    ):
+        return None
+    issue = threads.thread_key(raw)
+    return (path, issue) if issue else None
+
+
+def merge_changes(
+    previous: typing.Iterable[typing.Dict[str, typing.Any]],
+    changes: typing.Iterable[typing.Dict[str, typing.Any]],
+) -> typing.Tuple[typing.Dict[str, typing.Any], ...]:
+    """Changes of both updates, from the first old value of each field to
+    its last new value."""
+    merged: typing.Dict[typing.Any, typing.Dict[str, typing.Any]] = {
+        change.get("field"): change for change in previous
+    }
+    for change in changes:
+        field_name = change.get("field")
+        if field_name in merged:
+            change = {
+                **change,
+                "old_value": merged[field_name].get("old_value"),
+            }
+        merged[field_name] = change
+    return tuple(merged.values())
+
+
+def merged_event(
+    raw: typing.Dict[str, typing.Any],
+    changes: typing.Tuple[typing.Dict[str, typing.Any], ...],
+) -> typing.Dict[str, typing.Any]:
+    return {**raw, "content": {**raw["content"], "changes": list(changes)}}
+
+
+def update_query(query: typing.Dict[str, str]) -> typing.Dict[str, str]:
+    """The query of a message edit, which is never threaded."""
+    return {
+        key: value
+        for key, value in query.items()
+        if key not in (threads.THREAD_KEY, threads.REPLY_OPTION)
+    }
+
+
+class EditStore:
+    """Messages of the recently updated issues, kept in process until the
+    window of their edits closes.
+
+    At most ``max_entries`` messages are kept, least recently used first
+    out. Each function instance keeps its own messages, so an update
+    handled by another instance is posted as a new message.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: typing.OrderedDict[EditKey, Edit] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: EditKey) -> typing.Optional[Edit]:
+        edit = self._entries.get(key)
+        if edit is None:
+            return None
+        if edit.expires <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return edit
+
+    def start(
+        self,
+        key: EditKey,
+        name: str,
+        window: float,
+        changes: typing.Tuple[typing.Dict[str, typing.Any], ...],
+    ) -> None:
+        """Edit the message ``name`` for the next ``window`` seconds."""
+        if self.max_entries <= 0:
+            return
+        self.put(key, Edit(name, self.clock() + window, changes))
+
+    def put(self, key: EditKey, edit: Edit) -> None:
+        self._entries[key] = edit
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: EditKey) -> None:
+        self._entries.pop(key, None)
+
+
+def from_environ(
+    environ: typing.Mapping[str, str] = os.environ,
+) -> EditStore:
+    return EditStore(max_entries=int(environ.get("EDIT_STATE_SIZE", "1024")))
@@ -4,3 +4,23 @@ class BacklogGchatBaseError(Exception):
 
 class UnsupportedEventType(BacklogGchatBaseError):
     pass
+
+
+class InvalidPayload(BacklogGchatBaseError):
+    pass
+
+
+class UnknownTenant(BacklogGchatBaseError):
+    pass
+
+
+class BudgetExhausted(BacklogGchatBaseError):
+    pass
+
+
+class CircuitOpen(BacklogGchatBaseError):
+    pass
+
+
+class ChatUnavailable(BacklogGchatBaseError):
+    pass
@@ -0,0 +1,153 @@
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from urllib import parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_local = threading.local()
+
+
+@dataclass
+class HttpTimings:
+    connect_ms: float = 0.0
+    tls_ms: float = 0.0
+    ttfb_ms: float = 0.0
+    total_ms: float = 0.0
+
+
+def _timings() -> HttpTimings:
+    if not hasattr(_local, "timings"):
+        _local.timings = HttpTimings()
+    return _local.timings
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()  # type: ignore
+        finally:
+            _timings().connect_ms += (time.perf_counter() - start) * 1000
+
+    def connect(self) -> None:
+        timings = _timings()
+        connect_ms = timings.connect_ms
+        start = time.perf_counter()
+        super().connect()  # type: ignore
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        timings.tls_ms += max(
+            elapsed_ms - (timings.connect_ms - connect_ms), 0.0
+        )
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class GoogleChatClient:
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url
+        self.session = requests.Session()
+        adapter = _TimedHTTPAdapter()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def timings(self) -> HttpTimings:
+        """Timings of the last request made from the current thread."""
+        return _timings()
+
+    def warm_up(self, timeout: float = 2.0) -> None:
+        """Open a pooled connection to the API ahead of the first message."""
+        try:
+            self.session.head(self.base_url, timeout=timeout)
+        except requests.RequestException:
+            pass
+
+    def reset(self) -> None:
+        """Drop pooled connections, e.g. after a snapshot restore."""
+        for adapter in self.session.adapters.values():
+            adapter.close()
+
+    def message_url(self, path: str, query: typing.Dict[str, str]) -> str:
+        url = parse.urljoin(self.base_url, path)
+        return url + "?" + parse.urlencode(query, quote_via=parse.quote)
+
+    def post_message(
+        self,
+        path: str,
+        query: typing.Dict[str, str],
+        body: bytes,
+        timeout: typing.Optional[typing.Tuple[float, float]] = None,
+    ) -> requests.Response:
+        return self._send(self.session.post, path, query, body, timeout)
+
+    def update_message(
+        self,
+        name: str,
+        query: typing.Dict[str, str],
+        body: bytes,
+        update_mask: str,
+        timeout: typing.Optional[typing.Tuple[float, float]] = None,
+    ) -> requests.Response:
+        """Replace the ``update_mask`` fields of the message ``name``, as
+        returned when it was posted."""
+        return self._send(
+            self.session.patch,
+            f"/v1/{name}",
+            {**query, "updateMask": update_mask},
+            body,
+            timeout,
+        )
+
+    def _send(
+        self,
+        method: typing.Callable[..., requests.Response],
+        path: str,
+        query: typing.Dict[str, str],
+        body: bytes,
+        timeout: typing.Optional[typing.Tuple[float, float]],
+    ) -> requests.Response:
+        timings = _local.timings = HttpTimings()
+        start = time.perf_counter()
+        response = method(
+            url=self.message_url(path, query),
+            data=body,
+            headers={"Content-Type": "application/json; charset=UTF-8"},
+            timeout=timeout,
+        )
+        timings.total_ms = (time.perf_counter() - start) * 1000
+        # `elapsed` covers connection setup up to the parsed response headers
+        timings.ttfb_ms = max(
+            float(response.elapsed.total_seconds()) * 1000
+            - timings.connect_ms
+            - timings.tls_ms,
+            0.0,
+        )
+        return response
@@ -1,22 +1,76 @@
+import dataclasses
 import difflib
+import itertools
+import json
 import os
+import time
 import typing
-from urllib import parse
 
+import auth
+import card_budget
+import circuit_breaker
+import deadline
+import digest
+import edits
 import gchat_utils
 import models
+import priming
+import render_cache
 import requests
+import retry_queue
+import rules
 import sentry_sdk
+import telemetry
+import tenants
+import threads
 from aws_lambda_powertools import Logger, Tracer
-from aws_lambda_powertools.event_handler.api_gateway import ApiGatewayResolver
+from aws_lambda_powertools.event_handler.api_gateway import (
+    ApiGatewayResolver,
+    ProxyEventType,
+)
+from aws_lambda_powertools.event_handler.exceptions import (
+    BadRequestError,
+    NotFoundError,
+    ServiceError,
+    UnauthorizedError,
+)
 from aws_lambda_powertools.logging import correlation_paths
-from exceptions import UnsupportedEventType
+from exceptions import (
+    BudgetExhausted,
+    ChatUnavailable,
+    CircuitOpen,
+    InvalidPayload,
+    UnknownTenant,
+    UnsupportedEventType,
+)
+from gchat_client import GoogleChatClient
+from retry_queue import SpilledMessage
 from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
+from telemetry import metrics
 from webhook import WebhookApp
 
+# HTTP APIs and function URLs both send the version 2.0 payload
+_frontends = {
+    "rest": (
+        ProxyEventType.APIGatewayProxyEvent,
+        correlation_paths.API_GATEWAY_REST,
+    ),
+    "http": (
+        ProxyEventType.APIGatewayProxyEventV2,
+        correlation_paths.API_GATEWAY_HTTP,
+    ),
+    "function_url": (
+        ProxyEventType.APIGatewayProxyEventV2,
+        correlation_paths.LAMBDA_FUNCTION_URL,
+    ),
+}
+proxy_type, correlation_id_path = _frontends[
+    os.environ.get("API_FRONTEND") or "rest"
+]
+
 tracer = Tracer()
 logger = Logger()
-app = ApiGatewayResolver()
+app = ApiGatewayResolver(proxy_type=proxy_type)
 
 sentry_dsn = os.environ.get("SENTRY_DSN")
 if sentry_dsn:
@@ -27,14 +81,46 @@ if sentry_dsn:
     )
 
 
-backlog_base_url = os.environ["BACKLOG_BASE_URL"]
-if backlog_base_url.endswith("/"):
-    backlog_base_url = backlog_base_url[:-1]
-
 google_chat_api = os.environ["GOOGLE_CHAT_API"]
+max_message_bytes = int(
+    os.environ.get("MAX_MESSAGE_BYTES", card_budget.MAX_MESSAGE_BYTES)
+)
+max_request_bytes = int(os.environ.get("MAX_REQUEST_BYTES", 1_048_576))
+models.field_caps.max_chars = int(
+    os.environ.get("MAX_FIELD_CHARS", models.field_caps.max_chars)
+)
+chat_client = GoogleChatClient(google_chat_api)
+tenant_configs = tenants.from_environ()
+spill_queue = retry_queue.from_environ()
+breaker = circuit_breaker.from_environ()
+authenticator = auth.from_environ()
+renders = render_cache.from_environ()
+digest_store = digest.from_environ()
+edit_store = edits.from_environ()
 webhook = WebhookApp()
 
 
+def exceeds(
+    body: typing.Optional[str], max_bytes: int, base64_encoded: bool = False
+) -> bool:
+    """Whether the UTF-8 form of the body is larger than max_bytes.
+
+    A base64 encoded body is measured by the size of what it decodes to.
+    """
+    if not body:
+        return False
+    if base64_encoded:
+        padding = len(body) - len(body.rstrip("="))
+        return len(body) * 3 // 4 - padding > max_bytes
+    # a character takes 1 to 4 bytes, so most bodies are decided without
+    # encoding them
+    if len(body) > max_bytes:
+        return True
+    if len(body) * 4 <= max_bytes:
+        return False
+    return len(body.encode("utf-8")) > max_bytes
+
+
 def text_diff(old: str, new: str) -> str:
     def ensure_newline_end(s: str) -> str:
         if not s.endswith("\n"):
@@ -127,7 +213,7 @@ def create_issue():
                                     gchat_utils.text_button_link(
                                         text="課題を開く",
                                         url=webhook.event.issue_link(
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -174,7 +260,7 @@ def update_issue():
                 button=gchat_utils.text_button_link(
                     text="ファイルを開く",
                     url=webhook.event.shared_file_link(
-                        base_url=backlog_base_url,
+                        base_url=webhook.base_url,
                         shared_file=shared_file,
                     ),
                 ),
@@ -197,11 +283,11 @@ def update_issue():
                                         text="課題を開く",
                                         url=(
                                             webhook.event.issue_comment_link(
-                                                backlog_base_url
+                                                webhook.base_url
                                             )
                                             if content.comment
                                             else webhook.event.issue_link(  # noqa
-                                                backlog_base_url
+                                                webhook.base_url
                                             )
                                         ),
                                     ),
@@ -242,7 +328,7 @@ def add_comment():
                                     gchat_utils.text_button_link(
                                         text="課題を開く",
                                         url=webhook.event.issue_comment_link(
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -296,7 +382,7 @@ def create_wiki():
                                     gchat_utils.text_button_link(
                                         text="Wiki を開く",
                                         url=webhook.event.wiki_link(
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -329,7 +415,7 @@ def update_wiki():
                                     gchat_utils.text_button_link(
                                         text="Wiki を開く",
                                         url=webhook.event.wiki_link(
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -344,7 +430,7 @@ def update_wiki():
         message["cards"][0]["sections"][0]["widgets"][0]["buttons"].append(
             gchat_utils.text_button_link(
                 text="差分を開く",
-                url=webhook.event.wiki_diff_link(backlog_base_url),
+                url=webhook.event.wiki_diff_link(webhook.base_url),
             )
         )
         message["cards"][0]["sections"].insert(
@@ -403,7 +489,7 @@ def commit_subversion():
                                     gchat_utils.text_button_link(
                                         text="コミットを開く",
                                         url=webhook.event.subversion_commit_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -438,7 +524,7 @@ def push_git():
                                 button=gchat_utils.text_button_link(
                                     text="コミットを開く",
                                     url=webhook.event.git_commit_link(
-                                        backlog_base_url,
+                                        webhook.base_url,
                                         rev,
                                     ),
                                 ),
@@ -453,7 +539,7 @@ def push_git():
                                     gchat_utils.text_button_link(
                                         text="ブランチを開く",
                                         url=webhook.event.git_branch_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -486,7 +572,7 @@ def create_git():
                                     gchat_utils.text_button_link(
                                         text="リポジトリを開く",
                                         url=webhook.event.git_repository_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -511,61 +597,76 @@ def create_git():
 
 @webhook.bulk_update_issue
 def bulk_update_issue():
-    content: models.BulkUpdateIssueContent = webhook.event.content
-    message = {
-        "text": "課題をまとめて更新",
-        "cards": [
+    event = webhook.event
+    content: models.BulkUpdateIssueContent = event.content
+    project_key = event.project.project_key
+    change_widgets = [
+        gchat_utils.key_value(
+            top_label=change.field,
+            content=f"{change.old_value or '--'} > {change.new_value or '--'}",  # noqa
+            icon=gchat_utils.get_icon(change.raw_field_name),
+        )
+        for change in content.changes
+    ]
+    urls = event.urls(webhook.base_url)
+    link_widgets = (
+        gchat_utils.key_value(
+            top_label=f"{project_key}-{link.id}",
+            content=link.title,
+            icon="TICKET",
+            button=gchat_utils.text_button_link(
+                text="課題を開く", url=urls.issue(link.id)
+            ),
+        )
+        for link in content.link
+    )
+
+    def build_message(
+        widgets: typing.List[typing.Dict[str, typing.Any]], page: int
+    ) -> typing.Dict[str, typing.Any]:
+        sections = [
             {
-                "header": {
-                    "title": webhook.event.project.project_display,
-                    "subtitle": webhook.event.created_user.name,
-                },
-                "sections": [
-                    {
-                        "widgets": [
-                            gchat_utils.key_value(
-                                top_label=f"{webhook.event.project.project_key}-{link.id}",  # noqa
-                                content=link.title,
-                                icon="TICKET",
-                                button=gchat_utils.text_button_link(
-                                    text="課題を開く",
-                                    url=f"{backlog_base_url}/view/{webhook.event.project.project_key}-{link.id}",  # noqa
-                                ),
-                            )
-                            for link in content.link
-                        ],
-                    },
+                "widgets": widgets,
+            },
+        ]
+        if page == 0:
+            sections.append(
+                {
+                    "widgets": change_widgets,
+                }
+            )
+        sections.append(
+            {
+                "widgets": [
                     {
-                        "widgets": [
-                            gchat_utils.key_value(
-                                top_label=change.field,
-                                content=f"{change.old_value or '--'} > {change.new_value or '--'}",  # noqa
-                                icon=gchat_utils.get_icon(
-                                    change.raw_field_name
+                        "buttons": [
+                            gchat_utils.text_button_link(
+                                text="プロジェクトを開く",
+                                url=event.project.project_link(
+                                    webhook.base_url
                                 ),
-                            )
-                            for change in content.changes
-                        ],
-                    },
-                    {
-                        "widgets": [
-                            {
-                                "buttons": [
-                                    gchat_utils.text_button_link(
-                                        text="プロジェクトを開く",
-                                        url=webhook.event.project.project_link(
-                                            backlog_base_url
-                                        ),
-                                    ),
-                                ],
-                            },
+                            ),
                         ],
                     },
                 ],
-            },
-        ],
-    }
-    return message
+            }
+        )
+        return {
+            "text": "課題をまとめて更新" + (f" ({page + 1})" if page else ""),
+            "cards": [
+                {
+                    "header": {
+                        "title": event.project.project_display,
+                        "subtitle": event.created_user.name,
+                    },
+                    "sections": sections,
+                },
+            ],
+        }
+
+    # large bulk updates are split into several messages posted in order.
+    # Each page is encoded by render before the next one is built.
+    return card_budget.paginate(link_widgets, build_message, max_message_bytes)
 
 
 @webhook.join_project
@@ -597,7 +698,7 @@ def join_project():
                                     gchat_utils.text_button_link(
                                         text="プロジェクトを開く",
                                         url=webhook.event.project.project_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -640,7 +741,7 @@ def leave_project():
                                     gchat_utils.text_button_link(
                                         text="プロジェクトを開く",
                                         url=webhook.event.project.project_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -678,7 +779,9 @@ def create_pull_request():
                 icon="TICKET",
                 button=gchat_utils.text_button_link(
                     text="課題を開く",
-                    url=f"{backlog_base_url}/view/{project_key}-{content.issue.key_id}",  # noqa
+                    url=webhook.event.urls(webhook.base_url).issue(
+                        content.issue.key_id
+                    ),
                 ),
             )
         )
@@ -701,7 +804,7 @@ def create_pull_request():
                                     gchat_utils.text_button_link(
                                         text="プルリクエストを開く",
                                         url=webhook.event.pull_request_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -752,7 +855,7 @@ def update_pull_request():
                                     gchat_utils.text_button_link(
                                         text="プルリクエストを開く",
                                         url=webhook.event.pull_request_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -787,7 +890,7 @@ def comment_pull_request():
                                     gchat_utils.text_button_link(
                                         text="プルリクエストを開く",
                                         url=webhook.event.pull_request_link(  # noqa
-                                            backlog_base_url
+                                            webhook.base_url
                                         ),
                                     ),
                                 ],
@@ -810,33 +913,418 @@ def comment_pull_request():
     return message
 
 
+def render(
+    body: typing.Dict[str, typing.Any], base_url: str
+) -> typing.Iterator[bytes]:
+    """Parse and render a Backlog event, and encode its messages lazily.
+
+    The event is parsed and rendered up front, so that a malformed one
+    fails before anything is sent. Split messages are then built and
+    encoded one at a time as they are consumed, so that memory stays flat
+    however many pages a bulk update takes.
+    """
+    try:
+        with telemetry.stage("Parse"):
+            event = webhook.parse(body)
+    finally:
+        capped = models.field_caps.drain()
+    if capped:
+        logger.info({"message": "Capped long fields", "fields": capped})
+        telemetry.record_capped_fields(sum(capped.values()))
+
+    with telemetry.stage("Render"):
+        rendered = webhook.render(event, base_url)
+    messages = [rendered] if isinstance(rendered, dict) else rendered
+    link = event.link(base_url)
+    return (serialize(message, link) for message in messages)
+
+
+def serialize(
+    message: typing.Dict[str, typing.Any], link: typing.Optional[str] = None
+) -> bytes:
+    with telemetry.stage("Serialize"):
+        data, truncated = card_budget.fit(message, max_message_bytes, link)
+    if truncated:
+        telemetry.count("Truncated")
+    telemetry.record_payload_bytes(len(data))
+    return data
+
+
+def deliver(
+    data: bytes,
+    path: str,
+    query: typing.Dict[str, str],
+    budget: deadline.TimeoutBudget,
+    name: typing.Optional[str] = None,
+) -> typing.Optional[requests.Response]:
+    """Post an encoded message with timeouts taken from the budget, or
+    replace the message ``name`` with it.
+
+    Returns the response of the API, or None when it rejected the message.
+    Raises BudgetExhausted when there is no time left for the request or
+    when it times out, CircuitOpen while the circuit breaker of the space
+    or of the API is open, and ChatUnavailable when the API answers 429
+    or a server error, so that the message can be sent again later.
+    """
+    timeout = budget.timeouts()
+    if not breaker.allow(path):
+        telemetry.count("ShortCircuited")
+        raise CircuitOpen(f"circuit breaker for `{path}` is open")
+    start = time.perf_counter()
+    try:
+        with telemetry.stage("Http"):
+            if name is None:
+                response = chat_client.post_message(
+                    path=path,
+                    query=query,
+                    body=data,
+                    timeout=timeout,
+                )
+            else:
+                response = chat_client.update_message(
+                    name=name,
+                    query=query,
+                    body=data,
+                    update_mask=edits.UPDATE_MASK,
+                    timeout=timeout,
+                )
+    except requests.Timeout as e:
+        breaker.record_failure(path)
+        telemetry.record_timeout_budget(time.perf_counter() - start, timeout)
+        raise BudgetExhausted(str(e)) from e
+    except requests.RequestException:
+        breaker.record_failure(path)
+        raise
+    telemetry.record_timeout_budget(time.perf_counter() - start, timeout)
+    # other client errors are about the message, not the health of the API
+    unavailable = not response.ok and (
+        response.status_code == 429 or response.status_code >= 500
+    )
+    if unavailable:
+        breaker.record_failure(path)
+    else:
+        breaker.record_success(path)
+    telemetry.record_http_timings(chat_client.timings)
+    logger.debug(response.text)
+
+    if not response.ok:
+        # messages that can be sent again are counted where they are
+        # spilled, or dropped for want of a retry queue
+        if not unavailable:
+            telemetry.count("Failed")
+        logger.error(
+            {
+                "message": "Google Chat API rejected the message",
+                "status_code": response.status_code,
+                "response": response.text,
+            }
+        )
+        if unavailable:
+            raise ChatUnavailable(
+                f"Google Chat API answered {response.status_code}"
+            )
+        return None
+    telemetry.count("Delivered")
+    return response
+
+
+# what deliver() raises for a message that can be sent again later
+UNDELIVERED = (
+    BudgetExhausted,
+    ChatUnavailable,
+    CircuitOpen,
+    requests.RequestException,
+)
+
+
+def spill(
+    data: typing.Iterable[bytes],
+    path: str,
+    query: typing.Dict[str, str],
+    reason: Exception,
+) -> None:
+    messages = (SpilledMessage(path, query, body) for body in data)
+    if spill_queue is None:
+        logger.error(
+            {
+                "message": "Google Chat API could not be reached",
+                "reason": str(reason),
+            }
+        )
+        telemetry.count("Failed", sum(1 for _ in messages))
+        return
+    # the rest of a split event is encoded as it is spilled
+    count = spill_queue.spill(
+        messages,
+        group_id=path,
+        deduplication_id=app.lambda_context.aws_request_id,
+    )
+    logger.warning(
+        {
+            "message": "Spilled messages to the retry queue",
+            "reason": str(reason),
+            "count": count,
+        }
+    )
+    telemetry.count("Spilled", count)
+
+
 @app.post("/v1/spaces/<space_id>/messages")
 @tracer.capture_method
 def post_handler(space_id: str):
-    logger.debug(app.current_event.json_body)
+    tenant_id = app.current_event.get_header_value(
+        tenants.TENANT_HEADER, tenants.DEFAULT_TENANT, case_sensitive=False
+    )
+    return handle_message(tenant_id, space_id)
+
+
+@app.post("/v1/tenants/<tenant_id>/spaces/<space_id>/messages")
+@tracer.capture_method
+def tenant_post_handler(tenant_id: str, space_id: str):
+    return handle_message(tenant_id, space_id)
+
+
+def handle_message(tenant_id: str, space_id: str) -> typing.Dict[str, str]:
+    # checked before anything else so that unauthenticated requests cost
+    # neither a tenant lookup nor the decoding of their body
+    secret = app.current_event.get_query_string_value(auth.SECRET_QUERY)
+    if not secret:
+        secret = app.current_event.get_header_value(
+            auth.SECRET_HEADER, case_sensitive=False
+        )
+    if not authenticator.verify(space_id, secret):
+        logger.warning(f"unauthenticated request for space `{space_id}`")
+        telemetry.count("Unauthorized")
+        raise UnauthorizedError("Unauthorized")
+    if exceeds(
+        app.current_event.body,
+        max_request_bytes,
+        bool(app.current_event.is_base64_encoded),
+    ):
+        logger.warning(f"request body is larger than {max_request_bytes} bytes")
+        telemetry.count("TooLarge")
+        raise ServiceError(413, "Payload Too Large")
+
     try:
-        message = webhook.handle(app.current_event.json_body)
-    except UnsupportedEventType as e:
+        tenant = tenant_configs.get(tenant_id)
+    except UnknownTenant as e:
         logger.warning(e)
+        telemetry.count("Rejected")
+        raise NotFoundError(str(e))
+    if not tenant.allows_space(space_id):
+        logger.warning(
+            f"space `{space_id}` is not configured for tenant `{tenant_id}`"
+        )
+        telemetry.count("Rejected")
+        raise NotFoundError(f"space `{space_id}` is not configured")
+
+    try:
+        body = app.current_event.json_body
+    except (TypeError, ValueError):
+        body = None
+    if not isinstance(body, dict):
+        logger.warning("request body is not a JSON object")
+        telemetry.count("Invalid")
+        raise BadRequestError("Bad Request")
+    logger.debug(body)
+    telemetry.set_event_type(body.get("type"))
+    telemetry.set_space(space_id)
+    telemetry.count("Received")
+    if not tenant.allows_event_type(body.get("type")):
+        telemetry.count("Ignored")
         return {"message": "OK"}
+    action = tenant.event_action(space_id, body)
+    if action == rules.DROP:
+        telemetry.count("Filtered")
+        return {"message": "OK"}
+    path = f"/v1/spaces/{space_id}/messages"
+    edit_key = edit = None
+    if tenant.edit_window > 0 and action == rules.DELIVER:
+        edit_key = edits.key(path, body)
+        edit = edit_store.get(edit_key) if edit_key else None
+    if edit is not None:
+        changes = edits.merge_changes(edit.changes, body["content"]["changes"])
+        body = edits.merged_event(body, changes)
+    elif edit_key:
+        changes = tuple(body["content"]["changes"])
+    # the same event is posted to every space of its webhooks, and again
+    # when Backlog retries it. Merged updates are rendered every time.
+    cache_key = None
+    if edit is None:
+        cache_key = render_cache.key(
+            body, tenant.backlog_base_url, max_message_bytes
+        )
+    cached = None
+    if cache_key:
+        cached = renders.get(cache_key)
+        telemetry.record_render_cache(cached is not None)
+    if cached is None:
+        try:
+            pages = render(body, tenant.backlog_base_url)
+        except UnsupportedEventType as e:
+            logger.warning(e)
+            telemetry.count("Ignored")
+            return {"message": "OK"}
+        except InvalidPayload as e:
+            # answered with 400 so that Backlog does not send it again
+            logger.warning(
+                {"message": "Invalid payload", "reason": str(e)}, exc_info=True
+            )
+            telemetry.count("Invalid")
+            raise BadRequestError("Bad Request")
+    else:
+        pages = iter(cached)
+    # split messages are encoded as they are sent, so only the first two
+    # are looked at to tell single messages, which are cached and edited
+    first = next(pages)
+    second = next(pages, None)
+    single = second is None
+    if single and cache_key and cached is None:
+        renders.put(cache_key, (first,))
 
-    url = parse.urljoin(google_chat_api, app.current_event.path)
     query = {
-        key: app.current_event.query_string_parameters[key]
-        for key in ["key", "token"]
+        key: value
+        for key, value in (
+            app.current_event.query_string_parameters or {}
+        ).items()
+        if key in threads.FORWARDED_PARAMETERS
     }
-    url += "?" + "&".join([f"{k}={v}" for k, v in query.items()])
+    if action == rules.DIGEST and digest_store is not None:
+        digest_store.add(
+            digest.DigestEntry.from_message(
+                path, query, body.get("created", ""), json.loads(first)
+            ),
+            body.get("id"),
+        )
+        telemetry.count("Digested")
+        return {"message": "OK"}
 
-    response = requests.post(url=url, json=message)
-    logger.debug(response.text)
+    if single:
+        telemetry.count("Rendered")
+        pages = iter([first])
+    else:
+        pages = _counted(itertools.chain([first, second], pages), "Rendered")
+    if tenant.thread_updates:
+        query = threads.in_thread(query, threads.thread_key(body))
+    budget = deadline.from_environ(
+        app.lambda_context.get_remaining_time_in_millis
+    )
+    if edit is not None and single:
+        try:
+            edited = deliver(
+                first, path, edits.update_query(query), budget, edit.name
+            )
+        except UNDELIVERED as e:
+            spill(pages, path, query, e)
+            return {"message": "OK"}
+        if edited:
+            telemetry.count("Edited")
+            edit_store.put(edit_key, dataclasses.replace(edit, changes=changes))
+            return {"message": "OK"}
+        # e.g. the message was deleted, post the merged changes instead
+        edit_store.discard(edit_key)
+        pages = iter([first])
+    # split messages are sent one by one over the pooled connection and
+    # stop at the first failure to keep their order in the space
+    for data in pages:
+        try:
+            response = deliver(data, path, query, budget)
+        except UNDELIVERED as e:
+            spill(itertools.chain([data], pages), path, query, e)
+            break
+        if not response:
+            break
+        if edit_key and single:
+            name = _message_name(response)
+            if name:
+                edit_store.start(edit_key, name, tenant.edit_window, changes)
 
     return {"message": "OK"}
 
 
+def _counted(
+    items: typing.Iterator[bytes], name: str
+) -> typing.Iterator[bytes]:
+    """Count each item as it is consumed, e.g. pages encoded on demand."""
+    for item in items:
+        telemetry.count(name)
+        yield item
+
+
+def _message_name(response: requests.Response) -> typing.Optional[str]:
+    try:
+        name = response.json().get("name")
+    except (ValueError, AttributeError):
+        return None
+    return name if isinstance(name, str) else None
+
+
 @logger.inject_lambda_context(
-    correlation_id_path=correlation_paths.API_GATEWAY_REST,
+    correlation_id_path=correlation_id_path,
 )
 @tracer.capture_lambda_handler
+@metrics.log_metrics
 def lambda_handler(event, context) -> typing.Dict[str, typing.Any]:
     logger.debug(event)
     return app.resolve(event, context)
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@metrics.log_metrics
+def retry_handler(event, context) -> typing.Dict[str, typing.Any]:
+    """Deliver the messages spilled to the retry queue.
+
+    Failed records are reported back to SQS, which redelivers them until
+    the queue moves them to its dead-letter queue. Once a record fails the
+    rest of the batch is reported too, so that messages keep their order.
+    Messages rejected with another client error are dropped, as they would
+    be rejected again.
+    """
+    budget = deadline.from_environ(context.get_remaining_time_in_millis)
+    failures: typing.List[typing.Dict[str, str]] = []
+    for record in event["Records"]:
+        if not failures:
+            message = SpilledMessage.from_raw(json.loads(record["body"]))
+            telemetry.count("Retried")
+            try:
+                deliver(message.body, message.path, message.query, budget)
+            except UNDELIVERED as e:
+                logger.warning(e)
+                failures.append({"itemIdentifier": record["messageId"]})
+        else:
+            failures.append({"itemIdentifier": record["messageId"]})
+    return {"batchItemFailures": failures}
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+@metrics.log_metrics
+def digest_handler(event, context) -> typing.Dict[str, int]:
+    """Post the pending digest of every space, run on a schedule.
+
+    Entries are removed once the card listing them has been posted. A
+    space that cannot be reached keeps its entries for the next run.
+    """
+    if digest_store is None:
+        return {"flushed": 0}
+    budget = deadline.from_environ(context.get_remaining_time_in_millis)
+    flushed = 0
+    for path, entries in digest_store.pending().items():
+        query = entries[0][1].query
+        for start in range(0, len(entries), digest.MAX_ENTRIES_PER_MESSAGE):
+            chunk = entries[start : start + digest.MAX_ENTRIES_PER_MESSAGE]
+            telemetry.count("Rendered")
+            data = serialize(digest.digest_message([e for _, e in chunk]))
+            try:
+                deliver(data, path, query, budget)
+            except UNDELIVERED as e:
+                logger.warning(e)
+                break
+            # like the retry queue, rejected cards are not sent again
+            digest_store.remove(path, [entry_id for entry_id, _ in chunk])
+            flushed += len(chunk)
+    return {"flushed": flushed}
+
+
+priming.register(webhook, chat_client)
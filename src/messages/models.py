@@ -1,10 +1,67 @@
+import collections
+import collections.abc
+import functools
 import typing
 from dataclasses import dataclass, field
 from datetime import date, datetime
-from distutils.util import strtobool
 
+import backlog_urls
+import schema
+from backlog_urls import BacklogUrls
+from card_budget import TRUNCATED_MARKER
 from events import EventType
-from exceptions import UnsupportedEventType
+from exceptions import InvalidPayload, UnsupportedEventType
+
+_ISSUE_TYPES = frozenset(
+    [
+        EventType.CREATE_ISSUE,
+        EventType.UPDATE_ISSUE,
+        EventType.ADD_COMMENT,
+        EventType.DELETE_ISSUE,
+    ]
+)
+_ISSUE_COMMENT_TYPES = frozenset(
+    [EventType.UPDATE_ISSUE, EventType.ADD_COMMENT]
+)
+_WIKI_TYPES = frozenset([EventType.CREATE_WIKI, EventType.UPDATE_WIKI])
+_GIT_TYPES = frozenset([EventType.PUSH_GIT, EventType.CREATE_GIT])
+_PULL_REQUEST_TYPES = frozenset(
+    [
+        EventType.CREATE_PULL_REQUEST,
+        EventType.UPDATE_PULL_REQUEST,
+        EventType.COMMENT_PULL_REQUEST,
+    ]
+)
+
+
+class FieldCaps:
+    """Caps the length of free text fields while events are parsed.
+
+    Descriptions, comments, wiki contents and diffs are cut to
+    ``max_chars`` characters so that a huge body does not cost its full
+    size again when it is diffed and rendered. Each cut is counted by
+    field name until ``drain`` is called.
+    """
+
+    def __init__(self, max_chars: int = 10_000) -> None:
+        self.max_chars = max_chars
+        self._counts: typing.Counter[str] = collections.Counter()
+
+    def __call__(
+        self, value: typing.Optional[str], field_name: str
+    ) -> typing.Optional[str]:
+        if value is None or len(value) <= self.max_chars:
+            return value
+        self._counts[field_name] += 1
+        return value[: self.max_chars] + TRUNCATED_MARKER
+
+    def drain(self) -> typing.Dict[str, int]:
+        counts = dict(self._counts)
+        self._counts.clear()
+        return counts
+
+
+field_caps = FieldCaps()
 
 
 def _maybe_null(maybe_null_str: str) -> typing.Optional[str]:
@@ -14,32 +71,60 @@ def _maybe_null(maybe_null_str: str) -> typing.Optional[str]:
 
 
 def _strtobool(bool_str: typing.Union[bool, str]) -> bool:
+    # same values as distutils.util.strtobool, which is gone in Python 3.12
     if type(bool_str) == bool:
         return bool_str
-    return bool(strtobool(bool_str))
+    value = bool_str.lower()
+    if value in ("y", "yes", "t", "true", "on", "1"):
+        return True
+    if value in ("n", "no", "f", "false", "off", "0"):
+        return False
+    raise ValueError(f"invalid truth value {bool_str!r}")
+
+
+def _parse_timestamp(timestamp: str) -> datetime:
+    # Backlog sends UTC timestamps such as "2017-07-19T11:02:22Z".
+    # fromisoformat is already the fast path, and the value is unique per
+    # event, so unlike _parse_date it is not cached (see bench_dates.py)
+    return datetime.fromisoformat(timestamp[:-1] + "+00:00")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(date_str: str) -> date:
+    # dates repeat a lot across events (due dates, milestones), so the
+    # parsed value is cached
+    try:
+        return date.fromisoformat(date_str)
+    except ValueError:
+        return date(*map(int, date_str.split("-")))
 
 
 def _optional_date(date_str: str) -> typing.Optional[date]:
     if not _maybe_null(date_str):
         return None
-    return date(*map(int, date_str.split("-")))
+    return _parse_date(date_str)
 
 
+@schema.parsed(
+    schema.required("nulab_id"),
+    schema.required("name"),
+    schema.required("unique_id"),
+)
 @dataclass
 class NulabAccount:
     nulab_id: str
     name: str
     unique_id: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            nulab_id=raw["nulabId"],
-            name=raw["name"],
-            unique_id=raw["uniqueId"],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.required("role_type"),
+    schema.optional("nulab_account", NulabAccount.from_raw),
+    schema.optional("mail_address"),
+    schema.optional("user_id"),
+)
 @dataclass
 class CreatedUser:
     id: int
@@ -49,22 +134,14 @@ class CreatedUser:
     mail_address: typing.Optional[str] = None
     user_id: typing.Optional[int] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            role_type=raw["roleType"],
-            nulab_account=(
-                NulabAccount.from_raw(raw["nulabAccount"])
-                if raw.get("nulabAccount")
-                else None
-            ),
-            mail_address=raw.get("mailAddress"),
-            user_id=raw.get("userId"),
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.required("role_type"),
+    schema.optional("lang"),
+    schema.optional("user_id"),
+)
 @dataclass
 class Assignee:
     id: int
@@ -73,17 +150,15 @@ class Assignee:
     lang: typing.Optional[str] = None
     user_id: typing.Optional[int] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            role_type=raw["roleType"],
-            lang=raw.get("lang"),
-            user_id=raw.get("userId"),
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("project_key"),
+    schema.required("name"),
+    schema.optional("archived", _strtobool, default=False),
+    schema.optional("chart_enabled", _strtobool, default=False),
+    schema.optional("subtasking_enabled", _strtobool, default=False),
+)
 @dataclass
 class Project:
     id: int
@@ -93,29 +168,21 @@ class Project:
     chart_enabled: bool = False
     subtasking_enabled: bool = False
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            project_key=raw["projectKey"],
-            name=raw["name"],
-            archived=_strtobool(raw.get("archived", "false")),
-            chart_enabled=_strtobool(raw.get("chartEnabled", "false")),
-            subtasking_enabled=_strtobool(
-                raw.get("subtaskingEnabled", "false")
-            ),
-        )
-
     @property
     def project_display(self) -> str:
         return f"{self.name} ({self.project_key})"
 
     def project_link(self, base_url: str) -> str:
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/projects/{self.project_key}"
+        return backlog_urls.for_project(base_url, self.project_key).project
 
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.optional("color", _maybe_null),
+    schema.optional("display_order"),
+    schema.optional("project_id"),
+)
 @dataclass
 class IssueType:
     id: int
@@ -124,73 +191,82 @@ class IssueType:
     display_order: typing.Optional[int] = None
     project_id: typing.Optional[int] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            color=_maybe_null(raw.get("color", "null")),
-            display_order=raw.get("displayOrder"),
-            project_id=raw.get("projectId"),
-        )
-
 
-@dataclass
+@dataclass(frozen=True)
 class Status:
     id: int
     name: str
 
     @classmethod
-    def from_id(cls, id: int):
-        return cls(
-            id=id,
-            name={
-                1: "未対応",
-                2: "処理中",
-                3: "処理済み",
-                4: "完了",
-            }[id],
-        )
+    def from_raw(
+        cls, raw: typing.Dict[str, typing.Any]
+    ) -> typing.Optional["Status"]:
+        return cls.from_id(raw["id"]) if raw["id"] else None
+
+    @classmethod
+    def from_id(cls, id: int) -> "Status":
+        return _statuses[id]
 
     def __str__(self) -> str:
         return self.name
 
 
-@dataclass
+_statuses = {
+    id: Status(id=id, name=name)
+    for id, name in {
+        1: "未対応",
+        2: "処理中",
+        3: "処理済み",
+        4: "完了",
+    }.items()
+}
+
+
+@dataclass(frozen=True)
 class PullRequestStatus:
     id: int
     name: str
 
     @classmethod
-    def from_id(cls, id: int):
-        return cls(
-            id=id,
-            name={
-                1: "Open",
-                2: "Closed",
-                3: "Merged",
-            }[id],
-        )
+    def from_id(cls, id: int) -> "PullRequestStatus":
+        return _pull_request_statuses[id]
 
     def __str__(self) -> str:
         return self.name
 
 
+_pull_request_statuses = {
+    id: PullRequestStatus(id=id, name=name)
+    for id, name in {
+        1: "Open",
+        2: "Closed",
+        3: "Merged",
+    }.items()
+}
+
+
+@schema.parsed(
+    schema.required("name"),
+    schema.required("id"),
+    schema.optional("display_order"),
+)
 @dataclass
 class Category:
     name: str
     id: typing.Optional[int] = None
     display_order: typing.Optional[int] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            display_order=raw.get("displayOrder"),
-        )
-
 
+@schema.parsed(
+    schema.required("name"),
+    schema.required("description"),
+    schema.required("archived", _strtobool),
+    schema.optional("id"),
+    schema.optional("project_id"),
+    schema.optional("display_order"),
+    schema.optional("start_date", _optional_date),
+    schema.optional("release_due_date", _optional_date),
+)
 @dataclass
 class Milestone:
     name: str
@@ -202,20 +278,17 @@ class Milestone:
     start_date: typing.Optional[date] = None
     release_due_date: typing.Optional[date] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            name=raw["name"],
-            description=raw["description"],
-            archived=_strtobool(raw["archived"]),
-            id=raw.get("id"),
-            project_id=raw.get("projectId"),
-            display_order=raw.get("displayOrder"),
-            start_date=_optional_date(raw.get("startDate", "")),
-            release_due_date=_optional_date(raw.get("releaseDueDate", "")),
-        )
-
 
+@schema.parsed(
+    schema.required("name"),
+    schema.required("description"),
+    schema.required("archived", _strtobool),
+    schema.optional("id"),
+    schema.optional("project_id"),
+    schema.optional("display_order"),
+    schema.optional("start_date", _optional_date),
+    schema.optional("release_due_date", _optional_date),
+)
 @dataclass
 class Version:
     name: str
@@ -227,62 +300,86 @@ class Version:
     start_date: typing.Optional[date] = None
     release_due_date: typing.Optional[date] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            name=raw["name"],
-            description=raw["description"],
-            archived=_strtobool(raw["archived"]),
-            id=raw.get("id"),
-            project_id=raw.get("projectId"),
-            display_order=raw.get("displayOrder"),
-            start_date=_optional_date(raw.get("startDate", "")),
-            release_due_date=_optional_date(raw.get("releaseDueDate", "")),
-        )
 
-
-@dataclass
+@dataclass(frozen=True)
 class Resolution:
     id: int
     name: str
 
     @classmethod
-    def from_id(cls, id: int):
-        return cls(
-            id=id,
-            name={
-                0: "対応済み",
-                1: "対応しない",
-                2: "無効",
-                3: "重複",
-                4: "再現しない",
-            }[id],
-        )
+    def from_raw(
+        cls, raw: typing.Dict[str, typing.Any]
+    ) -> typing.Optional["Resolution"]:
+        return cls.from_id(raw["id"]) if raw["id"] else None
+
+    @classmethod
+    def from_id(cls, id: int) -> "Resolution":
+        return _resolutions[id]
 
     def __str__(self) -> str:
         return self.name
 
 
-@dataclass
+_resolutions = {
+    id: Resolution(id=id, name=name)
+    for id, name in {
+        0: "対応済み",
+        1: "対応しない",
+        2: "無効",
+        3: "重複",
+        4: "再現しない",
+    }.items()
+}
+
+
+@dataclass(frozen=True)
 class Priority:
     id: int
     name: str
 
     @classmethod
-    def from_id(cls, id: int):
-        return cls(
-            id=id,
-            name={
-                2: "高",
-                3: "中",
-                4: "低",
-            }[id],
-        )
+    def from_raw(
+        cls, raw: typing.Dict[str, typing.Any]
+    ) -> typing.Optional["Priority"]:
+        return cls.from_id(raw["id"]) if raw["id"] else None
+
+    @classmethod
+    def from_id(cls, id: int) -> "Priority":
+        return _priorities[id]
 
     def __str__(self) -> str:
         return self.name
 
 
+_priorities = {
+    id: Priority(id=id, name=name)
+    for id, name in {
+        2: "高",
+        3: "中",
+        4: "低",
+    }.items()
+}
+
+
+@schema.parsed(
+    schema.required("id"),
+    schema.required("key_id", key="key_id"),
+    schema.required("issue_type", IssueType.from_raw),
+    schema.required("summary"),
+    schema.required("description", field_caps, "description"),
+    schema.required("status", Status.from_raw),
+    schema.required("priority", Priority.from_raw, nullable=True),
+    schema.required("resolution", Resolution.from_raw, nullable=True),
+    schema.optional("parent_issue_id"),
+    schema.required("start_date", _optional_date, nullable=True),
+    schema.required("due_date", _optional_date, nullable=True),
+    schema.required("category", Category.from_raw, many=True),
+    schema.required("milestone", Milestone.from_raw, many=True),
+    schema.required("versions", Version.from_raw, many=True),
+    schema.required("assignee", Assignee.from_raw, nullable=True),
+    schema.optional("estimated_hours"),
+    schema.optional("actual_hours"),
+)
 @dataclass
 class CreateIssueContent:
     id: int
@@ -303,38 +400,6 @@ class CreateIssueContent:
     estimated_hours: typing.Optional[float] = None
     actual_hours: typing.Optional[float] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            key_id=raw["key_id"],
-            issue_type=IssueType.from_raw(raw["issueType"]),
-            summary=raw["summary"],
-            description=raw["description"],
-            status=Status.from_id(raw["status"]["id"]),
-            priority=(
-                Priority.from_id(raw["priority"]["id"])
-                if raw["priority"] and raw["priority"]["id"]
-                else None
-            ),
-            resolution=(
-                Resolution.from_id(raw["resolution"]["id"])
-                if raw["resolution"] and raw["resolution"]["id"]
-                else None
-            ),
-            parent_issue_id=raw.get("parentIssueId"),
-            start_date=_optional_date(raw["startDate"]),
-            due_date=_optional_date(raw["dueDate"]),
-            category=[Category.from_raw(c) for c in raw["category"]],
-            milestone=[Milestone.from_raw(m) for m in raw["milestone"]],
-            versions=[Version.from_raw(v) for v in raw["versions"]],
-            assignee=(
-                Assignee.from_raw(raw["assignee"]) if raw["assignee"] else None
-            ),
-            estimated_hours=raw.get("estimatedHours"),
-            actual_hours=raw.get("actualHours"),
-        )
-
 
 @dataclass
 class FieldInfo:
@@ -375,15 +440,15 @@ _field_map = {
 }
 
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("content", field_caps, "comment"),
+)
 @dataclass
 class Comment:
     id: int
     content: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(**raw)
-
 
 @dataclass
 class Change:
@@ -404,12 +469,12 @@ class Change:
             field=field_info.name,
             raw_field_name=field_name,
             old_value=(
-                field_info.str_func(raw["old_value"])
+                field_caps(field_info.str_func(raw["old_value"]), field_name)
                 if raw.get("old_value")
                 else None
             ),
             new_value=(
-                field_info.str_func(raw["new_value"])
+                field_caps(field_info.str_func(raw["new_value"]), field_name)
                 if raw.get("new_value")
                 else None
             ),
@@ -417,6 +482,12 @@ class Change:
         )
 
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.required("size"),
+    schema.required("dir"),
+)
 @dataclass
 class SharedFile:
     id: int
@@ -424,11 +495,18 @@ class SharedFile:
     size: int
     dir: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(**raw)
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("key_id", key="key_id"),
+    schema.required("summary"),
+    schema.required("description", field_caps, "description"),
+    schema.required("comment", Comment.from_raw, nullable=True),
+    schema.required("changes", Change.from_raw, many=True),
+    schema.optional(
+        "shared_files", SharedFile.from_raw, key="shared_files", many=True
+    ),
+)
 @dataclass
 class UpdateIssueContent:
     id: int
@@ -439,23 +517,14 @@ class UpdateIssueContent:
     changes: typing.List[Change] = field(default_factory=list)
     shared_files: typing.List[SharedFile] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            key_id=raw["key_id"],
-            summary=raw["summary"],
-            description=raw["description"],
-            comment=(
-                Comment.from_raw(raw["comment"]) if raw["comment"] else None
-            ),
-            changes=[Change.from_raw(c) for c in raw["changes"]],
-            shared_files=[
-                SharedFile.from_raw(s) for s in raw.get("shared_files", [])
-            ],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("key_id", key="key_id"),
+    schema.required("summary"),
+    schema.required("description", field_caps, "description"),
+    schema.required("comment", Comment.from_raw),
+)
 @dataclass
 class AddCommentContent:
     id: int
@@ -464,45 +533,36 @@ class AddCommentContent:
     description: str
     comment: typing.Optional[Comment]
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            key_id=raw["key_id"],
-            summary=raw["summary"],
-            description=raw["description"],
-            comment=Comment.from_raw(raw["comment"]),
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("key_id", key="key_id"),
+)
 @dataclass
 class DeleteIssueContent:
     id: int
     key_id: int
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            key_id=raw["key_id"],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.required("content", field_caps, "content"),
+)
 @dataclass
 class CreateWikiContent:
     id: int
     name: str
     content: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            content=raw["content"],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.required("content", field_caps, "content"),
+    schema.required("diff", field_caps, "diff"),
+    schema.required("version"),
+)
 @dataclass
 class UpdateWikiContent:
     id: int
@@ -511,73 +571,59 @@ class UpdateWikiContent:
     diff: str
     version: int
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            content=raw["content"],
-            diff=raw["diff"],
-            version=raw["version"],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.required("content", field_caps, "content"),
+)
 @dataclass
 class DeleteWikiContent:
     id: int
     name: str
     content: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            content=raw["content"],
-        )
-
 
+@schema.parsed(
+    schema.required("rev"),
+    schema.required("comment", field_caps, "comment"),
+)
 @dataclass
 class CommitSubversionContent:
     rev: int
     comment: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            rev=raw["rev"],
-            comment=raw["comment"],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.optional("description"),
+)
 @dataclass
 class Repository:
     id: int
     name: str
     description: typing.Optional[str] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            description=raw.get("description"),
-        )
-
 
+@schema.parsed(
+    schema.required("rev"),
+    schema.required("comment", field_caps, "comment"),
+)
 @dataclass
 class Revision:
     rev: str
     comment: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            rev=raw["rev"],
-            comment=raw["comment"],
-        )
-
 
+@schema.parsed(
+    schema.required("repository", Repository.from_raw),
+    schema.required("ref"),
+    schema.required("change_type", key="change_type"),
+    schema.required("revision_count", key="revision_count"),
+    schema.required("revision_type", key="revision_type"),
+    schema.required("revisions", Revision.from_raw, many=True),
+)
 @dataclass
 class PushGitContent:
     repository: Repository
@@ -587,102 +633,109 @@ class PushGitContent:
     revision_type: str
     revisions: typing.List[Revision] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            repository=Repository.from_raw(raw["repository"]),
-            ref=raw["ref"],
-            change_type=raw["change_type"],
-            revision_count=raw["revision_count"],
-            revision_type=raw["revision_type"],
-            revisions=[Revision.from_raw(r) for r in raw["revisions"]],
-        )
-
 
+@schema.parsed(
+    schema.required("repository", Repository.from_raw),
+)
 @dataclass
 class CreateGitContent:
     repository: Repository
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            repository=Repository.from_raw(raw["repository"]),
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("key_id", key="key_id"),
+    schema.required("title"),
+)
 @dataclass
 class Link:
     id: int
     key_id: int
     title: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            key_id=raw["key_id"],
-            title=raw["title"],
-        )
+
+class Links(typing.Sequence[Link]):
+    """The issues of a bulk update, parsed each time they are read.
+
+    A bulk update can list thousands of issues. Only their raw dicts are
+    kept, so that the renderer streams its pages without a second copy of
+    the list. Every link is still parsed once up front, so that a malformed
+    one fails the event.
+    """
+
+    def __init__(self, raw: typing.List[typing.Dict[str, typing.Any]]):
+        for item in raw:
+            Link.from_raw(item)
+        self._raw = raw
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Link.from_raw(item) for item in self._raw[index]]
+        return Link.from_raw(self._raw[index])
+
+    def __iter__(self) -> typing.Iterator[Link]:
+        return map(Link.from_raw, self._raw)
+
+    def __eq__(self, other: typing.Any) -> bool:
+        if not isinstance(other, collections.abc.Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"Links({list(self)!r})"
 
 
+@schema.parsed(
+    schema.required("tx_id", key="tx_id"),
+    schema.required("link", Links),
+    schema.required("changes", Change.from_raw, many=True),
+)
 @dataclass
 class BulkUpdateIssueContent:
     tx_id: str
-    link: typing.List[Link] = field(default_factory=list)
+    link: typing.Sequence[Link] = field(default_factory=list)
     changes: typing.List[Change] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            tx_id=raw["tx_id"],
-            link=[Link.from_raw(x) for x in raw["link"]],
-            changes=[Change.from_raw(c) for c in raw["changes"]],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("name"),
+    schema.optional("nulab_account", NulabAccount.from_raw),
+)
 @dataclass
 class User:
     id: int
     name: str
     nulab_account: typing.Optional[NulabAccount] = None
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            name=raw["name"],
-            nulab_account=(
-                NulabAccount.from_raw(raw["nulabAccount"])
-                if raw.get("nulabAccount")
-                else None
-            ),
-        )
-
 
+@schema.parsed(
+    schema.optional("comment"),
+    schema.required("users", User.from_raw, many=True),
+)
 @dataclass
 class JoinProjectContent:
     comment: typing.Optional[str] = None
     users: typing.List[User] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            comment=raw.get("comment"),
-            users=[User.from_raw(u) for u in raw["users"]],
-        )
-
 
+@schema.parsed(
+    schema.required("users", User.from_raw, many=True),
+)
 @dataclass
 class LeaveProjectContent:
     users: typing.List[User] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            users=[User.from_raw(u) for u in raw["users"]],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("key_id", key="key_id"),
+    schema.required("summary"),
+    schema.required("description"),
+)
 @dataclass
 class Issue:
     id: int
@@ -690,11 +743,25 @@ class Issue:
     summary: str
     description: str
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(**raw)
-
 
+def _pull_request_change(raw: typing.Dict[str, str]) -> Change:
+    return Change.from_raw(raw, status_as_pr=True)
+
+
+@schema.parsed(
+    schema.required("id"),
+    schema.required("number"),
+    schema.required("summary"),
+    schema.required("description", field_caps, "description"),
+    schema.required("repository", Repository.from_raw),
+    schema.required("base"),
+    schema.required("branch"),
+    schema.optional("comment", Comment.from_raw),
+    schema.optional("diff", field_caps, "diff"),
+    schema.optional("issue", Issue.from_raw),
+    schema.optional("assignee", Assignee.from_raw),
+    schema.required("changes", _pull_request_change, many=True),
+)
 @dataclass
 class CreatePullRequestContent:
     id: int
@@ -710,32 +777,21 @@ class CreatePullRequestContent:
     assignee: typing.Optional[Assignee] = None
     changes: typing.List[Change] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            number=raw["number"],
-            summary=raw["summary"],
-            description=raw["description"],
-            repository=Repository.from_raw(raw["repository"]),
-            base=raw["base"],
-            branch=raw["branch"],
-            comment=(
-                Comment.from_raw(raw["comment"]) if raw.get("comment") else None
-            ),
-            diff=raw.get("diff"),
-            issue=Issue.from_raw(raw["issue"]) if raw.get("issue") else None,
-            assignee=(
-                Assignee.from_raw(raw["assignee"])
-                if raw.get("assignee")
-                else None
-            ),
-            changes=[
-                Change.from_raw(c, status_as_pr=True) for c in raw["changes"]
-            ],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("number"),
+    schema.required("summary"),
+    schema.required("description", field_caps, "description"),
+    schema.required("repository", Repository.from_raw),
+    schema.required("base"),
+    schema.required("branch"),
+    schema.optional("comment", Comment.from_raw),
+    schema.optional("diff", field_caps, "diff"),
+    schema.optional("issue", Issue.from_raw),
+    schema.optional("assignee", Assignee.from_raw),
+    schema.required("changes", _pull_request_change, many=True),
+)
 @dataclass
 class UpdatePullRequestContent:
     id: int
@@ -751,32 +807,21 @@ class UpdatePullRequestContent:
     assignee: typing.Optional[Assignee] = None
     changes: typing.List[Change] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            number=raw["number"],
-            summary=raw["summary"],
-            description=raw["description"],
-            repository=Repository.from_raw(raw["repository"]),
-            base=raw["base"],
-            branch=raw["branch"],
-            comment=(
-                Comment.from_raw(raw["comment"]) if raw.get("comment") else None
-            ),
-            diff=raw.get("diff"),
-            issue=Issue.from_raw(raw["issue"]) if raw.get("issue") else None,
-            assignee=(
-                Assignee.from_raw(raw["assignee"])
-                if raw.get("assignee")
-                else None
-            ),
-            changes=[
-                Change.from_raw(c, status_as_pr=True) for c in raw["changes"]
-            ],
-        )
-
 
+@schema.parsed(
+    schema.required("id"),
+    schema.required("number"),
+    schema.required("summary"),
+    schema.required("description", field_caps, "description"),
+    schema.required("repository", Repository.from_raw),
+    schema.required("base"),
+    schema.required("branch"),
+    schema.optional("comment", Comment.from_raw),
+    schema.optional("diff", field_caps, "diff"),
+    schema.optional("issue", Issue.from_raw),
+    schema.optional("assignee", Assignee.from_raw),
+    schema.required("changes", _pull_request_change, many=True),
+)
 @dataclass
 class CommentPullRequestContent:
     id: int
@@ -792,30 +837,50 @@ class CommentPullRequestContent:
     assignee: typing.Optional[Assignee] = None
     changes: typing.List[Change] = field(default_factory=list)
 
-    @classmethod
-    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        return cls(
-            id=raw["id"],
-            number=raw["number"],
-            summary=raw["summary"],
-            description=raw["description"],
-            repository=Repository.from_raw(raw["repository"]),
-            base=raw["base"],
-            branch=raw["branch"],
-            comment=(
-                Comment.from_raw(raw["comment"]) if raw.get("comment") else None
-            ),
-            diff=raw.get("diff"),
-            issue=Issue.from_raw(raw["issue"]) if raw.get("issue") else None,
-            assignee=(
-                Assignee.from_raw(raw["assignee"])
-                if raw.get("assignee")
-                else None
-            ),
-            changes=[
-                Change.from_raw(c, status_as_pr=True) for c in raw["changes"]
-            ],
-        )
+
+CONTENT_CLASSES: typing.Dict[EventType, typing.Any] = {
+    EventType.CREATE_ISSUE: CreateIssueContent,
+    EventType.UPDATE_ISSUE: UpdateIssueContent,
+    EventType.ADD_COMMENT: AddCommentContent,
+    EventType.DELETE_ISSUE: DeleteIssueContent,
+    EventType.CREATE_WIKI: CreateWikiContent,
+    EventType.UPDATE_WIKI: UpdateWikiContent,
+    EventType.DELETE_WIKI: DeleteWikiContent,
+    EventType.COMMIT_SUBVERSION: CommitSubversionContent,
+    EventType.PUSH_GIT: PushGitContent,
+    EventType.CREATE_GIT: CreateGitContent,
+    EventType.BULK_UPDATE_ISSUE: BulkUpdateIssueContent,
+    EventType.JOIN_PROJECT: JoinProjectContent,
+    EventType.LEAVE_PROJECT: LeaveProjectContent,
+    EventType.CREATE_PULL_REQUEST: CreatePullRequestContent,
+    EventType.UPDATE_PULL_REQUEST: UpdatePullRequestContent,
+    EventType.COMMENT_PULL_REQUEST: CommentPullRequestContent,
+}
+
+# content parsers by the raw value of their event type
+_content_parsers = {
+    event_type.value: (event_type, content_class.from_raw)
+    for event_type, content_class in CONTENT_CLASSES.items()
+}
+
+# what indexing and converting the fields of a malformed payload raises.
+# Parsers index the raw dicts directly and leave validation to catching
+# these, so that well-formed events pay nothing for it.
+PARSE_ERRORS = (
+    KeyError,
+    IndexError,
+    TypeError,
+    ValueError,
+    AttributeError,
+    OverflowError,
+)
+
+
+def _describe(raw: typing.Any, error: Exception) -> str:
+    event_type = raw.get("type") if isinstance(raw, dict) else None
+    if isinstance(error, KeyError):
+        return f"event of type `{event_type}` is missing {error}"
+    return f"event of type `{event_type}` is malformed: {error!r}"
 
 
 @dataclass
@@ -846,154 +911,143 @@ class WebhookEvent:
 
     @classmethod
     def from_raw(cls, raw: typing.Dict[str, typing.Any]):
-        event_type = EventType(raw["type"])
+        """Parse a webhook event.
+
+        Raises UnsupportedEventType for the events without a content
+        class, and InvalidPayload when a field is missing or malformed.
+        """
+        try:
+            return cls._from_raw(raw)
+        except PARSE_ERRORS as e:
+            raise InvalidPayload(_describe(raw, e)) from e
+
+    @classmethod
+    def _from_raw(cls, raw: typing.Dict[str, typing.Any]):
+        content_parser = _content_parsers.get(raw["type"])
+        if content_parser is None:
+            raise UnsupportedEventType(
+                f"event type `{raw['type']}` is not supported"
+            )
+        event_type, parse_content = content_parser
         return cls(
             id=raw["id"],
             type=event_type,
-            created=datetime.fromisoformat(raw["created"][:-1] + "+00:00"),
+            created=_parse_timestamp(raw["created"]),
             created_user=CreatedUser.from_raw(raw["createdUser"]),
-            content=cls._content_map(event_type, raw["content"]),
+            content=parse_content(raw["content"]),
             project=(
                 Project.from_raw(raw["project"]) if raw.get("project") else None
             ),
         )
 
-    @classmethod
-    def _content_map(
-        cls,
-        event_type: EventType,
-        raw_content: typing.Dict[str, typing.Any],
-    ) -> typing.Union[
-        CreateIssueContent,
-        UpdateIssueContent,
-        AddCommentContent,
-        DeleteIssueContent,
-        CreateWikiContent,
-        UpdateWikiContent,
-        DeleteWikiContent,
-        CommitSubversionContent,
-        PushGitContent,
-        CreateGitContent,
-        BulkUpdateIssueContent,
-        JoinProjectContent,
-        LeaveProjectContent,
-        CreatePullRequestContent,
-        UpdatePullRequestContent,
-        CommentPullRequestContent,
-    ]:
-        try:
-            return {
-                EventType.CREATE_ISSUE: CreateIssueContent,
-                EventType.UPDATE_ISSUE: UpdateIssueContent,
-                EventType.ADD_COMMENT: AddCommentContent,
-                EventType.DELETE_ISSUE: DeleteIssueContent,
-                EventType.CREATE_WIKI: CreateWikiContent,
-                EventType.UPDATE_WIKI: UpdateWikiContent,
-                EventType.DELETE_WIKI: DeleteWikiContent,
-                EventType.COMMIT_SUBVERSION: CommitSubversionContent,
-                EventType.PUSH_GIT: PushGitContent,
-                EventType.CREATE_GIT: CreateGitContent,
-                EventType.BULK_UPDATE_ISSUE: BulkUpdateIssueContent,
-                EventType.JOIN_PROJECT: JoinProjectContent,
-                EventType.LEAVE_PROJECT: LeaveProjectContent,
-                EventType.CREATE_PULL_REQUEST: CreatePullRequestContent,
-                EventType.UPDATE_PULL_REQUEST: UpdatePullRequestContent,
-                EventType.COMMENT_PULL_REQUEST: CommentPullRequestContent,
-            }[event_type].from_raw(raw_content)
-        except KeyError:
-            raise UnsupportedEventType(
-                f"event type `{event_type.value}` is not supported"
-            )
-
     @property
     def issue_key(self) -> str:
-        if self.type not in [
-            EventType.CREATE_ISSUE,
-            EventType.UPDATE_ISSUE,
-            EventType.ADD_COMMENT,
-            EventType.DELETE_ISSUE,
-        ]:
+        if self.type not in _ISSUE_TYPES:
             raise AttributeError(
                 f"issue_key is not supported in type `{self.type}`"
             )
         return f"{self.project.project_key}-{self.content.key_id}"
 
+    def urls(self, base_url: str) -> BacklogUrls:
+        project_key = self.project.project_key if self.project else ""
+        return backlog_urls.for_project(base_url, project_key)
+
     def issue_link(self, base_url: str) -> str:
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/view/{self.issue_key}"
+        if self.type not in _ISSUE_TYPES:
+            raise AttributeError(
+                f"issue_key is not supported in type `{self.type}`"
+            )
+        return self.urls(base_url).issue(self.content.key_id)
 
     def issue_comment_link(self, base_url: str) -> str:
-        if self.type not in [EventType.UPDATE_ISSUE, EventType.ADD_COMMENT]:
+        if self.type not in _ISSUE_COMMENT_TYPES:
             raise AttributeError(
-                "issue_comment_link is not supported in type `{self.type}`"
+                f"issue_comment_link is not supported in type `{self.type}`"
             )
-        return f"{self.issue_link(base_url)}#comment-{self.content.comment.id}"
+        return self.urls(base_url).issue_comment(
+            self.content.key_id, self.content.comment.id
+        )
 
     def shared_file_link(self, base_url: str, shared_file: SharedFile) -> str:
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/ViewSharedFile.action?projectKey={self.project.project_key}&sharedFileId={shared_file.id}"  # noqa
+        return self.urls(base_url).shared_file(shared_file.id)
 
     def wiki_link(self, base_url: str) -> str:
-        if self.type not in [EventType.CREATE_WIKI, EventType.UPDATE_WIKI]:
+        if self.type not in _WIKI_TYPES:
             raise AttributeError(f"wiki_link is not supported in `{self.type}`")
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/alias/wiki/{self.content.id}"
+        return self.urls(base_url).wiki(self.content.id)
 
     def wiki_diff_link(self, base_url: str) -> str:
-        if self.type not in [EventType.UPDATE_WIKI]:
+        if self.type is not EventType.UPDATE_WIKI:
             raise AttributeError(f"wiki_link is not supported in `{self.type}`")
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/alias/wiki/diff/{self.content.id}/{self.content.version - 1}...{self.content.version}"  # noqa
+        return self.urls(base_url).wiki_diff(
+            self.content.id, self.content.version
+        )
 
     def subversion_commit_link(self, base_url: str) -> str:
-        if self.type not in [EventType.COMMIT_SUBVERSION]:
+        if self.type is not EventType.COMMIT_SUBVERSION:
             raise AttributeError(
                 f"subversion_commit_link is not supported in `{self.type}`"
             )
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/rev/{self.project.project_key}/{self.content.rev}"
+        return self.urls(base_url).subversion_commit(self.content.rev)
 
     def git_repository_link(self, base_url: str) -> str:
-        if self.type not in [EventType.PUSH_GIT, EventType.CREATE_GIT]:
+        if self.type not in _GIT_TYPES:
             raise AttributeError(
                 f"git_repository_link is not supported in `{self.type}`"
             )
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/git/{self.project.project_key}/{self.content.repository.name}"  # noqa
+        return self.urls(base_url).git_repository(self.content.repository.name)
 
     def git_branch_link(self, base_url: str) -> str:
-        if self.type not in [EventType.PUSH_GIT]:
+        if self.type is not EventType.PUSH_GIT:
             raise AttributeError(
                 f"git_branch_link is not supported in `{self.type}`"
             )
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/git/{self.project.project_key}/{self.content.repository.name}/tree/{self.content.ref.split('/')[-1]}"  # noqa
+        return self.urls(base_url).git_branch(
+            self.content.repository.name, self.content.ref
+        )
 
     def git_commit_link(self, base_url: str, revision: Revision) -> str:
-        if self.type not in [EventType.PUSH_GIT]:
+        if self.type is not EventType.PUSH_GIT:
             raise AttributeError(
                 f"git_commit_link is not supported in `{self.type}`"
             )
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/git/{self.project.project_key}/{self.content.repository.name}/commit/{revision.rev}"  # noqa
+        return self.urls(base_url).git_commit(
+            self.content.repository.name, revision.rev
+        )
 
     def pull_request_link(self, base_url: str) -> str:
-        if self.type not in [
-            EventType.CREATE_PULL_REQUEST,
-            EventType.UPDATE_PULL_REQUEST,
-            EventType.COMMENT_PULL_REQUEST,
-        ]:
+        if self.type not in _PULL_REQUEST_TYPES:
             raise AttributeError(
                 f"pull_request_link is not supported in `{self.type}`"
             )
-        if base_url.endswith("/"):
-            base_url = base_url[:-1]
-        return f"{base_url}/git/{self.project.project_key}/{self.content.repository.name}/pullRequests/{self.content.number}"  # noqa
+        return self.urls(base_url).pull_request(
+            self.content.repository.name, self.content.number
+        )
+
+    def link(self, base_url: str) -> typing.Optional[str]:
+        """The Backlog page of the event, i.e. the page its card opens.
+
+        Falls back to the project for the events whose subject has no page
+        left (deleted issues and wikis) or spans a project, and is None
+        for the events without a project.
+        """
+        if self.project is None:
+            return None
+        if self.type in _ISSUE_COMMENT_TYPES and self.content.comment:
+            return self.issue_comment_link(base_url)
+        if (
+            self.type in _ISSUE_TYPES
+            and self.type is not EventType.DELETE_ISSUE
+        ):
+            return self.issue_link(base_url)
+        if self.type in _WIKI_TYPES:
+            return self.wiki_link(base_url)
+        if self.type is EventType.COMMIT_SUBVERSION:
+            return self.subversion_commit_link(base_url)
+        if self.type is EventType.PUSH_GIT:
+            return self.git_branch_link(base_url)
+        if self.type in _GIT_TYPES:
+            return self.git_repository_link(base_url)
+        if self.type in _PULL_REQUEST_TYPES:
+            return self.pull_request_link(base_url)
+        return self.project.project_link(base_url)
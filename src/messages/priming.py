@@ -0,0 +1,86 @@
+"""Warm the function up before it serves its first webhook.
+
+Provisioned concurrency runs the init phase ahead of traffic, so the
+module imports, the handler code paths and a pooled connection to the
+Google Chat API are all set up there. With SnapStart the same work runs
+before the snapshot is taken, and pooled connections, which do not
+survive a restore, are dropped afterwards.
+"""
+
+import os
+import typing
+
+import card_budget
+from gchat_client import GoogleChatClient
+from webhook import WebhookApp
+
+PRIMING_BASE_URL = "https://example.backlog.com"
+
+_created_user = {"id": 1, "name": "priming", "roleType": 1}
+_project = {"id": 1, "projectKey": "PRIMING", "name": "priming"}
+SAMPLE_EVENTS: typing.List[typing.Dict[str, typing.Any]] = [
+    {
+        "id": 1,
+        "type": 2,
+        "created": "2021-10-01T00:00:00Z",
+        "createdUser": _created_user,
+        "project": _project,
+        "content": {
+            "id": 1,
+            "key_id": 1,
+            "summary": "priming",
+            "description": "priming",
+            "comment": {"id": 1, "content": "priming"},
+            "changes": [
+                {"field": "status", "old_value": "1", "new_value": "2"},
+                {"field": "description", "old_value": "a", "new_value": "b"},
+            ],
+        },
+    },
+    {
+        "id": 2,
+        "type": 3,
+        "created": "2021-10-01T00:00:00Z",
+        "createdUser": _created_user,
+        "project": _project,
+        "content": {
+            "id": 1,
+            "key_id": 1,
+            "summary": "priming",
+            "description": "priming",
+            "comment": {"id": 2, "content": "priming"},
+        },
+    },
+]
+
+
+def initialization_type() -> str:
+    return os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE", "on-demand")
+
+
+def prime(webhook: WebhookApp) -> None:
+    """Parse, render and encode sample events without sending them."""
+    for raw in SAMPLE_EVENTS:
+        event = webhook.parse(raw)
+        rendered = webhook.render(event, PRIMING_BASE_URL)
+        messages = [rendered] if isinstance(rendered, dict) else rendered
+        link = event.link(PRIMING_BASE_URL)
+        for message in messages:
+            card_budget.fit(message, link=link)
+
+
+def register(webhook: WebhookApp, chat_client: GoogleChatClient) -> None:
+    init_type = initialization_type()
+    if init_type == "provisioned-concurrency":
+        prime(webhook)
+        chat_client.warm_up()
+    elif init_type == "snap-start":
+        try:
+            from snapshot_restore_py import (
+                register_after_restore,
+                register_before_snapshot,
+            )
+        except ImportError:
+            return
+        register_before_snapshot(lambda: prime(webhook))
+        register_after_restore(chat_client.reset)
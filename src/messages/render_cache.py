@@ -0,0 +1,99 @@
+import collections
+import hashlib
+import json
+import os
+import typing
+
+# bump when a change to the handlers or card_budget changes the cards, so
+# that messages encoded by an older renderer are never reused
+RENDERER_VERSION = 2
+
+CacheKey = typing.Tuple[typing.Any, ...]
+
+
+def key(
+    body: typing.Dict[str, typing.Any], base_url: str, max_message_bytes: int
+) -> typing.Optional[CacheKey]:
+    """The cache key of a Backlog event, or None when it has no id.
+
+    Event ids are unique within a Backlog space only, and nothing stops
+    another sender from reusing one, so the key holds a digest of the
+    whole event along with the base URL of the space and the inputs of
+    the encoding. The digest is taken over the canonical JSON of the
+    event, so the copies posted to each space of its webhooks share it.
+    """
+    event_id = body.get("id")
+    if type(event_id) is not int:
+        return None
+    canonical = json.dumps(
+        body, ensure_ascii=False, separators=(",", ":"), sort_keys=True
+    )
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=16)
+    return (
+        event_id,
+        digest.digest(),
+        RENDERER_VERSION,
+        base_url,
+        max_message_bytes,
+    )
+
+
+class RenderCache:
+    """Encoded messages of the recently rendered events.
+
+    Entries are evicted least recently used first once there are more
+    than ``max_entries`` of them or their messages take more than
+    ``max_bytes``. A cache with ``max_entries`` of 0 stores nothing.
+    """
+
+    def __init__(
+        self, max_entries: int = 256, max_bytes: int = 8_388_608
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: typing.OrderedDict[
+            CacheKey, typing.Tuple[bytes, ...]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> typing.Optional[typing.Tuple[bytes, ...]]:
+        messages = self._entries.get(key)
+        if messages is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return messages
+
+    def put(self, key: CacheKey, messages: typing.Sequence[bytes]) -> None:
+        size = sum(len(data) for data in messages)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= sum(len(data) for data in previous)
+        self._entries[key] = tuple(messages)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (
+            self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= sum(len(data) for data in evicted)
+
+
+def from_environ(
+    environ: typing.Mapping[str, str] = os.environ,
+) -> RenderCache:
+    """Build the render cache of the function.
+
+    ``RENDER_CACHE_SIZE`` of 0 disables the cache.
+    """
+    return RenderCache(
+        max_entries=int(environ.get("RENDER_CACHE_SIZE", "256")),
+        max_bytes=int(environ.get("RENDER_CACHE_BYTES", "8388608")),
+    )
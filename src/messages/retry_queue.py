@@ -0,0 +1,89 @@
+import itertools
+import json
+import os
+import typing
+from dataclasses import dataclass
+
+import boto3
+
+
+@dataclass
+class SpilledMessage:
+    """A rendered message waiting in the retry queue."""
+
+    path: str
+    query: typing.Dict[str, str]
+    body: bytes
+
+    @classmethod
+    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
+        return cls(
+            path=raw["path"],
+            query=raw["query"],
+            body=raw["body"].encode("utf-8"),
+        )
+
+    def to_raw(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "path": self.path,
+            "query": self.query,
+            "body": self.body.decode("utf-8"),
+        }
+
+
+class RetryQueue:
+    """SQS FIFO queue of messages that could not be sent in time.
+
+    Messages of a space share a message group, so the retry handler
+    receives them in the order they were rendered.
+    """
+
+    def __init__(self, queue_url: str, client: typing.Any = None) -> None:
+        self.queue_url = queue_url
+        self.client = client or boto3.client("sqs")
+
+    def spill(
+        self,
+        messages: typing.Iterable[SpilledMessage],
+        group_id: str,
+        deduplication_id: str,
+    ) -> int:
+        """Send the messages in order and return how many were sent.
+
+        The messages are consumed lazily, a batch at a time.
+        """
+        messages = iter(messages)
+        count = 0
+        # SendMessageBatch takes at most 10 entries
+        while True:
+            entries = [
+                {
+                    "Id": str(i),
+                    "MessageBody": json.dumps(
+                        message.to_raw(), ensure_ascii=False
+                    ),
+                    "MessageGroupId": group_id,
+                    "MessageDeduplicationId": f"{deduplication_id}-{i}",
+                }
+                for i, message in enumerate(
+                    itertools.islice(messages, 10), start=count
+                )
+            ]
+            if not entries:
+                return count
+            response = self.client.send_message_batch(
+                QueueUrl=self.queue_url, Entries=entries
+            )
+            if response.get("Failed"):
+                raise RuntimeError(
+                    f"could not spill messages: {response['Failed']}"
+                )
+            count += len(entries)
+
+
+def from_environ(
+    environ: typing.Mapping[str, str] = os.environ,
+) -> typing.Optional[RetryQueue]:
+    if not environ.get("RETRY_QUEUE_URL"):
+        return None
+    return RetryQueue(environ["RETRY_QUEUE_URL"])
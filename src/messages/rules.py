@@ -0,0 +1,285 @@
+import functools
+import json
+import re
+import typing
+from dataclasses import dataclass
+
+from events import EventType
+
+ANY_SPACE = "*"
+DELIVER = "deliver"
+DIGEST = "digest"
+DROP = "drop"
+
+Predicate = typing.Callable[[typing.Dict[str, typing.Any]], bool]
+
+# ``Change.raw_field_name`` of the pull request status
+_PULL_REQUEST_TYPES = frozenset(
+    event_type.value
+    for event_type in [
+        EventType.CREATE_PULL_REQUEST,
+        EventType.UPDATE_PULL_REQUEST,
+        EventType.COMMENT_PULL_REQUEST,
+    ]
+)
+
+
+def _get(raw: typing.Any, key: str) -> typing.Any:
+    return raw.get(key) if isinstance(raw, dict) else None
+
+
+def _str(value: typing.Any) -> typing.Optional[str]:
+    # raw values are tested against sets, which unhashable values such as
+    # lists or dicts would fail with TypeError
+    return value if isinstance(value, str) else None
+
+
+def _issue_types(names: typing.FrozenSet[str]) -> Predicate:
+    return lambda raw: (
+        _str(_get(_get(raw.get("content"), "issueType"), "name")) in names
+    )
+
+
+def _assignees(users: typing.FrozenSet[str]) -> Predicate:
+    def matches(raw: typing.Dict[str, typing.Any]) -> bool:
+        assignee = _get(raw.get("content"), "assignee")
+        if not isinstance(assignee, dict):
+            return False
+        return (
+            _str(assignee.get("name")) in users
+            or str(assignee.get("userId")) in users
+        )
+
+    return matches
+
+
+def _changed_field_names(
+    raw: typing.Dict[str, typing.Any],
+) -> typing.Optional[typing.List[typing.Optional[str]]]:
+    changes = _get(raw.get("content"), "changes")
+    if not isinstance(changes, list):
+        return None
+    pull_request = raw.get("type") in _PULL_REQUEST_TYPES
+    names = []
+    for change in changes:
+        field_name = _str(_get(change, "field"))
+        if pull_request and field_name == "status":
+            field_name = "pullRequestStatus"
+        names.append(field_name)
+    return names
+
+
+def _changed_fields(fields: typing.FrozenSet[str]) -> Predicate:
+    def matches(raw: typing.Dict[str, typing.Any]) -> bool:
+        names = _changed_field_names(raw)
+        return names is not None and any(name in fields for name in names)
+
+    return matches
+
+
+def _only_changed_fields(fields: typing.FrozenSet[str]) -> Predicate:
+    def matches(raw: typing.Dict[str, typing.Any]) -> bool:
+        names = _changed_field_names(raw)
+        return bool(names) and all(name in fields for name in names)
+
+    return matches
+
+
+def _summary(pattern: typing.Pattern[str]) -> Predicate:
+    def matches(raw: typing.Dict[str, typing.Any]) -> bool:
+        summary = _get(raw.get("content"), "summary")
+        return isinstance(summary, str) and bool(pattern.search(summary))
+
+    return matches
+
+
+def _all_of(predicates: typing.List[Predicate]) -> Predicate:
+    if not predicates:
+        return lambda raw: True
+    if len(predicates) == 1:
+        return predicates[0]
+    first, rest = predicates[0], _all_of(predicates[1:])
+    return lambda raw: first(raw) and rest(raw)
+
+
+def _frozenset(value: typing.Any) -> typing.Optional[typing.FrozenSet[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    return frozenset(str(v) for v in value)
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Matches events when every given condition holds.
+
+    Lists match when any of their values does, except
+    ``only_changed_fields`` that matches when every changed field is one of
+    them. ``summary`` is a regular expression searched in the summary of
+    issues and pull requests.
+    """
+
+    action: str = DROP
+    event_types: typing.Optional[typing.FrozenSet[EventType]] = None
+    project_keys: typing.Optional[typing.FrozenSet[str]] = None
+    issue_types: typing.Optional[typing.FrozenSet[str]] = None
+    assignees: typing.Optional[typing.FrozenSet[str]] = None
+    changed_fields: typing.Optional[typing.FrozenSet[str]] = None
+    only_changed_fields: typing.Optional[typing.FrozenSet[str]] = None
+    summary: typing.Optional[str] = None
+
+    @classmethod
+    def from_raw(cls, raw: typing.Dict[str, typing.Any]):
+        action = raw.get("action", DROP)
+        if action not in (DELIVER, DIGEST, DROP):
+            raise ValueError(f"unknown rule action `{action}`")
+        event_types = _frozenset(raw.get("event_types"))
+        return cls(
+            action=action,
+            event_types=(
+                frozenset(EventType[name] for name in event_types)
+                if event_types is not None
+                else None
+            ),
+            project_keys=_frozenset(raw.get("project_keys")),
+            issue_types=_frozenset(raw.get("issue_types")),
+            assignees=_frozenset(raw.get("assignees")),
+            changed_fields=_frozenset(raw.get("changed_fields")),
+            only_changed_fields=_frozenset(raw.get("only_changed_fields")),
+            summary=raw.get("summary"),
+        )
+
+    def compile(self) -> Predicate:
+        """The conditions other than ``event_types`` and ``project_keys``,
+        which ``RuleSet`` uses to index the rules."""
+        predicates = []
+        if self.issue_types is not None:
+            predicates.append(_issue_types(self.issue_types))
+        if self.assignees is not None:
+            predicates.append(_assignees(self.assignees))
+        if self.changed_fields is not None:
+            predicates.append(_changed_fields(self.changed_fields))
+        if self.only_changed_fields is not None:
+            predicates.append(_only_changed_fields(self.only_changed_fields))
+        if self.summary is not None:
+            predicates.append(_summary(re.compile(self.summary)))
+        return _all_of(predicates)
+
+
+_CompiledRules = typing.Tuple[typing.Tuple[Predicate, str], ...]
+# compiled rules by project key, ``None`` for the other projects
+_ProjectIndex = typing.Dict[typing.Optional[str], _CompiledRules]
+
+
+class RuleSet:
+    """Rules of each space, evaluated on the raw event before parsing.
+
+    The rules of a space are followed by the rules of ``"*"``, and the
+    first matching rule decides whether the event is delivered, dropped or
+    added to the digest of the space. Events that match no rule are
+    delivered.
+
+    Rules are compiled to predicates once and indexed by event type and
+    project key, so an event is only checked against the rules that can
+    match its type and project.
+    """
+
+    def __init__(self, rules: typing.Dict[str, typing.List[Rule]]) -> None:
+        self.rules = rules
+        compiled = {
+            id(rule): (rule.compile(), rule.action)
+            for space_rules in rules.values()
+            for rule in space_rules
+        }
+        shared = rules.get(ANY_SPACE, [])
+        self._default = self._index(shared, compiled)
+        self._spaces = {
+            space_id: self._index(space_rules + shared, compiled)
+            for space_id, space_rules in rules.items()
+            if space_id != ANY_SPACE
+        }
+
+    @classmethod
+    def _index(
+        cls,
+        rules: typing.List[Rule],
+        compiled: typing.Dict[int, typing.Tuple[Predicate, str]],
+    ) -> typing.Dict[typing.Optional[int], _ProjectIndex]:
+        index = {
+            event_type.value: cls._index_projects(
+                [
+                    rule
+                    for rule in rules
+                    if rule.event_types is None
+                    or event_type in rule.event_types
+                ],
+                compiled,
+            )
+            for event_type in EventType
+        }
+        # unknown event types only match rules without event types
+        index[None] = cls._index_projects(
+            [rule for rule in rules if rule.event_types is None], compiled
+        )
+        return index
+
+    @staticmethod
+    def _index_projects(
+        rules: typing.List[Rule],
+        compiled: typing.Dict[int, typing.Tuple[Predicate, str]],
+    ) -> _ProjectIndex:
+        buckets: typing.Dict[
+            typing.Optional[str], typing.List[typing.Tuple[Predicate, str]]
+        ] = {None: []}
+        for rule in rules:
+            for key in rule.project_keys or ():
+                buckets.setdefault(key, [])
+        for rule in rules:
+            keys = buckets if rule.project_keys is None else rule.project_keys
+            for key in keys:
+                buckets[key].append(compiled[id(rule)])
+        return {key: tuple(bucket) for key, bucket in buckets.items()}
+
+    def allows(self, space_id: str, raw: typing.Dict[str, typing.Any]) -> bool:
+        return self.action(space_id, raw) != DROP
+
+    def action(self, space_id: str, raw: typing.Dict[str, typing.Any]) -> str:
+        index = self._spaces.get(space_id, self._default)
+        event_type = raw.get("type")
+        projects = index.get(event_type) if type(event_type) is int else None
+        if projects is None:
+            projects = index[None]
+        project_key = _get(raw.get("project"), "projectKey")
+        candidates = (
+            projects.get(project_key) if type(project_key) is str else None
+        )
+        for matches, action in (
+            candidates if candidates is not None else projects[None]
+        ):
+            if matches(raw):
+                return action
+        return DELIVER
+
+
+@functools.lru_cache(maxsize=64)
+def _compile(key: str) -> RuleSet:
+    return RuleSet(
+        {
+            space_id: [Rule.from_raw(rule) for rule in space_rules]
+            for space_id, space_rules in json.loads(key).items()
+        }
+    )
+
+
+def compile_rules(
+    raw: typing.Optional[typing.Dict[str, typing.List[typing.Dict]]],
+) -> typing.Optional[RuleSet]:
+    """Compile the ``rules`` of a tenant config.
+
+    Rule sets are cached by their content, so reloading an unchanged
+    config does not compile its rules again.
+    """
+    if not raw:
+        return None
+    return _compile(json.dumps(raw, sort_keys=True, ensure_ascii=False))
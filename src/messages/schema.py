@@ -0,0 +1,193 @@
+"""Parsers generated from declarative field schemas.
+
+A model lists how each of its fields is read from the raw payload::
+
+    @schema.parsed(
+        schema.required("id"),
+        schema.required("role_type"),
+        schema.optional("nulab_account", NulabAccount.from_raw),
+    )
+    @dataclass
+    class CreatedUser:
+        ...
+
+``parsed`` generates the source of a ``from_raw`` specialized to these
+fields, much like ``dataclasses`` generates ``__init__``: keys are
+constants, converters are bound once when the model is defined, and the
+model is called with positional arguments. Well-formed payloads go
+through straight-line code; malformed ones fail on the indexing or the
+conversion, as the hand-written parsers did.
+"""
+
+import dataclasses
+import typing
+
+_Converter = typing.Callable[..., typing.Any]
+_LITERALS = (type(None), bool, int, float, str)
+
+
+@dataclasses.dataclass(frozen=True)
+class Field:
+    """How a field of a model is read from the raw payload.
+
+    ``convert`` is called with the raw value followed by ``args``.
+    Required fields fail on a missing key; with ``nullable``, a falsy
+    value parses to None without being converted. Optional fields
+    without a converter parse to the raw value or ``default``; with one,
+    a missing or falsy value parses to ``default``. ``many`` converts
+    each item of a list.
+    """
+
+    name: str
+    key: str
+    convert: typing.Optional[_Converter] = None
+    args: typing.Tuple[typing.Any, ...] = ()
+    required: bool = True
+    nullable: bool = False
+    many: bool = False
+    default: typing.Any = None
+
+
+def camel_case(name: str) -> str:
+    head, *tail = name.split("_")
+    return head + "".join(word.capitalize() for word in tail)
+
+
+def required(
+    name: str,
+    convert: typing.Optional[_Converter] = None,
+    *args: typing.Any,
+    key: typing.Optional[str] = None,
+    nullable: bool = False,
+    many: bool = False,
+) -> Field:
+    return Field(
+        name=name,
+        key=camel_case(name) if key is None else key,
+        convert=convert,
+        args=args,
+        nullable=nullable,
+        many=many,
+    )
+
+
+def optional(
+    name: str,
+    convert: typing.Optional[_Converter] = None,
+    *args: typing.Any,
+    key: typing.Optional[str] = None,
+    many: bool = False,
+    default: typing.Any = None,
+) -> Field:
+    return Field(
+        name=name,
+        key=camel_case(name) if key is None else key,
+        convert=convert,
+        args=args,
+        required=False,
+        many=many,
+        default=default,
+    )
+
+
+def _literal(value: typing.Any) -> typing.Optional[str]:
+    if type(value) in _LITERALS:
+        return repr(value)
+    return None
+
+
+class _Source:
+    """Source of a parser and the values it closes over."""
+
+    def __init__(self) -> None:
+        self.lines: typing.List[str] = []
+        self.bindings: typing.Dict[str, typing.Any] = {}
+
+    def bind(self, prefix: str, value: typing.Any) -> str:
+        literal = _literal(value)
+        if literal is not None:
+            return literal
+        name = f"{prefix}{len(self.bindings)}"
+        self.bindings[name] = value
+        return name
+
+    def field(self, index: int, spec: Field) -> str:
+        """Add the statements reading ``spec``, return the expression of
+        its value."""
+        key = repr(spec.key)
+        if spec.convert is None:
+            if spec.required:
+                return f"raw[{key}]"
+            return f"get({key}, {self.bind('d', spec.default)})"
+
+        convert = self.bind("c", spec.convert)
+        args = "".join(f", {self.bind('a', arg)}" for arg in spec.args)
+        value = f"v{index}"
+        if spec.many:
+            converted = f"[{convert}(item{args}) for item in {value}]"
+            empty = "[]"
+        else:
+            converted = f"{convert}({value}{args})"
+            empty = self.bind("d", spec.default)
+
+        if spec.required and not spec.nullable:
+            if spec.many:
+                return f"[{convert}(item{args}) for item in raw[{key}]]"
+            return f"{convert}(raw[{key}]{args})"
+        if spec.required:
+            self.lines.append(f"{value} = raw[{key}]")
+        else:
+            self.lines.append(f"{value} = get({key})")
+        return f"{converted} if {value} else {empty}"
+
+
+def compile_parser(
+    cls: typing.Any, fields: typing.Sequence[Field]
+) -> typing.Callable[[typing.Dict[str, typing.Any]], typing.Any]:
+    """Generate the parser of the dataclass ``cls`` from its schema."""
+    specs = {spec.name: spec for spec in fields}
+    names = [field.name for field in dataclasses.fields(cls) if field.init]
+    if len(specs) != len(fields) or set(specs) != set(names):
+        raise TypeError(
+            f"schema of {cls.__name__} does not match its fields: "
+            f"{sorted(specs)} != {sorted(names)}"
+        )
+
+    source = _Source()
+    values = [
+        source.field(index, specs[name]) for index, name in enumerate(names)
+    ]
+    if any(not spec.required for spec in fields):
+        source.lines.insert(0, "get = raw.get")
+    body = "".join(f"        {line}\n" for line in source.lines)
+    arguments = "".join(f"            {value},\n" for value in values)
+    parameters = ", ".join(["cls", *source.bindings])
+    text = (
+        f"def make({parameters}):\n"
+        f"    def from_raw(raw):\n"
+        f"{body}"
+        f"        return cls(\n"
+        f"{arguments}"
+        f"        )\n"
+        f"    return from_raw\n"
+    )
+
+    namespace: typing.Dict[str, typing.Any] = {}
+    exec(compile(text, f"<schema of {cls.__name__}>", "exec"), namespace)
+    parser = namespace["make"](cls, **source.bindings)
+    parser.__qualname__ = f"{cls.__qualname__}.from_raw"
+    parser.__module__ = cls.__module__
+    parser.__doc__ = f"Parse a {cls.__name__} from its raw payload."
+    return parser
+
+
+def parsed(*fields: Field) -> typing.Callable[[typing.Any], typing.Any]:
+    """Class decorator giving a dataclass the ``from_raw`` generated from
+    its schema, and the schema itself as ``__schema__``."""
+
+    def decorate(cls: typing.Any) -> typing.Any:
+        cls.__schema__ = fields
+        cls.from_raw = staticmethod(compile_parser(cls, fields))
+        return cls
+
+    return decorate
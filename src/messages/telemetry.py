@@ -0,0 +1,139 @@
+import contextlib
+import os
+import time
+import typing
+
+from aws_lambda_powertools import Metrics, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
+from events import EventType
+from gchat_client import HttpTimings
+
+NAMESPACE = os.environ.get("POWERTOOLS_METRICS_NAMESPACE", "BacklogGoogleChat")
+OTHER_SPACES = "other"
+
+
+class RollupMetrics(Metrics):
+    """Metrics that also publish service and event type rollups.
+
+    EMF allows several dimension sets per record, so one flush yields the
+    per space and event type series plus aggregates usable by alarms.
+    """
+
+    def serialize_metric_set(self, *args, **kwargs) -> typing.Dict:
+        emf = super().serialize_metric_set(*args, **kwargs)
+        for directive in emf["_aws"]["CloudWatchMetrics"]:
+            keys = directive["Dimensions"][0]
+            dimension_sets = []
+            for rollup in [["service"], ["service", "EventType"], keys]:
+                dimension_set = [key for key in rollup if key in keys]
+                if dimension_set and dimension_set not in dimension_sets:
+                    dimension_sets.append(dimension_set)
+            directive["Dimensions"] = dimension_sets
+        return emf
+
+
+class SpaceDimension:
+    """Bounds the cardinality of the SpaceId dimension.
+
+    Only the spaces listed in ``allowed`` are reported, and every other one
+    is folded into a single ``other`` value. Without an allow list all the
+    spaces are folded: a cap on the spaces seen would hold per container
+    only, so the dimension would still grow with the number of containers.
+    """
+
+    def __init__(
+        self, allowed: typing.Optional[typing.Iterable[str]] = None
+    ) -> None:
+        self.allowed = frozenset(allowed or ())
+
+    def value(self, space_id: str) -> str:
+        return space_id if space_id in self.allowed else OTHER_SPACES
+
+
+metrics = RollupMetrics(namespace=NAMESPACE)
+tracer = Tracer()
+space_dimension = SpaceDimension(
+    allowed=[
+        space_id
+        for space_id in os.environ.get("METRICS_SPACE_IDS", "").split(",")
+        if space_id
+    ]
+)
+
+
+def set_event_type(raw_type: typing.Any) -> None:
+    try:
+        name = EventType(raw_type).name
+    except ValueError:
+        name = "UNKNOWN"
+    metrics.add_dimension(name="EventType", value=name)
+
+
+def set_space(space_id: str) -> None:
+    metrics.add_dimension(name="SpaceId", value=space_dimension.value(space_id))
+
+
+def count(name: str, value: float = 1) -> None:
+    """Count an event outcome, e.g. Received, Delivered or Failed, as the
+    ``Events{name}`` metric.
+
+    Nothing is published per call: counts are buffered in ``metrics`` and
+    flushed once per invocation by the ``log_metrics`` decorator of the
+    handler, as one EMF record carrying the rollups of RollupMetrics.
+    """
+    metrics.add_metric(name=f"Events{name}", unit=MetricUnit.Count, value=value)
+
+
+def record_payload_bytes(size: int) -> None:
+    metrics.add_metric(name="PayloadBytes", unit=MetricUnit.Bytes, value=size)
+
+
+def record_render_cache(hit: bool) -> None:
+    metrics.add_metric(
+        name="RenderCacheHits" if hit else "RenderCacheMisses",
+        unit=MetricUnit.Count,
+        value=1,
+    )
+
+
+def record_capped_fields(count: int) -> None:
+    metrics.add_metric(name="CappedFields", unit=MetricUnit.Count, value=count)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> typing.Iterator[None]:
+    """Time a hot-path stage as an X-Ray subsegment and a latency metric."""
+    start = time.perf_counter()
+    try:
+        with tracer.provider.in_subsegment(f"## {name}"):
+            yield
+    finally:
+        metrics.add_metric(
+            name=f"{name}Latency",
+            unit=MetricUnit.Milliseconds,
+            value=(time.perf_counter() - start) * 1000,
+        )
+
+
+def record_http_timings(timings: HttpTimings) -> None:
+    for name, value in [
+        ("HttpConnectLatency", timings.connect_ms),
+        ("HttpTlsLatency", timings.tls_ms),
+        ("HttpTimeToFirstByte", timings.ttfb_ms),
+    ]:
+        metrics.add_metric(
+            name=name,
+            unit=MetricUnit.Milliseconds,
+            value=value,
+        )
+
+
+def record_timeout_budget(
+    elapsed: float, timeout: typing.Tuple[float, float]
+) -> None:
+    """Record the share of the connect and read timeouts a request used."""
+    metrics.add_metric(
+        name="TimeoutBudgetUsed",
+        unit=MetricUnit.Percent,
+        value=min(elapsed / sum(timeout), 1.0) * 100,
+    )
@@ -0,0 +1,253 @@
+import collections
+import json
+import os
+import re
+import time
+import typing
+from dataclasses import dataclass
+
+import boto3
+from aws_lambda_powertools import Logger
+from botocore.exceptions import BotoCoreError, ClientError
+from events import EventType
+from exceptions import UnknownTenant
+from rules import DELIVER, RuleSet, compile_rules
+
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "X-Backlog-Tenant"
+_TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+# what reading a malformed config raises, from its JSON to its rules
+_CONFIG_ERRORS = (KeyError, TypeError, ValueError, AttributeError, re.error)
+
+logger = Logger(child=True)
+
+
+@dataclass(frozen=True)
+class TenantConfig:
+    tenant_id: str
+    backlog_base_url: str
+    event_types: typing.Optional[typing.FrozenSet[EventType]] = None
+    space_ids: typing.Optional[typing.FrozenSet[str]] = None
+    rules: typing.Optional[RuleSet] = None
+    thread_updates: bool = False
+    edit_window: float = 0.0
+
+    @classmethod
+    def from_raw(cls, tenant_id: str, raw: typing.Dict[str, typing.Any]):
+        backlog_base_url = raw["backlog_base_url"]
+        if backlog_base_url.endswith("/"):
+            backlog_base_url = backlog_base_url[:-1]
+        return cls(
+            tenant_id=tenant_id,
+            backlog_base_url=backlog_base_url,
+            event_types=(
+                frozenset(EventType[name] for name in raw["event_types"])
+                if raw.get("event_types") is not None
+                else None
+            ),
+            space_ids=(
+                frozenset(raw["space_ids"])
+                if raw.get("space_ids") is not None
+                else None
+            ),
+            rules=compile_rules(raw.get("rules")),
+            thread_updates=bool(raw.get("thread_updates", False)),
+            edit_window=float(raw.get("edit_window") or 0),
+        )
+
+    def allows_event_type(self, raw_type: typing.Any) -> bool:
+        if self.event_types is None:
+            return True
+        try:
+            return EventType(raw_type) in self.event_types
+        except ValueError:
+            return False
+
+    def allows_space(self, space_id: str) -> bool:
+        return self.space_ids is None or space_id in self.space_ids
+
+    def event_action(
+        self, space_id: str, raw: typing.Dict[str, typing.Any]
+    ) -> str:
+        """Whether the rules deliver, drop or digest the event."""
+        if self.rules is None:
+            return DELIVER
+        return self.rules.action(space_id, raw)
+
+
+class SsmTenantStore:
+    """Tenant configs stored as JSON in the SSM parameters
+    ``{prefix}/{tenant_id}``."""
+
+    def __init__(self, prefix: str, client: typing.Any = None) -> None:
+        self.prefix = prefix.rstrip("/")
+        self.client = client or boto3.client("ssm")
+
+    def load(
+        self, tenant_id: str
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        try:
+            response = self.client.get_parameter(
+                Name=f"{self.prefix}/{tenant_id}", WithDecryption=True
+            )
+        except self.client.exceptions.ParameterNotFound:
+            return None
+        return json.loads(response["Parameter"]["Value"])
+
+
+class DynamoDBTenantStore:
+    """Tenant configs stored as JSON in the ``config`` attribute of items
+    keyed by ``tenant_id``."""
+
+    def __init__(self, table_name: str, client: typing.Any = None) -> None:
+        self.table_name = table_name
+        self.client = client or boto3.client("dynamodb")
+
+    def load(
+        self, tenant_id: str
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        item = self.client.get_item(
+            TableName=self.table_name,
+            Key={"tenant_id": {"S": tenant_id}},
+        ).get("Item")
+        if not item:
+            return None
+        return json.loads(item["config"]["S"])
+
+
+class TenantConfigCache:
+    """Tenant configs kept in process for ``ttl`` seconds.
+
+    At most ``max_entries`` configs are kept, least recently used first
+    out. Unknown tenants are remembered apart, at most ``max_misses`` of
+    them, so that bad requests neither reach the store each time nor push
+    the configs out. When the store fails or holds a malformed config, the
+    last known config is served.
+    """
+
+    def __init__(
+        self,
+        store: typing.Any = None,
+        default: typing.Optional[TenantConfig] = None,
+        ttl: float = 300.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+        max_entries: int = 256,
+        max_misses: int = 64,
+    ) -> None:
+        self.store = store
+        self.default = default
+        self.ttl = ttl
+        self.clock = clock
+        self.max_entries = max_entries
+        self.max_misses = max_misses
+        self._entries: typing.OrderedDict[
+            str, typing.Tuple[float, TenantConfig]
+        ] = collections.OrderedDict()
+        self._misses: typing.OrderedDict[str, float] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, tenant_id: str) -> TenantConfig:
+        if tenant_id == DEFAULT_TENANT and self.default is not None:
+            return self.default
+
+        now = self.clock()
+        entry = self._entries.get(tenant_id)
+        if entry is not None:
+            self._entries.move_to_end(tenant_id)
+            expires, config = entry
+        else:
+            expires, config = self._misses.get(tenant_id, 0.0), None
+        if expires <= now:
+            try:
+                config = self._load(tenant_id)
+            except (BotoCoreError, ClientError):
+                if entry is None and tenant_id not in self._misses:
+                    raise
+            except _CONFIG_ERRORS as e:
+                logger.error(
+                    {
+                        "message": "Invalid tenant config",
+                        "tenant_id": tenant_id,
+                        "reason": repr(e),
+                    }
+                )
+                # the last good config, if any, is served until the next
+                # reload, and a tenant without one is unknown meanwhile
+                self._remember(tenant_id, now + self.ttl, config)
+            else:
+                self._remember(tenant_id, now + self.ttl, config)
+
+        if config is None:
+            raise UnknownTenant(f"tenant `{tenant_id}` is not configured")
+        return config
+
+    def _remember(
+        self,
+        tenant_id: str,
+        expires: float,
+        config: typing.Optional[TenantConfig],
+    ) -> None:
+        if config is None:
+            self._entries.pop(tenant_id, None)
+            _put(self._misses, tenant_id, expires, self.max_misses)
+        else:
+            self._misses.pop(tenant_id, None)
+            _put(self._entries, tenant_id, (expires, config), self.max_entries)
+
+    def _load(self, tenant_id: str) -> typing.Optional[TenantConfig]:
+        if self.store is None or not _TENANT_ID_PATTERN.fullmatch(tenant_id):
+            return None
+        raw = self.store.load(tenant_id)
+        return TenantConfig.from_raw(tenant_id, raw) if raw else None
+
+
+def _put(
+    entries: typing.OrderedDict[str, typing.Any],
+    key: str,
+    value: typing.Any,
+    max_entries: int,
+) -> None:
+    entries[key] = value
+    entries.move_to_end(key)
+    while len(entries) > max_entries:
+        entries.popitem(last=False)
+
+
+def from_environ(
+    environ: typing.Mapping[str, str] = os.environ,
+) -> TenantConfigCache:
+    """Build the tenant configs of the function.
+
+    ``BACKLOG_BASE_URL`` is the default tenant, filtered by the rules in
+    ``EVENT_RULES``, threaded when ``THREAD_UPDATES`` is ``true`` and
+    editing updates in place for ``EDIT_WINDOW`` seconds. Other tenants are
+    read from ``TENANT_SSM_PREFIX`` or ``TENANT_TABLE_NAME`` when set, and
+    at most ``TENANT_CACHE_SIZE`` of them are cached.
+    """
+    store: typing.Any = None
+    if environ.get("TENANT_SSM_PREFIX"):
+        store = SsmTenantStore(environ["TENANT_SSM_PREFIX"])
+    elif environ.get("TENANT_TABLE_NAME"):
+        store = DynamoDBTenantStore(environ["TENANT_TABLE_NAME"])
+    return TenantConfigCache(
+        store=store,
+        default=(
+            TenantConfig.from_raw(
+                DEFAULT_TENANT,
+                {
+                    "backlog_base_url": environ["BACKLOG_BASE_URL"],
+                    "rules": json.loads(environ.get("EVENT_RULES") or "{}"),
+                    "thread_updates": (
+                        environ.get("THREAD_UPDATES", "").lower() == "true"
+                    ),
+                    "edit_window": environ.get("EDIT_WINDOW"),
+                },
+            )
+            if environ.get("BACKLOG_BASE_URL")
+            else None
+        ),
+        ttl=float(environ.get("TENANT_CACHE_TTL", "300")),
+        max_entries=int(environ.get("TENANT_CACHE_SIZE", "256")),
+    )
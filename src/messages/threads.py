@@ -0,0 +1,68 @@
+import typing
+
+from events import EventType
+
+THREAD_KEY = "threadKey"
+REPLY_OPTION = "messageReplyOption"
+REPLY_OR_NEW_THREAD = "REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD"
+
+# query parameters of the webhook URL passed on to Google Chat
+FORWARDED_PARAMETERS = ["key", "token", THREAD_KEY, REPLY_OPTION]
+
+_ISSUE_TYPES = frozenset(
+    event_type.value
+    for event_type in [
+        EventType.CREATE_ISSUE,
+        EventType.UPDATE_ISSUE,
+        EventType.ADD_COMMENT,
+        EventType.DELETE_ISSUE,
+    ]
+)
+_PULL_REQUEST_TYPES = frozenset(
+    event_type.value
+    for event_type in [
+        EventType.CREATE_PULL_REQUEST,
+        EventType.UPDATE_PULL_REQUEST,
+        EventType.COMMENT_PULL_REQUEST,
+    ]
+)
+
+
+def _get(raw: typing.Any, key: str) -> typing.Any:
+    return raw.get(key) if isinstance(raw, dict) else None
+
+
+def thread_key(raw: typing.Dict[str, typing.Any]) -> typing.Optional[str]:
+    """The thread of an issue or pull request event, None for the others.
+
+    Keys are derived from the raw event, the issue key or the repository
+    and number of the pull request, so that every event of an issue lands
+    in the same thread without keeping track of the threads.
+    """
+    project_key = _get(raw.get("project"), "projectKey")
+    content = raw.get("content")
+    if not isinstance(project_key, str):
+        return None
+    event_type = raw.get("type")
+    if event_type in _ISSUE_TYPES:
+        key_id = _get(content, "key_id")
+        if isinstance(key_id, int):
+            return f"{project_key}-{key_id}"
+    elif event_type in _PULL_REQUEST_TYPES:
+        repository = _get(_get(content, "repository"), "name")
+        number = _get(content, "number")
+        if isinstance(repository, str) and isinstance(number, int):
+            return f"{project_key}/{repository}#{number}"
+    return None
+
+
+def in_thread(
+    query: typing.Dict[str, str], key: typing.Optional[str]
+) -> typing.Dict[str, str]:
+    """The query posting into the thread ``key``, starting it if needed.
+
+    Threads given in the webhook URL are kept.
+    """
+    if key is None or THREAD_KEY in query:
+        return query
+    return {**query, THREAD_KEY: key, REPLY_OPTION: REPLY_OR_NEW_THREAD}
@@ -1,18 +1,43 @@
 import typing
 
-from models import WebhookEvent
+from models import PARSE_ERRORS, WebhookEvent
 
 from events import EventType
+from exceptions import InvalidPayload, UnsupportedEventType
 
 
 class WebhookApp:
     def __init__(self) -> None:
         self._event_handlers: typing.Dict[str, typing.Callable] = {}
-
-    def handle(self, event: typing.Dict[str, typing.Any]) -> typing.Any:
-        webhook_event = WebhookEvent.from_raw(event)
+        self.base_url = ""
+
+    def handle(
+        self, event: typing.Dict[str, typing.Any], base_url: str = ""
+    ) -> typing.Any:
+        return self.render(self.parse(event), base_url)
+
+    def parse(self, event: typing.Dict[str, typing.Any]) -> WebhookEvent:
+        return WebhookEvent.from_raw(event)
+
+    def render(
+        self, webhook_event: WebhookEvent, base_url: str = ""
+    ) -> typing.Any:
+        handler = self._event_handlers.get(webhook_event.type)
+        if handler is None:
+            raise UnsupportedEventType(
+                f"no handler for event type `{webhook_event.type.value}`"
+            )
         self.event = webhook_event
-        return self._event_handlers[webhook_event.type]()
+        self.base_url = base_url
+        try:
+            return handler()
+        except PARSE_ERRORS as e:
+            # fields of the wrong type get through the parsers and fail
+            # when the message is built
+            raise InvalidPayload(
+                f"event of type `{webhook_event.type.value}` cannot be "
+                f"rendered: {e!r}"
+            ) from e
 
     @property
     def create_issue(self):
@@ -0,0 +1,97 @@
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_ssm
+
+
+class TestAuth:
+    @pytest.fixture
+    def auth(self):
+        os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+        os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import auth
+
+        yield auth
+
+        sys.path = original_path
+
+    @pytest.fixture
+    def ssm(self):
+        with mock_ssm():
+            client = boto3.client("ssm")
+            for i in range(15):
+                client.put_parameter(
+                    Name=f"/secrets/SPACE{i}",
+                    Type="SecureString",
+                    Value=f"secret-{i}",
+                )
+            client.put_parameter(
+                Name="/secrets/ROTATING",
+                Type="SecureString",
+                Value="old-secret, new-secret",
+            )
+            yield client
+
+    def test_ssm_store(self, auth, ssm) -> None:
+        secrets = auth.SsmSecretStore("/secrets/", client=ssm).load_all()
+
+        assert len(secrets) == 16
+        assert secrets["SPACE12"] == ["secret-12"]
+        assert secrets["ROTATING"] == ["old-secret", "new-secret"]
+
+    def test_verify(self, auth, ssm) -> None:
+        authenticator = auth.WebhookAuthenticator(
+            auth.SecretCache(auth.SsmSecretStore("/secrets", client=ssm))
+        )
+
+        assert authenticator.enabled
+        assert authenticator.verify("SPACE1", "secret-1")
+        assert not authenticator.verify("SPACE1", "secret-2")
+        assert not authenticator.verify("SPACE1", "")
+        assert not authenticator.verify("SPACE1", None)
+        assert not authenticator.verify("UNKNOWN", "secret-1")
+        assert authenticator.verify("ROTATING", "old-secret")
+        assert authenticator.verify("ROTATING", "new-secret")
+        assert authenticator.verify("SPACE1", "シークレット") is False
+
+    def test_disabled(self, auth) -> None:
+        authenticator = auth.from_environ({})
+
+        assert not authenticator.enabled
+        assert authenticator.verify("SPACE1", None)
+
+    def test_cache(self, auth, mocker) -> None:
+        now = [0.0]
+        store = mocker.Mock()
+        store.load_all.return_value = {"SPACE1": ["secret"]}
+        cache = auth.SecretCache(store, ttl=60, clock=lambda: now[0])
+
+        assert cache.get("SPACE1") == (b"secret",)
+        assert cache.get("UNKNOWN") == ()
+        now[0] = 59
+        cache.get("SPACE1")
+        assert store.load_all.call_count == 1
+
+        now[0] = 60
+        store.load_all.side_effect = ClientError(
+            {"Error": {"Code": "ThrottlingException"}}, "GetParametersByPath"
+        )
+        assert cache.get("SPACE1") == (b"secret",)
+
+    def test_cache_without_secrets(self, auth, mocker) -> None:
+        store = mocker.Mock()
+        store.load_all.side_effect = ClientError(
+            {"Error": {"Code": "ThrottlingException"}}, "GetParametersByPath"
+        )
+
+        with pytest.raises(ClientError):
+            auth.SecretCache(store).get("SPACE1")
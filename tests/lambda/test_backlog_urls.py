@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestBacklogUrls:
+    @pytest.fixture
+    def backlog_urls(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import backlog_urls
+
+        yield backlog_urls
+
+        sys.path = original_path
+
+    def test_for_project_is_cached(self, backlog_urls) -> None:
+        urls = backlog_urls.for_project("https://example.backlog.jp/", "TEST")
+
+        assert urls is backlog_urls.for_project(
+            "https://example.backlog.jp/", "TEST"
+        )
+        assert urls.project == "https://example.backlog.jp/projects/TEST"
+
+    def test_links(self, backlog_urls) -> None:
+        urls = backlog_urls.BacklogUrls("https://example.backlog.jp", "TEST")
+
+        assert urls.issue(1) == "https://example.backlog.jp/view/TEST-1"
+        assert urls.issues([1, 2]) == [
+            "https://example.backlog.jp/view/TEST-1",
+            "https://example.backlog.jp/view/TEST-2",
+        ]
+        assert (
+            urls.issue_comment(1, 3)
+            == "https://example.backlog.jp/view/TEST-1#comment-3"
+        )
+        assert (
+            urls.wiki_diff(5, 2)
+            == "https://example.backlog.jp/alias/wiki/diff/5/1...2"
+        )
+        assert (
+            urls.git_branch("repo", "refs/heads/main")
+            == "https://example.backlog.jp/git/TEST/repo/tree/main"
+        )
+        assert (
+            urls.pull_request("repo", 7)
+            == "https://example.backlog.jp/git/TEST/repo/pullRequests/7"
+        )
@@ -0,0 +1,208 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestCardBudget:
+    @pytest.fixture
+    def card_budget(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import card_budget
+
+        yield card_budget
+
+        sys.path = original_path
+
+    def _message(self, description: str, comment: str = "short"):
+        return {
+            "text": "課題 TEST-1 を追加",
+            "cards": [
+                {
+                    "header": {"title": "TEST-1 summary", "subtitle": "John"},
+                    "sections": [
+                        {
+                            "widgets": [
+                                {"textParagraph": {"text": description}},
+                                {
+                                    "keyValue": {
+                                        "topLabel": "詳細",
+                                        "content": comment,
+                                        "contentMultiline": True,
+                                    },
+                                },
+                            ],
+                        },
+                        {
+                            "widgets": [
+                                {
+                                    "buttons": [
+                                        {
+                                            "textButton": {
+                                                "text": "課題を開く",
+                                                "onClick": {
+                                                    "openLink": {
+                                                        "url": "https://backlog.com/view/TEST-1",  # noqa
+                                                    },
+                                                },
+                                            },
+                                        },
+                                    ],
+                                },
+                            ],
+                        },
+                    ],
+                },
+            ],
+        }
+
+    def test_small_message_is_untouched(self, card_budget) -> None:
+        message = self._message("description")
+
+        data, truncated = card_budget.fit(message, max_bytes=32_000)
+
+        assert truncated is False
+        assert json.loads(data) == self._message("description")
+
+    @pytest.mark.parametrize(
+        "description",
+        [
+            "a" * 50_000,
+            "課題の詳細" * 10_000,
+            'line "quoted"\n\t' * 5_000,
+        ],
+    )
+    def test_oversized_paragraph_is_truncated(
+        self, card_budget, description: str
+    ) -> None:
+        message = self._message(description, comment="コメント" * 10)
+
+        data, truncated = card_budget.fit(
+            message,
+            max_bytes=4_000,
+            link="https://backlog.com/view/TEST-1",
+        )
+
+        assert truncated is True
+        assert len(data) <= 4_000
+        widgets = json.loads(data)["cards"][0]["sections"][0]["widgets"]
+        text = widgets[0]["textParagraph"]["text"]
+        assert text.endswith(card_budget.TRUNCATED_MARKER)
+        assert description.startswith(
+            text[: -len(card_budget.TRUNCATED_MARKER)]
+        )
+        assert widgets[1] == {
+            "buttons": [
+                {
+                    "textButton": {
+                        "text": card_budget.OPEN_LINK_TEXT,
+                        "onClick": {
+                            "openLink": {
+                                "url": "https://backlog.com/view/TEST-1",
+                            },
+                        },
+                    },
+                },
+            ],
+        }
+        # the small key value widget is left alone
+        assert widgets[2]["keyValue"]["content"] == "コメント" * 10
+
+    def test_largest_widgets_are_trimmed_first(self, card_budget) -> None:
+        message = self._message("a" * 3_000, comment="b" * 20_000)
+
+        data, truncated = card_budget.fit(
+            message,
+            max_bytes=6_000,
+            link="https://backlog.com/view/TEST-1",
+        )
+
+        assert truncated is True
+        assert len(data) <= 6_000
+        widgets = json.loads(data)["cards"][0]["sections"][0]["widgets"]
+        assert widgets[0]["textParagraph"]["text"] == "a" * 3_000
+        key_value = widgets[1]["keyValue"]
+        assert key_value["content"].endswith(card_budget.TRUNCATED_MARKER)
+        assert key_value["button"]["textButton"]["text"] == (
+            card_budget.OPEN_LINK_TEXT
+        )
+
+    def test_button_opens_the_given_link(self, card_budget) -> None:
+        message = self._message("a" * 50_000)
+        shared_file = {
+            "keyValue": {
+                "content": "file.txt",
+                "button": {
+                    "textButton": {
+                        "text": "ファイルを開く",
+                        "onClick": {
+                            "openLink": {
+                                "url": "https://backlog.com/file/TEST/1",
+                            },
+                        },
+                    },
+                },
+            },
+        }
+        widgets = message["cards"][0]["sections"][0]["widgets"]
+        widgets.insert(0, shared_file)
+
+        data, truncated = card_budget.fit(
+            message,
+            max_bytes=4_000,
+            link="https://backlog.com/view/TEST-1#comment-1",
+        )
+
+        assert truncated is True
+        widgets = json.loads(data)["cards"][0]["sections"][0]["widgets"]
+        assert widgets[0] == shared_file
+        button = widgets[2]["buttons"][0]["textButton"]
+        assert button["text"] == card_budget.OPEN_LINK_TEXT
+        assert button["onClick"]["openLink"]["url"] == (
+            "https://backlog.com/view/TEST-1#comment-1"
+        )
+
+    def test_no_button_without_link(self, card_budget) -> None:
+        message = self._message("a" * 50_000)
+
+        data, truncated = card_budget.fit(message, max_bytes=4_000)
+
+        assert truncated is True
+        assert len(data) <= 4_000
+        widgets = json.loads(data)["cards"][0]["sections"][0]["widgets"]
+        assert "textParagraph" in widgets[0]
+        assert "keyValue" in widgets[1]
+        assert card_budget.OPEN_LINK_TEXT not in data.decode("utf-8")
+
+    def test_paginate(self, card_budget) -> None:
+        consumed = []
+
+        def widgets():
+            for i in range(100):
+                consumed.append(i)
+                yield {"textParagraph": {"text": f"{i:03}" * 10}}
+
+        def build(widgets, page):
+            return {"text": f"page {page}", "cards": [{"widgets": widgets}]}
+
+        pages = card_budget.paginate(widgets(), build, max_bytes=1_000)
+
+        first = next(pages)
+        assert card_budget.encoded_size(first) <= 1_000
+        # the widgets are built one page ahead at most
+        assert len(consumed) == len(first["cards"][0]["widgets"]) + 1
+
+        rest = list(pages)
+        assert all(card_budget.encoded_size(page) <= 1_000 for page in rest)
+        assert [
+            widget
+            for page in [first, *rest]
+            for widget in page["cards"][0]["widgets"]
+        ] == list(widgets())
+        assert [page["text"] for page in [first, *rest]] == [
+            f"page {page}" for page in range(len(rest) + 1)
+        ]
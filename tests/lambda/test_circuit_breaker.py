@@ -0,0 +1,187 @@
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_dynamodb
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def circuit_breaker(self):
+        os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+        os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import circuit_breaker
+
+        yield circuit_breaker
+
+        sys.path = original_path
+
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    @pytest.fixture
+    def dynamodb(self):
+        with mock_dynamodb():
+            client = boto3.client("dynamodb")
+            client.create_table(
+                TableName="breakers",
+                KeySchema=[{"AttributeName": "breaker_id", "KeyType": "HASH"}],
+                AttributeDefinitions=[
+                    {"AttributeName": "breaker_id", "AttributeType": "S"}
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            yield client
+
+    def test_opens_after_consecutive_failures(
+        self, circuit_breaker, clock
+    ) -> None:
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=3, recovery_timeout=30, clock=clock
+        )
+
+        for _ in range(2):
+            assert breaker.allow("a")
+            breaker.record_failure("a")
+        breaker.record_success("a")
+        for _ in range(3):
+            assert breaker.allow("a")
+            breaker.record_failure("a")
+
+        assert breaker.state("a").state == circuit_breaker.OPEN
+        assert not breaker.allow("a")
+        assert breaker.allow("b")
+
+    def test_half_open_probes(self, circuit_breaker, clock) -> None:
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=1,
+            recovery_timeout=30,
+            half_open_probes=2,
+            clock=clock,
+        )
+        breaker.record_failure("a")
+
+        clock.now += 29
+        assert not breaker.allow("a")
+        clock.now += 1
+        assert breaker.allow("a")
+        assert breaker.allow("a")
+        assert not breaker.allow("a")
+        assert breaker.state("a").state == circuit_breaker.HALF_OPEN
+
+        breaker.record_failure("a")
+        assert breaker.state("a").state == circuit_breaker.OPEN
+        assert not breaker.allow("a")
+
+        clock.now += 30
+        assert breaker.allow("a")
+        breaker.record_success("a")
+        assert breaker.state("a") == circuit_breaker.BreakerState()
+        assert all(breaker.allow("a") for _ in range(5))
+
+    def test_lost_probes_are_replaced(self, circuit_breaker, clock) -> None:
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=1, recovery_timeout=30, clock=clock
+        )
+        breaker.record_failure("a")
+        clock.now += 30
+        assert breaker.allow("a")
+        assert not breaker.allow("a")
+
+        clock.now += 30
+        assert breaker.allow("a")
+
+    def test_global_breaker(self, circuit_breaker, clock) -> None:
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=5,
+            global_failure_threshold=3,
+            recovery_timeout=30,
+            clock=clock,
+        )
+
+        for space in ["a", "b", "c"]:
+            breaker.record_failure(space)
+
+        assert breaker.state(circuit_breaker.GLOBAL).state == (
+            circuit_breaker.OPEN
+        )
+        assert breaker.state("a").state == circuit_breaker.CLOSED
+        assert not breaker.allow("d")
+
+    def test_shared_through_dynamodb(
+        self, circuit_breaker, clock, dynamodb
+    ) -> None:
+        breakers = [
+            circuit_breaker.CircuitBreaker(
+                store=circuit_breaker.DynamoDBStateStore(
+                    "breakers", client=dynamodb
+                ),
+                failure_threshold=2,
+                recovery_timeout=30,
+                clock=clock,
+            )
+            for _ in range(2)
+        ]
+        assert breakers[1].allow("a")
+
+        breakers[0].record_failure("a")
+        breakers[0].record_failure("a")
+        clock.now += 1
+
+        assert not breakers[1].allow("a")
+        item = dynamodb.get_item(
+            TableName="breakers", Key={"breaker_id": {"S": "a"}}
+        )["Item"]
+        assert item["state"] == {"S": "open"}
+        assert "expires_at" in item
+
+        clock.now += 30
+        assert breakers[1].allow("a")
+        clock.now += 1
+        assert not breakers[0].allow("a")
+
+    def test_store_errors(self, circuit_breaker, clock, dynamodb) -> None:
+        breaker = circuit_breaker.CircuitBreaker(
+            store=circuit_breaker.DynamoDBStateStore(
+                "missing", client=boto3.client("dynamodb")
+            ),
+            failure_threshold=1,
+            clock=clock,
+        )
+
+        assert breaker.allow("a")
+        breaker.record_failure("a")
+        assert not breaker.allow("a")
+
+    def test_from_environ(self, circuit_breaker) -> None:
+        breaker = circuit_breaker.from_environ(
+            {
+                "CIRCUIT_BREAKER_TABLE_NAME": "breakers",
+                "CIRCUIT_FAILURE_THRESHOLD": "3",
+                "CIRCUIT_RECOVERY_TIMEOUT": "10",
+            }
+        )
+
+        assert isinstance(breaker.store, circuit_breaker.DynamoDBStateStore)
+        assert breaker.failure_threshold == 3
+        assert breaker.recovery_timeout == 10.0
+        assert isinstance(
+            circuit_breaker.from_environ({}).store,
+            circuit_breaker.InMemoryStateStore,
+        )
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestDeadline:
+    @pytest.fixture
+    def deadline(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import deadline
+
+        yield deadline
+
+        sys.path = original_path
+
+    @pytest.mark.parametrize(
+        "remaining_ms, expected",
+        [
+            (30_000, (3.05, 10.0)),
+            (3_500, (1.0, 2.0)),
+            (1_400, (0.3, 0.6)),
+        ],
+    )
+    def test_timeouts(self, deadline, remaining_ms: int, expected) -> None:
+        budget = deadline.TimeoutBudget(lambda: remaining_ms)
+
+        assert budget.timeouts() == pytest.approx(expected)
+
+    @pytest.mark.parametrize("remaining_ms", [1_000, 500, 0])
+    def test_exhausted(self, deadline, remaining_ms: int) -> None:
+        from exceptions import BudgetExhausted
+
+        budget = deadline.TimeoutBudget(lambda: remaining_ms)
+
+        with pytest.raises(BudgetExhausted):
+            budget.timeouts()
+
+    def test_from_environ(self, deadline) -> None:
+        budget = deadline.from_environ(
+            lambda: 60_000,
+            {
+                "HTTP_CONNECT_TIMEOUT": "1",
+                "HTTP_READ_TIMEOUT": "5",
+                "DEADLINE_RESERVE_MS": "2000",
+            },
+        )
+
+        assert budget.timeouts() == (1.0, 5.0)
+        assert budget.reserve_ms == 2000
@@ -0,0 +1,202 @@
+import dataclasses
+import json
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_dynamodb, mock_kms
+
+
+class TestDigest:
+    @pytest.fixture
+    def digest(self):
+        os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+        os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import digest
+
+        yield digest
+
+        sys.path = original_path
+
+    @pytest.fixture
+    def dynamodb(self):
+        with mock_dynamodb():
+            client = boto3.client("dynamodb")
+            client.create_table(
+                TableName="digests",
+                KeySchema=[
+                    {"AttributeName": "digest_id", "KeyType": "HASH"},
+                    {"AttributeName": "entry_id", "KeyType": "RANGE"},
+                ],
+                AttributeDefinitions=[
+                    {"AttributeName": "digest_id", "AttributeType": "S"},
+                    {"AttributeName": "entry_id", "AttributeType": "S"},
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            yield client
+
+    @pytest.fixture
+    def kms(self):
+        with mock_kms():
+            client = boto3.client("kms")
+            key_id = client.create_key()["KeyMetadata"]["KeyId"]
+            yield client, key_id
+
+    def _store(self, digest, dynamodb, kms):
+        kms_client, key_id = kms
+        return digest.DynamoDBDigestStore(
+            "digests", key_id, client=dynamodb, kms_client=kms_client
+        )
+
+    def _entry(self, digest, path: str, created: str):
+        return digest.DigestEntry(
+            path=path,
+            query={"key": "k", "token": "t"},
+            created=created,
+            text="メンバーを変更",
+            title="TestProject (TEST)",
+            subtitle="John Doe",
+            url="https://backlog.com/projects/TEST",
+        )
+
+    def test_entry_from_message(self, digest) -> None:
+        message = {
+            "text": "Git リポジトリを作成",
+            "cards": [
+                {
+                    "header": {"title": "test", "subtitle": "John Doe"},
+                    "sections": [
+                        {"widgets": [{"textParagraph": {"text": "x"}}]},
+                        {
+                            "widgets": [
+                                {
+                                    "buttons": [
+                                        {
+                                            "textButton": {
+                                                "text": "リポジトリを開く",
+                                                "onClick": {
+                                                    "openLink": {
+                                                        "url": "https://backlog.com/git/TEST/test"  # noqa
+                                                    }
+                                                },
+                                            }
+                                        }
+                                    ]
+                                }
+                            ]
+                        },
+                    ],
+                }
+            ],
+        }
+
+        entry = digest.DigestEntry.from_message(
+            "/v1/spaces/AAAA/messages",
+            {"key": "k", "token": "t"},
+            "2021-10-01T00:00:00Z",
+            message,
+        )
+
+        assert entry.text == "Git リポジトリを作成"
+        assert entry.title == "test"
+        assert entry.subtitle == "John Doe"
+        assert entry.url == "https://backlog.com/git/TEST/test"
+        assert digest.DigestEntry.from_raw(entry.to_raw()) == entry
+
+    def test_store(self, digest, dynamodb, kms) -> None:
+        store = self._store(digest, dynamodb, kms)
+        path_a, path_b = "/v1/spaces/AAAA/messages", "/v1/spaces/BBBB/messages"
+        store.add(self._entry(digest, path_a, "2021-10-01T00:00:02Z"), 2)
+        store.add(self._entry(digest, path_a, "2021-10-01T00:00:01Z"), 1)
+        store.add(self._entry(digest, path_b, "2021-10-01T00:00:03Z"), 3)
+
+        pending = store.pending()
+
+        assert set(pending) == {path_a, path_b}
+        assert [entry_id for entry_id, _ in pending[path_a]] == [
+            "2021-10-01T00:00:01Z#1",
+            "2021-10-01T00:00:02Z#2",
+        ]
+        assert pending[path_b][0][1] == self._entry(
+            digest, path_b, "2021-10-01T00:00:03Z"
+        )
+
+        store.remove(path_a, ["2021-10-01T00:00:01Z#1"])
+        assert [entry_id for entry_id, _ in store.pending()[path_a]] == [
+            "2021-10-01T00:00:02Z#2"
+        ]
+
+    def test_store_encrypts_credentials(
+        self, digest, dynamodb, kms, mocker
+    ) -> None:
+        store = self._store(digest, dynamodb, kms)
+        encrypt = mocker.spy(store.kms_client, "encrypt")
+        decrypt = mocker.spy(store.kms_client, "decrypt")
+        path = "/v1/spaces/AAAA/messages"
+        entry = dataclasses.replace(
+            self._entry(digest, path, "2021-10-01T00:00:01Z"),
+            query={"key": "k", "token": "t", "threadKey": "TEST-1"},
+        )
+        store.add(entry, 1)
+        store.add(entry, 2)
+
+        items = dynamodb.scan(TableName="digests")["Items"]
+        assert all(b'"t"' not in item["credentials"]["B"] for item in items)
+        assert [json.loads(item["entry"]["S"])["query"] for item in items] == [
+            {"threadKey": "TEST-1"}
+        ] * 2
+        # the ciphertext of the same credentials is reused
+        assert encrypt.call_count == 1
+        assert [e for _, e in store.pending()[path]] == [entry, entry]
+        assert decrypt.call_count == 1
+
+        # KMS refuses credentials copied to the item of another space
+        assert {
+            call.kwargs["EncryptionContext"]["digest_id"]
+            for call in decrypt.call_args_list
+        } == {path}
+
+    def test_remove_in_batches(self, digest, dynamodb, kms) -> None:
+        store = self._store(digest, dynamodb, kms)
+        path = "/v1/spaces/AAAA/messages"
+        for i in range(60):
+            store.add(self._entry(digest, path, f"2021-10-01T00:{i:02}:00Z"), i)
+        entry_ids = [entry_id for entry_id, _ in store.pending()[path]]
+
+        store.remove(path, entry_ids)
+
+        assert store.pending() == {}
+
+    def test_digest_message(self, digest) -> None:
+        path = "/v1/spaces/AAAA/messages"
+        entries = [
+            self._entry(digest, path, "2021-10-01T00:00:00Z"),
+            self._entry(digest, path, "2021-10-01T01:00:00Z"),
+        ]
+
+        message = digest.digest_message(entries)
+
+        assert message["text"] == "2 件の更新のまとめ"
+        card = message["cards"][0]
+        assert card["header"]["subtitle"] == (
+            "2021-10-01T00:00:00Z 〜 2021-10-01T01:00:00Z"
+        )
+        widgets = card["sections"][0]["widgets"]
+        assert len(widgets) == 2
+        assert widgets[0]["keyValue"]["topLabel"] == "メンバーを変更"
+        assert widgets[0]["keyValue"]["bottomLabel"] == "John Doe"
+
+    def test_from_environ(self, digest) -> None:
+        assert digest.from_environ({}) is None
+        store = digest.from_environ(
+            {"DIGEST_TABLE_NAME": "digests", "DIGEST_KEY_ID": "alias/digests"}
+        )
+        assert (store.table_name, store.key_id) == ("digests", "alias/digests")
@@ -0,0 +1,96 @@
+import sys
+import typing
+from pathlib import Path
+
+import pytest
+
+
+class TestEdits:
+    @pytest.fixture
+    def edits(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import edits
+
+        yield edits
+
+        sys.path = original_path
+
+    def _update_event(
+        self, **content: typing.Any
+    ) -> typing.Dict[str, typing.Any]:
+        return {
+            "type": 2,
+            "project": {"projectKey": "TEST"},
+            "content": {"key_id": 100, "changes": [], **content},
+        }
+
+    def test_key(self, edits) -> None:
+        path = "/v1/spaces/xxxx/messages"
+
+        assert edits.key(path, self._update_event()) == (path, "TEST-100")
+        assert edits.key(path, {**self._update_event(), "type": 1}) is None
+        assert edits.key(path, self._update_event(comment={"id": 1})) is None
+        assert edits.key(path, self._update_event(changes=None)) is None
+        assert edits.key(path, self._update_event(changes=["status"])) is None
+
+    def test_merge_changes(self, edits) -> None:
+        first = [
+            {"field": "status", "old_value": "1", "new_value": "2"},
+            {"field": "assigner", "old_value": "", "new_value": "John"},
+        ]
+        second = [
+            {"field": "limitDate", "old_value": "", "new_value": "2024-01-01"},
+            {"field": "status", "old_value": "2", "new_value": "3"},
+        ]
+
+        assert edits.merge_changes(first, second) == (
+            {"field": "status", "old_value": "1", "new_value": "3"},
+            {"field": "assigner", "old_value": "", "new_value": "John"},
+            {"field": "limitDate", "old_value": "", "new_value": "2024-01-01"},
+        )
+        # the changes of the first update are left as they are
+        assert first[0]["new_value"] == "2"
+
+    def test_update_query(self, edits) -> None:
+        assert edits.update_query(
+            {
+                "key": "foo",
+                "token": "bar",
+                "threadKey": "TEST-100",
+                "messageReplyOption": "REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD",
+            }
+        ) == {"key": "foo", "token": "bar"}
+
+    def test_store_window(self, edits) -> None:
+        now = [0.0]
+        store = edits.EditStore(clock=lambda: now[0])
+        key = ("/v1/spaces/xxxx/messages", "TEST-100")
+
+        store.start(key, "spaces/xxxx/messages/1", 60, ())
+        now[0] = 59.0
+        assert store.get(key).name == "spaces/xxxx/messages/1"
+        now[0] = 60.0
+        assert store.get(key) is None
+        assert len(store) == 0
+
+    def test_store_evicts_least_recently_used(self, edits) -> None:
+        store = edits.EditStore(max_entries=2)
+
+        store.start(("a", "1"), "a", 60, ())
+        store.start(("b", "1"), "b", 60, ())
+        store.get(("a", "1"))
+        store.start(("c", "1"), "c", 60, ())
+
+        assert store.get(("b", "1")) is None
+        assert store.get(("a", "1")).name == "a"
+        assert store.get(("c", "1")).name == "c"
+
+    def test_disabled_store(self, edits) -> None:
+        store = edits.from_environ({"EDIT_STATE_SIZE": "0"})
+
+        store.start(("a", "1"), "a", 60, ())
+
+        assert len(store) == 0
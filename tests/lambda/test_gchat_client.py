@@ -0,0 +1,129 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestGoogleChatClient:
+    @pytest.fixture
+    def stub(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        sys.path.append(str(root_dir / "tools"))
+        from stub_chat import StubChatServer
+
+        with StubChatServer() as stub:
+            yield stub
+
+        sys.path = original_path
+
+    def test_post_message_records_timings(self, stub) -> None:
+        from gchat_client import GoogleChatClient
+
+        client = GoogleChatClient(stub.url)
+        body = json.dumps({"text": "テスト"}, ensure_ascii=False).encode()
+
+        response = client.post_message(
+            path="/v1/spaces/xxxx/messages",
+            query={"key": "foo", "token": "bar"},
+            body=body,
+        )
+        first = client.timings
+
+        assert response.status_code == 200
+        assert stub.received[0].path == "/v1/spaces/xxxx/messages"
+        assert stub.received[0].query == {"key": "foo", "token": "bar"}
+        assert stub.received[0].body == {"text": "テスト"}
+        assert first.connect_ms > 0
+        assert first.total_ms >= first.ttfb_ms
+
+        client.post_message(
+            path="/v1/spaces/xxxx/messages",
+            query={"key": "foo", "token": "bar"},
+            body=body,
+        )
+
+        # the pooled connection is reused for the second request
+        assert client.timings.connect_ms == 0
+        assert client.timings.tls_ms == 0
+
+    def test_warm_up_and_reset(self, stub) -> None:
+        from gchat_client import GoogleChatClient
+
+        client = GoogleChatClient(stub.url)
+
+        def post() -> None:
+            client.post_message(
+                path="/v1/spaces/xxxx/messages",
+                query={"key": "foo", "token": "bar"},
+                body=b"{}",
+            )
+
+        client.warm_up()
+        post()
+        assert client.timings.connect_ms == 0
+
+        client.reset()
+        post()
+        assert client.timings.connect_ms > 0
+
+    def test_thread_key_is_quoted(self, stub) -> None:
+        from gchat_client import GoogleChatClient
+
+        client = GoogleChatClient(stub.url)
+        query = {
+            "key": "foo",
+            "token": "a=",
+            "threadKey": "TEST/app#1",
+            "messageReplyOption": "REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD",
+        }
+
+        client.post_message(
+            path="/v1/spaces/xxxx/messages", query=query, body=b"{}"
+        )
+
+        assert stub.received[0].query == query
+
+    def test_update_message(self, stub) -> None:
+        from gchat_client import GoogleChatClient
+
+        client = GoogleChatClient(stub.url)
+        posted = client.post_message(
+            path="/v1/spaces/xxxx/messages",
+            query={"key": "foo", "token": "bar"},
+            body=b'{"text": "first"}',
+        ).json()
+
+        response = client.update_message(
+            name=posted["name"],
+            query={"key": "foo", "token": "bar"},
+            body=b'{"text": "second"}',
+            update_mask="text,cards",
+        )
+
+        assert response.json() == {"text": "second", "name": posted["name"]}
+        assert stub.received[1].method == "PATCH"
+        assert stub.received[1].path == f"/v1/{posted['name']}"
+        assert stub.received[1].query == {
+            "key": "foo",
+            "token": "bar",
+            "updateMask": "text,cards",
+        }
+        assert client.timings.total_ms > 0
+
+    def test_update_unknown_message(self, stub) -> None:
+        from gchat_client import GoogleChatClient
+
+        client = GoogleChatClient(stub.url)
+        response = client.update_message(
+            name="spaces/xxxx/messages/unknown",
+            query={"key": "foo", "token": "bar"},
+            body=b'{"text": "second"}',
+            update_mask="text,cards",
+        )
+
+        assert response.status_code == 404
+        assert stub.delivered == []
@@ -1,14 +1,20 @@
+import base64
 import json
 import os
 import sys
+import tracemalloc
 import typing
 from dataclasses import dataclass
 from pathlib import Path
 
 import pytest
-from moto import mock_cloudwatch
+from moto import mock_cloudwatch, mock_dynamodb, mock_kms, mock_sqs, mock_ssm
 from pytest_mock import MockerFixture
 
+sys.path.append(str(Path(__file__).resolve().parents[2] / "tools"))
+
+import event_corpus  # noqa: E402
+
 
 @dataclass
 class LambdaContext:
@@ -18,6 +24,10 @@ class LambdaContext:
         "arn:aws:lambda:eu-west-1:809313241:function:test"
     )
     aws_request_id: str = "52fdfc07-2182-154f-163f-5f0f9a621d72"
+    remaining_time_in_millis: int = 30_000
+
+    def get_remaining_time_in_millis(self) -> int:
+        return self.remaining_time_in_millis
 
 
 class TestHandler:
@@ -30,6 +40,7 @@ class TestHandler:
         os.environ["GOOGLE_CHAT_API"] = "https://api.example.com"
         os.environ["BACKLOG_BASE_URL"] = "https://backlog.com"
         os.environ["POWERTOOLS_TRACE_DISABLED"] = "true"
+        os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
 
     @pytest.fixture
     def target(self, env):
@@ -46,6 +57,13 @@ class TestHandler:
         sys.path = original_path
         sys.modules = original_modules
 
+    @pytest.fixture(autouse=True)
+    def renders(self, mocker: MockerFixture, target):
+        # the sample events of different tests share their ids
+        import render_cache
+
+        return mocker.patch("index.renders", render_cache.RenderCache())
+
     @pytest.fixture
     def lambda_context(self) -> LambdaContext:
         return LambdaContext()
@@ -147,6 +165,17 @@ class TestHandler:
             "isBase64Encoded": False,
         }
 
+    def assert_chat_message_posted(
+        self,
+        mocked_session: typing.Any,
+        url: str,
+        message: typing.Dict[str, typing.Any],
+    ) -> None:
+        mocked_session.post.assert_called_once()
+        kwargs = mocked_session.post.call_args.kwargs
+        assert kwargs["url"] == url
+        assert json.loads(kwargs["data"]) == message
+
     def assert_response(
         self,
         response: typing.Dict[str, typing.Any],
@@ -156,7 +185,8 @@ class TestHandler:
         assert response["statusCode"] == status_code
         assert json.loads(response["body"]) == body
 
-    def test_create_issue(
+    @pytest.mark.parametrize("name", event_corpus.names())
+    def test_event_messages(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -164,174 +194,80 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        name: str,
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T11:02:22Z",
+        case = event_corpus.load(name)
+        lambda_event = self._lambda_event_wrapper(
+            backlog_event=case.event,
+            webhook_key="foo",
+            webhook_token="bar",
+            space_id="xxxx",
+        )
+
+        mocked_session = mocker.patch("index.chat_client.session")
+        response = target(lambda_event, lambda_context)
+
+        calls = mocked_session.post.call_args_list
+        assert [call.kwargs["url"] for call in calls] == [
+            "https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar"
+        ] * len(case.messages)
+        assert [json.loads(call.kwargs["data"]) for call in calls] == (
+            case.messages
+        )
+        self.assert_response(response, 200, {"message": "OK"})
+
+    def _bulk_update_event(self, count: int) -> typing.Dict[str, typing.Any]:
+        return {
             "project": {
                 "archived": False,
-                "projectKey": "TEST",
                 "name": "TestProject",
                 "chartEnabled": False,
-                "id": 100,
                 "subtaskingEnabled": False,
+                "id": 100,
+                "projectKey": "TEST",
             },
-            "id": 10,
-            "type": 1,
+            "created": "2017-07-20T16:09:19Z",
             "content": {
-                "summary": "test issue",
-                "key_id": 100,
-                "customFields": [],
-                "dueDate": "2017-07-19",
-                "description": "test description",
-                "priority": {
-                    "name": "",
-                    "id": None,
-                },
-                "resolution": {
-                    "name": "",
-                    "id": None,
-                },
-                "actualHours": None,
-                "issueType": {
-                    "color": "null",
-                    "name": "Bug",
-                    "displayOrder": None,
-                    "id": 400,
-                    "projectId": None,
-                },
-                "milestone": [
+                "link": [
                     {
-                        "archived": "false",
-                        "releaseDueDate": "null",
-                        "name": "prototype release",
-                        "displayOrder": None,
-                        "description": "",
-                        "id": None,
-                        "projectId": None,
-                        "startDate": "null",
+                        "key_id": str(i),
+                        "id": str(i),
+                        "title": f"テスト課題 {i}",
                     }
+                    for i in range(1, count + 1)
                 ],
-                "versions": [
+                "changes": [
                     {
-                        "archived": "false",
-                        "releaseDueDate": "null",
-                        "name": "Version0.1",
-                        "displayOrder": None,
-                        "description": "",
-                        "id": None,
-                        "projectId": None,
-                        "startDate": "null",
+                        "field": "priority",
+                        "type": "standard",
+                        "new_value": "高",
                     }
                 ],
-                "parentIssueId": None,
-                "estimatedHours": None,
-                "id": 100,
-                "assignee": None,
-                "category": [
-                    {
-                        "name": "Category1",
-                        "displayOrder": None,
-                        "id": None,
-                    },
-                    {
-                        "name": "Category2",
-                        "displayOrder": None,
-                        "id": None,
-                    },
-                ],
-                "startDate": "",
-                "status": {"name": "In Progress", "id": 2},
+                "tx_id": "200",
             },
             "notifications": [],
             "createdUser": {
-                "nulabAccount": None,
+                "roleType": 1,
                 "name": "John Doe",
+                "userId": None,
+                "nulabAccount": None,
                 "mailAddress": None,
                 "id": 103640,
-                "roleType": 1,
-                "userId": None,
             },
+            "type": 14,
+            "id": 10,
         }
-        expected_chat_message = {
-            "text": "課題 TEST-100 を追加",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST-100 test issue",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test description",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "種別",
-                                        "content": "Bug",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "マイルストーン",
-                                        "content": "prototype release",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "カテゴリー",
-                                        "content": "Category1, Category2",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "バージョン",
-                                        "content": "Version0.1",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "期限日",
-                                        "content": "2017-07-19",
-                                        "contentMultiline": True,
-                                        "icon": "CLOCK",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "課題を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/view/TEST-100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
+
+    def test_bulk_update_issue_split_into_messages(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+    ) -> None:
+        backlog_event = self._bulk_update_event(1000)
 
         lambda_event = self._lambda_event_wrapper(
             backlog_event=backlog_event,
@@ -340,26 +276,118 @@ class TestHandler:
             space_id="xxxx",
         )
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
+
+        calls = mocked_session.post.call_args_list
+        assert len(calls) > 1
+        assert all(len(call.kwargs["data"]) <= 32_000 for call in calls)
+        messages = [json.loads(call.kwargs["data"]) for call in calls]
+        assert [m["text"] for m in messages] == ["課題をまとめて更新"] + [
+            f"課題をまとめて更新 ({page})" for page in range(2, len(calls) + 1)
+        ]
+        labels = [
+            widget["keyValue"]["topLabel"]
+            for message in messages
+            for widget in message["cards"][0]["sections"][0]["widgets"]
+        ]
+        assert labels == [f"TEST-{i}" for i in range(1, 1001)]
+        assert [len(m["cards"][0]["sections"]) for m in messages] == [3] + [
+            2
+        ] * (len(calls) - 1)
 
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_update_issue(
+    def test_bulk_update_issue_memory(self, target) -> None:
+        import index
+
+        backlog_event = self._bulk_update_event(10_000)
+        index.render(backlog_event, "https://backlog.com")
+
+        sizes = []
+        tracemalloc.start()
+        try:
+            # each page is dropped once sent, as by the handler
+            for data in index.render(backlog_event, "https://backlog.com"):
+                sizes.append(len(data))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # pages are encoded one at a time, so the peak does not grow with
+        # the number of links, unlike the 2 MB or so sent in total
+        assert len(sizes) > 10
+        assert sum(sizes) > 2_000_000
+        assert peak < 1_000_000
+
+    @pytest.fixture
+    def tenant_configs(self, mocker: MockerFixture, target):
+        import boto3
+        import tenants
+
+        with mock_ssm():
+            client = boto3.client("ssm")
+            client.put_parameter(
+                Name="/backlog-google-chat/tenants/acme",
+                Type="String",
+                Value=json.dumps(
+                    {
+                        "backlog_base_url": "https://acme.backlog.jp/",
+                        "event_types": ["CREATE_WIKI", "UPDATE_WIKI"],
+                        "space_ids": ["xxxx"],
+                        "rules": {
+                            "xxxx": [
+                                {
+                                    "event_types": ["UPDATE_WIKI"],
+                                    "project_keys": ["TEST"],
+                                }
+                            ]
+                        },
+                    }
+                ),
+            )
+            client.put_parameter(
+                Name="/backlog-google-chat/tenants/broken",
+                Type="String",
+                Value=json.dumps({"event_types": ["CREATE_WIKI"]}),
+            )
+            yield mocker.patch(
+                "index.tenant_configs",
+                tenants.TenantConfigCache(
+                    store=tenants.SsmTenantStore(
+                        "/backlog-google-chat/tenants", client=client
+                    ),
+                ),
+            )
+
+    def _tenant_lambda_event(
         self,
-        mocker: MockerFixture,
-        target: typing.Callable[
-            [typing.Dict[str, typing.Any], LambdaContext],
-            typing.Dict[str, typing.Any],
-        ],
-        lambda_context: LambdaContext,
-    ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T11:45:58Z",
+        backlog_event: typing.Dict[str, typing.Any],
+        tenant_id: str,
+        space_id: str,
+    ) -> typing.Dict[str, typing.Any]:
+        lambda_event = self._lambda_event_wrapper(
+            backlog_event=backlog_event,
+            webhook_key="foo",
+            webhook_token="bar",
+            space_id=space_id,
+        )
+        path = f"/v1/tenants/{tenant_id}/spaces/{space_id}/messages"
+        lambda_event["resource"] = (
+            "/v1/tenants/{tenant_id}/spaces/{space_id}/messages"  # noqa
+        )
+        lambda_event["path"] = path
+        lambda_event["requestContext"]["path"] = path
+        lambda_event["requestContext"]["resourcePath"] = path
+        lambda_event["pathParameters"] = {
+            "tenant_id": tenant_id,
+            "space_id": space_id,
+        }
+        return lambda_event
+
+    def _wiki_event(self, event_type: int) -> typing.Dict[str, typing.Any]:
+        return {
+            "created": "2017-07-19T12:00:42Z",
             "project": {
                 "archived": False,
                 "projectKey": "TEST",
@@ -369,34 +397,11 @@ class TestHandler:
                 "subtaskingEnabled": False,
             },
             "id": 10,
-            "type": 2,
+            "type": event_type,
             "content": {
-                "summary": "test issue",
-                "key_id": 100,
-                "changes": [
-                    {
-                        "field": "priority",
-                        "old_value": "",
-                        "type": "standard",
-                        "new_value": "",
-                    },
-                    {
-                        "field": "status",
-                        "old_value": "1",
-                        "new_value": "2",
-                    },
-                    {
-                        "field": "description",
-                        "old_value": "old statement",
-                        "new_value": "new statement",
-                    },
-                ],
-                "description": "test description",
-                "comment": {
-                    "id": 200,
-                    "content": "test comment",
-                },
+                "name": "test wiki",
                 "id": 100,
+                "content": "test content",
             },
             "notifications": [],
             "createdUser": {
@@ -408,97 +413,39 @@ class TestHandler:
                 "userId": None,
             },
         }
-        expected_chat_message = {
-            "text": "課題 TEST-100 を更新",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST-100 test issue",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test comment",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "優先度",
-                                        "content": "-- > --",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "状態",
-                                        "content": "未対応 > 処理中",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "詳細",
-                                        "content": "\n".join(
-                                            [
-                                                "--- ",
-                                                "+++ ",
-                                                "@@ -1 +1 @@",
-                                                "-old statement",
-                                                "+new statement",
-                                                "",
-                                            ]
-                                        ),
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "課題を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/view/TEST-100#comment-200",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
 
-        lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
-            webhook_key="foo",
-            webhook_token="bar",
-            space_id="xxxx",
+    def test_tenant_routing(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        tenant_configs: typing.Any,
+    ) -> None:
+        lambda_event = self._tenant_lambda_event(
+            self._wiki_event(5), tenant_id="acme", space_id="xxxx"
         )
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        mocked_session.post.assert_called_once()
+        kwargs = mocked_session.post.call_args.kwargs
+        assert (
+            kwargs["url"]
+            == "https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar"  # noqa
+        )
+        assert (
+            json.loads(kwargs["data"])["cards"][0]["sections"][-1]["widgets"][
+                0
+            ]["buttons"][0]["textButton"]["onClick"]["openLink"]["url"]
+            == "https://acme.backlog.jp/alias/wiki/100"
+        )
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_update_issue_with_shared_files(
+    def test_tenant_header_routing(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -506,115 +453,96 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        tenant_configs: typing.Any,
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T11:45:58Z",
-            "project": {
-                "archived": False,
-                "projectKey": "TEST",
-                "name": "TestProject",
-                "chartEnabled": False,
-                "id": 100,
-                "subtaskingEnabled": False,
-            },
-            "id": 10,
-            "type": 2,
-            "content": {
-                "summary": "test issue",
-                "key_id": 100,
-                "changes": [],
-                "description": "test description",
-                "shared_files": [
-                    {
-                        "size": 100,
-                        "name": "test.png",
-                        "id": 999,
-                        "dir": "/test",
-                    }
-                ],
-                "comment": None,
-                "id": 100,
-            },
-            "notifications": [],
-            "createdUser": {
-                "nulabAccount": None,
-                "name": "John Doe",
-                "mailAddress": None,
-                "id": 103640,
-                "roleType": 1,
-                "userId": None,
-            },
-        }
-        expected_chat_message = {
-            "text": "課題 TEST-100 を更新",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST-100 test issue",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "keyValue": {
-                                        "topLabel": "添付ファイル",
-                                        "content": "test.png",
-                                        "contentMultiline": True,
-                                        "button": {
-                                            "textButton": {
-                                                "text": "ファイルを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/ViewSharedFile.action?projectKey=TEST&sharedFileId=999",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "課題を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/view/TEST-100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
+        lambda_event["headers"]["x-backlog-tenant"] = "acme"
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        mocked_session.post.assert_called_once()
+        assert "https://acme.backlog.jp/alias/wiki/100" in (
+            mocked_session.post.call_args.kwargs["data"].decode("utf-8")
+        )
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_add_comment(
+    @pytest.mark.parametrize(
+        "tenant_id, space_id, event_type, status_code",
+        [
+            ("unknown", "xxxx", 5, 404),
+            ("broken", "xxxx", 5, 404),
+            ("acme", "yyyy", 5, 404),
+            ("acme", "xxxx", 7, 200),
+            ("acme", "xxxx", 6, 200),
+        ],
+    )
+    def test_tenant_rejected(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        tenant_configs: typing.Any,
+        tenant_id: str,
+        space_id: str,
+        event_type: int,
+        status_code: int,
+    ) -> None:
+        lambda_event = self._tenant_lambda_event(
+            self._wiki_event(event_type), tenant_id=tenant_id, space_id=space_id
+        )
+
+        mocked_session = mocker.patch("index.chat_client.session")
+        response = target(lambda_event, lambda_context)
+
+        mocked_session.post.assert_not_called()
+        assert response["statusCode"] == status_code
+
+    @pytest.fixture
+    def spill_queue(self, mocker: MockerFixture, target):
+        import boto3
+        import retry_queue
+
+        with mock_sqs():
+            client = boto3.client("sqs")
+            queue_url = client.create_queue(
+                QueueName="retry.fifo", Attributes={"FifoQueue": "true"}
+            )["QueueUrl"]
+            mocker.patch(
+                "index.spill_queue",
+                retry_queue.RetryQueue(queue_url, client=client),
+            )
+            yield client, queue_url
+
+    @pytest.fixture
+    def breaker(self, mocker: MockerFixture, target):
+        import circuit_breaker
+
+        return mocker.patch(
+            "index.breaker",
+            circuit_breaker.CircuitBreaker(failure_threshold=2),
+        )
+
+    def _spilled_messages(
+        self, client: typing.Any, queue_url: str
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        response = client.receive_message(
+            QueueUrl=queue_url, MaxNumberOfMessages=10
+        )
+        return [
+            json.loads(record["Body"])
+            for record in response.get("Messages", [])
+        ]
+
+    def test_timeout_spills_to_retry_queue(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -622,160 +550,62 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        spill_queue: typing.Any,
+        breaker: typing.Any,
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T11:50:16Z",
-            "project": {
-                "archived": False,
-                "projectKey": "TEST",
-                "name": "TestProject",
-                "chartEnabled": False,
-                "id": 100,
-                "subtaskingEnabled": False,
-            },
-            "id": 10,
-            "type": 3,
-            "content": {
-                "summary": "test issue",
-                "key_id": 100,
-                "description": "test description",
-                "comment": {
-                    "id": 200,
-                    "content": "test comment",
-                },
-                "id": 100,
-            },
-            "notifications": [],
-            "createdUser": {
-                "nulabAccount": None,
-                "name": "John Doe",
-                "mailAddress": None,
-                "id": 103640,
-                "roleType": 1,
-                "userId": None,
-            },
-        }
-        expected_chat_message = {
-            "text": "課題 TEST-100 にコメント",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST-100 test issue",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test comment",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "課題を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/view/TEST-100#comment-200",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
+        import requests
 
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.side_effect = requests.ReadTimeout()
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        mocked_session.post.assert_called_once()
+        assert mocked_session.post.call_args.kwargs["timeout"] == (3.05, 10.0)
+        spilled = self._spilled_messages(*spill_queue)
+        assert len(spilled) == 1
+        assert spilled[0]["path"] == "/v1/spaces/xxxx/messages"
+        assert spilled[0]["query"] == {"key": "foo", "token": "bar"}
+        assert spilled[0]["body"] == (
+            mocked_session.post.call_args.kwargs["data"].decode("utf-8")
+        )
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_delete_issue(
+    def test_exhausted_budget_spills_without_request(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
             [typing.Dict[str, typing.Any], LambdaContext],
             typing.Dict[str, typing.Any],
         ],
-        lambda_context: LambdaContext,
+        spill_queue: typing.Any,
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T11:55:35Z",
-            "project": {
-                "archived": False,
-                "projectKey": "TEST",
-                "name": "TestProject",
-                "chartEnabled": False,
-                "id": 100,
-                "subtaskingEnabled": False,
-            },
-            "id": 10,
-            "type": 4,
-            "content": {
-                "key_id": 100,
-                "id": 100,
-            },
-            "notifications": [],
-            "createdUser": {
-                "nulabAccount": None,
-                "name": "John Doe",
-                "mailAddress": None,
-                "id": 103640,
-                "roleType": 1,
-                "userId": None,
-            },
-        }
-        expected_chat_message = {
-            "text": "課題 TEST-100 を削除",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST-100",
-                        "subtitle": "John Doe",
-                    },
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
 
-        mocked_requests = mocker.patch("index.requests")
-        response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
+        mocked_session = mocker.patch("index.chat_client.session")
+        response = target(
+            lambda_event, LambdaContext(remaining_time_in_millis=900)
         )
 
+        mocked_session.post.assert_not_called()
+        assert len(self._spilled_messages(*spill_queue)) == 1
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_create_wiki(
+    @pytest.mark.parametrize(
+        "failure", ["timeout", "connection_error", "unavailable"]
+    )
+    def test_timeout_without_retry_queue(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -783,92 +613,125 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        breaker: typing.Any,
+        failure: str,
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T12:00:42Z",
-            "project": {
-                "archived": False,
-                "projectKey": "TEST",
-                "name": "TestProject",
-                "chartEnabled": False,
-                "id": 100,
-                "subtaskingEnabled": False,
-            },
-            "id": 10,
-            "type": 5,
-            "content": {
-                "name": "test wiki",
-                "id": 100,
-                "content": "test content",
-            },
-            "notifications": [],
-            "createdUser": {
-                "nulabAccount": None,
-                "name": "John Doe",
-                "mailAddress": None,
-                "id": 103640,
-                "roleType": 1,
-                "userId": None,
-            },
-        }
-        expected_chat_message = {
-            "text": "Wiki を追加",
-            "cards": [
-                {
-                    "header": {
-                        "title": "test wiki",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test content",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "Wiki を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/alias/wiki/100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
+        import requests
 
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
 
-        mocked_requests = mocker.patch("index.requests")
+        mocker.patch("index.spill_queue", None)
+        count = mocker.spy(sys.modules["telemetry"], "count")
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.side_effect = [
+            {
+                "timeout": requests.ConnectTimeout(),
+                "connection_error": requests.ConnectionError(),
+                "unavailable": mocker.MagicMock(ok=False, status_code=503),
+            }[failure]
+        ]
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        mocked_session.post.assert_called_once()
+        # the message is dropped, and counted as such, only once
+        assert [
+            call for call in count.call_args_list if call.args[0] == "Failed"
+        ] == [mocker.call("Failed", 1)]
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_update_wiki(
+    @pytest.mark.parametrize(
+        "failure", ["connection_error", "unavailable", "throttled"]
+    )
+    def test_retry_handler(
+        self,
+        mocker: MockerFixture,
+        target: typing.Any,
+        lambda_context: LambdaContext,
+        breaker: typing.Any,
+        failure: str,
+    ) -> None:
+        import requests
+        from index import retry_handler
+
+        records = [
+            {
+                "messageId": str(i),
+                "body": json.dumps(
+                    {
+                        "path": "/v1/spaces/xxxx/messages",
+                        "query": {"key": "foo", "token": "bar"},
+                        "body": json.dumps({"text": f"message {i}"}),
+                    }
+                ),
+            }
+            for i in range(3)
+        ]
+
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.side_effect = [
+            mocker.MagicMock(ok=True),
+            {
+                "connection_error": requests.ConnectionError(),
+                "unavailable": mocker.MagicMock(ok=False, status_code=503),
+                "throttled": mocker.MagicMock(ok=False, status_code=429),
+            }[failure],
+        ]
+        response = retry_handler({"Records": records}, lambda_context)
+
+        assert [
+            json.loads(call.kwargs["data"])
+            for call in mocked_session.post.call_args_list
+        ] == [{"text": "message 0"}, {"text": "message 1"}]
+        assert (
+            mocked_session.post.call_args.kwargs["url"]
+            == "https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar"  # noqa
+        )
+        assert response == {
+            "batchItemFailures": [
+                {"itemIdentifier": "1"},
+                {"itemIdentifier": "2"},
+            ]
+        }
+
+    def test_retry_handler_drops_rejected_message(
+        self,
+        mocker: MockerFixture,
+        target: typing.Any,
+        lambda_context: LambdaContext,
+        breaker: typing.Any,
+    ) -> None:
+        from index import retry_handler
+
+        records = [
+            {
+                "messageId": str(i),
+                "body": json.dumps(
+                    {
+                        "path": "/v1/spaces/xxxx/messages",
+                        "query": {"key": "foo", "token": "bar"},
+                        "body": json.dumps({"text": f"message {i}"}),
+                    }
+                ),
+            }
+            for i in range(2)
+        ]
+
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.side_effect = [
+            mocker.MagicMock(ok=False, status_code=400),
+            mocker.MagicMock(ok=True),
+        ]
+        response = retry_handler({"Records": records}, lambda_context)
+
+        assert mocked_session.post.call_count == 2
+        assert response == {"batchItemFailures": []}
+
+    def test_open_circuit_spills_without_request(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -876,104 +739,101 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        spill_queue: typing.Any,
+        breaker: typing.Any,
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T12:02:57Z",
-            "project": {
-                "archived": False,
-                "projectKey": "TEST",
-                "name": "TestProject",
-                "chartEnabled": False,
-                "id": 100,
-                "subtaskingEnabled": False,
-            },
-            "id": 10,
-            "type": 6,
-            "content": {
-                "name": "test wiki",
-                "diff": "1c1\n<test content---\n>test",
-                "id": 100,
-                "version": 3,
-                "content": "test content",
-            },
-            "notifications": [],
-            "createdUser": {
-                "nulabAccount": None,
-                "name": "John Doe",
-                "mailAddress": None,
-                "id": 103640,
-                "roleType": 1,
-                "userId": None,
-            },
-        }
-        expected_chat_message = {
-            "text": "Wiki を更新",
-            "cards": [
-                {
-                    "header": {
-                        "title": "test wiki",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "1c1\n<test content---\n>test",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "Wiki を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/alias/wiki/100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                        {
-                                            "textButton": {
-                                                "text": "差分を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/alias/wiki/diff/100/2...3",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
 
-        mocked_requests = mocker.patch("index.requests")
-        response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.return_value.ok = False
+        mocked_session.post.return_value.status_code = 503
+        responses = [
+            target(lambda_event, LambdaContext(aws_request_id=str(i)))
+            for i in range(3)
+        ]
+
+        # the two 503 answers are spilled as well
+        assert mocked_session.post.call_count == 2
+        assert len(self._spilled_messages(*spill_queue)) == 3
+        for response in responses:
+            self.assert_response(response, 200, {"message": "OK"})
+
+    @pytest.mark.parametrize(
+        "failure", ["connection_error", "unavailable", "throttled"]
+    )
+    def test_failed_page_spills_with_the_rest(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        spill_queue: typing.Any,
+        breaker: typing.Any,
+        failure: str,
+    ) -> None:
+        import requests
+
+        lambda_event = self._lambda_event_wrapper(
+            backlog_event=self._wiki_event(5),
+            webhook_key="foo",
+            webhook_token="bar",
+            space_id="xxxx",
         )
+        pages = tuple(
+            json.dumps({"text": f"page {i}"}).encode() for i in range(3)
+        )
+        mocker.patch("index.render", return_value=iter(pages))
+
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.side_effect = [
+            mocker.MagicMock(ok=True),
+            {
+                "connection_error": requests.ConnectionError(),
+                "unavailable": mocker.MagicMock(ok=False, status_code=503),
+                "throttled": mocker.MagicMock(ok=False, status_code=429),
+            }[failure],
+        ]
+        response = target(lambda_event, lambda_context)
 
+        assert mocked_session.post.call_count == 2
+        assert [
+            json.loads(message["body"])
+            for message in self._spilled_messages(*spill_queue)
+        ] == [{"text": "page 1"}, {"text": "page 2"}]
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_delete_wiki(
+    @pytest.fixture
+    def authenticator(self, mocker: MockerFixture, target):
+        import auth
+        import boto3
+
+        with mock_ssm():
+            client = boto3.client("ssm")
+            client.put_parameter(
+                Name="/backlog-google-chat/secrets/xxxx",
+                Type="SecureString",
+                Value="s3cr3t",
+            )
+            yield mocker.patch(
+                "index.authenticator",
+                auth.WebhookAuthenticator(
+                    auth.SecretCache(
+                        auth.SsmSecretStore(
+                            "/backlog-google-chat/secrets", client=client
+                        )
+                    )
+                ),
+            )
+
+    @pytest.mark.parametrize("in_header", [False, True])
+    def test_authenticated(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -981,63 +841,39 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        authenticator: typing.Any,
+        in_header: bool,
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T12:05:24Z",
-            "project": {
-                "archived": False,
-                "projectKey": "TEST",
-                "name": "TestProject",
-                "chartEnabled": False,
-                "id": 100,
-                "subtaskingEnabled": False,
-            },
-            "id": 10,
-            "type": 7,
-            "content": {
-                "name": "test wiki",
-                "id": 100,
-                "content": "test content",
-            },
-            "notifications": [],
-            "createdUser": {
-                "nulabAccount": None,
-                "name": "John Doe",
-                "mailAddress": None,
-                "id": 103640,
-                "roleType": 1,
-                "userId": None,
-            },
-        }
-        expected_chat_message = {
-            "text": "Wiki を削除",
-            "cards": [
-                {
-                    "header": {
-                        "title": "test wiki",
-                        "subtitle": "John Doe",
-                    },
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
+        if in_header:
+            lambda_event["headers"]["x-webhook-secret"] = "s3cr3t"
+        else:
+            lambda_event["queryStringParameters"]["secret"] = "s3cr3t"
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        mocked_session.post.assert_called_once()
+        assert (
+            mocked_session.post.call_args.kwargs["url"]
+            == "https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar"  # noqa
+        )
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_commit_subversion(
+    @pytest.mark.parametrize(
+        "space_id, secret",
+        [
+            ("xxxx", None),
+            ("xxxx", "wrong"),
+            ("yyyy", "s3cr3t"),
+        ],
+    )
+    def test_unauthenticated(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -1045,91 +881,28 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        authenticator: typing.Any,
+        space_id: str,
+        secret: typing.Optional[str],
     ) -> None:
-        backlog_event = {
-            "created": "2017-07-19T12:07:35Z",
-            "project": {
-                "archived": False,
-                "projectKey": "TEST",
-                "name": "TestProject",
-                "chartEnabled": False,
-                "id": 100,
-                "subtaskingEnabled": False,
-            },
-            "id": 10,
-            "type": 11,
-            "content": {
-                "rev": 100,
-                "comment": "test commit",
-            },
-            "notifications": [],
-            "createdUser": {
-                "nulabAccount": None,
-                "name": "John Doe",
-                "mailAddress": None,
-                "id": 103640,
-                "roleType": 1,
-                "userId": None,
-            },
-        }
-        expected_chat_message = {
-            "text": "Subversion にコミット",
-            "cards": [
-                {
-                    "header": {
-                        "title": "r100",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test commit",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "コミットを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/rev/TEST/100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event={},
             webhook_key="foo",
             webhook_token="bar",
-            space_id="xxxx",
+            space_id=space_id,
         )
+        # the body must not be decoded before the secret is checked
+        lambda_event["body"] = "{not json"
+        if secret:
+            lambda_event["queryStringParameters"]["secret"] = secret
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
-        self.assert_response(response, 200, {"message": "OK"})
+        mocked_session.post.assert_not_called()
+        assert response["statusCode"] == 401
 
-    def test_push_git(
+    def test_request_too_large(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -1138,115 +911,22 @@ class TestHandler:
         ],
         lambda_context: LambdaContext,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:10:04Z",
-            "content": {
-                "revision_count": 1,
-                "change_type": "update",
-                "repository": {
-                    "name": "app",
-                    "id": 3,
-                },
-                "revision_type": "commit",
-                "ref": "refs/heads/test",
-                "revisions": [
-                    {
-                        "comment": "test",
-                        "rev": "e1cf1103242ea1ce59382ac2e2ab4de43751524d",
-                    }
-                ],
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 12,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "Git リポジトリにプッシュ",
-            "cards": [
-                {
-                    "header": {
-                        "title": "app/test",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "keyValue": {
-                                        "topLabel": "e1cf110324",
-                                        "content": "test",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                        "button": {
-                                            "textButton": {
-                                                "text": "コミットを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/git/TEST/app/commit/e1cf1103242ea1ce59382ac2e2ab4de43751524d",  # noqa
-                                                    }
-                                                },
-                                            }
-                                        },
-                                    }
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "ブランチを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/git/TEST/app/tree/test",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
+        mocker.patch("index.max_request_bytes", 256)
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
-        self.assert_response(response, 200, {"message": "OK"})
+        mocked_session.post.assert_not_called()
+        assert response["statusCode"] == 413
 
-    def test_create_git(
+    @pytest.mark.parametrize("base64_encoded", [False, True])
+    def test_request_within_limit(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -1254,94 +934,59 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        base64_encoded: bool,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:10:09Z",
-            "content": {
-                "repository": {
-                    "description": "description",
-                    "id": 100,
-                    "name": "test",
-                },
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 13,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "Git リポジトリを作成",
-            "cards": [
-                {
-                    "header": {
-                        "title": "test",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "description",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "リポジトリを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/git/TEST/test",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=self._wiki_event(5),
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
-
-        mocked_requests = mocker.patch("index.requests")
+        body = lambda_event["body"].encode("utf-8")
+        # the limit applies to the body sent by Backlog, not to the base64
+        # form that API Gateway may hand over
+        mocker.patch("index.max_request_bytes", len(body))
+        if base64_encoded:
+            lambda_event["body"] = base64.b64encode(body).decode("ascii")
+            lambda_event["isBase64Encoded"] = True
+
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        mocked_session.post.assert_called_once()
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_bulk_update_issue(
+    @pytest.mark.parametrize(
+        "body",
+        [
+            "{",
+            "[]",
+            json.dumps({"type": 5}),
+            json.dumps(
+                {
+                    key: value
+                    for key, value in event_corpus.load(
+                        "create_wiki"
+                    ).event.items()
+                    if key != "createdUser"
+                }
+            ),
+            json.dumps(
+                {
+                    **event_corpus.load("create_wiki").event,
+                    "content": {"id": 1, "name": 1, "content": 1},
+                }
+            ),
+        ],
+        ids=[
+            "not_json",
+            "not_object",
+            "missing_fields",
+            "missing_user",
+            "wrong_types",
+        ],
+    )
+    def test_invalid_payload(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -1349,152 +994,23 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        body: str,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:09:19Z",
-            "content": {
-                "link": [
-                    {
-                        "key_id": "100",
-                        "id": "100",
-                        "title": "test issue1",
-                    },
-                    {
-                        "key_id": "101",
-                        "id": "101",
-                        "title": "test issue2",
-                    },
-                ],
-                "changes": [
-                    {
-                        "field": "priority",
-                        "type": "standard",
-                        "new_value": "高",
-                    }
-                ],
-                "tx_id": "200",
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 14,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "課題をまとめて更新",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TestProject (TEST)",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "keyValue": {
-                                        "topLabel": "TEST-100",
-                                        "content": "test issue1",
-                                        "contentMultiline": True,
-                                        "icon": "TICKET",
-                                        "button": {
-                                            "textButton": {
-                                                "text": "課題を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/view/TEST-100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "TEST-101",
-                                        "content": "test issue2",
-                                        "contentMultiline": True,
-                                        "icon": "TICKET",
-                                        "button": {
-                                            "textButton": {
-                                                "text": "課題を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/view/TEST-101",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "keyValue": {
-                                        "topLabel": "優先度",
-                                        "content": "-- > 高",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "プロジェクトを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/projects/TEST",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event={},
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
+        lambda_event["body"] = body
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
-        self.assert_response(response, 200, {"message": "OK"})
+        mocked_session.post.assert_not_called()
+        assert response["statusCode"] == 400
 
-    def test_join_project(
+    def test_rules_skip_malformed_values(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -1503,103 +1019,48 @@ class TestHandler:
         ],
         lambda_context: LambdaContext,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:10:13Z",
-            "content": {
-                "comment": "",
-                "users": [
+        import tenants
+
+        mocker.patch(
+            "index.tenant_configs",
+            tenants.TenantConfigCache(
+                default=tenants.TenantConfig.from_raw(
+                    tenants.DEFAULT_TENANT,
                     {
-                        "id": 100,
-                        "name": "test user",
-                        "nulabAccount": {
-                            "nulabId": "snGjFs8agNSJeI4ZdeiVXsTiKJd0jPJAoD60apGa0VS8RPspt4",  # noqa
-                            "name": "matsu ( Yusuke Matsuura )",
-                            "uniqueId": "matsuzj",
+                        "backlog_base_url": "https://backlog.com",
+                        "rules": {
+                            "*": [
+                                {"issue_types": ["バグ"]},
+                                {"assignees": ["john"]},
+                            ]
                         },
-                    }
-                ],
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 15,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "メンバーを変更",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TestProject (TEST)",
-                        "subtitle": "John Doe",
                     },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "keyValue": {
-                                        "topLabel": "参加",
-                                        "content": "test user",
-                                        "contentMultiline": True,
-                                        "icon": "PERSON",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "プロジェクトを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/projects/TEST",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
+                )
+            ),
+        )
+        event = event_corpus.load("create_issue").event
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event={
+                **event,
+                "content": {
+                    **event["content"],
+                    "issueType": {"id": 1, "name": ["バグ"]},
+                    "assignee": {"id": 1, "name": {}, "roleType": 1},
+                },
+            },
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        # no rule matches a value of the wrong type
+        mocked_session.post.assert_called_once()
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_leave_project(
+    def test_render_cache_fan_out(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -1607,103 +1068,162 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        renders: typing.Any,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:10:18Z",
-            "content": {
-                "users": [
+        import index
+
+        render = mocker.spy(index, "render")
+        mocked_session = mocker.patch("index.chat_client.session")
+        for space_id in ["xxxx", "yyyy", "xxxx"]:
+            response = target(
+                self._lambda_event_wrapper(
+                    backlog_event=self._wiki_event(5),
+                    webhook_key="foo",
+                    webhook_token="bar",
+                    space_id=space_id,
+                ),
+                lambda_context,
+            )
+            self.assert_response(response, 200, {"message": "OK"})
+
+        render.assert_called_once()
+        posts = mocked_session.post.call_args_list
+        assert [call.kwargs["url"].split("?")[0] for call in posts] == [
+            "https://api.example.com/v1/spaces/xxxx/messages",
+            "https://api.example.com/v1/spaces/yyyy/messages",
+            "https://api.example.com/v1/spaces/xxxx/messages",
+        ]
+        assert posts[0].kwargs["data"] is posts[1].kwargs["data"]
+        assert (renders.hits, renders.misses) == (2, 1)
+
+    def test_render_cache_not_shared_by_other_events_with_the_id(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        renders: typing.Any,
+    ) -> None:
+        forged = self._wiki_event(5)
+        forged["content"]["name"] = "forged wiki"
+
+        mocked_session = mocker.patch("index.chat_client.session")
+        for space_id, backlog_event in [
+            ("xxxx", self._wiki_event(5)),
+            ("yyyy", forged),
+        ]:
+            response = target(
+                self._lambda_event_wrapper(
+                    backlog_event=backlog_event,
+                    webhook_key="foo",
+                    webhook_token="bar",
+                    space_id=space_id,
+                ),
+                lambda_context,
+            )
+            self.assert_response(response, 200, {"message": "OK"})
+
+        first, second = [
+            json.loads(call.kwargs["data"])
+            for call in mocked_session.post.call_args_list
+        ]
+        assert first["cards"][0]["header"]["title"] != "forged wiki"
+        assert second["cards"][0]["header"]["title"] == "forged wiki"
+        assert (renders.hits, renders.misses) == (0, 2)
+
+    @pytest.mark.parametrize(
+        "thread_updates, query, expected",
+        [
+            (True, {}, {"threadKey": "TEST-100"}),
+            (False, {}, {}),
+            (True, {"threadKey": "all"}, {"threadKey": "all"}),
+            (False, {"threadKey": "all"}, {"threadKey": "all"}),
+        ],
+    )
+    def test_thread_updates(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        thread_updates: bool,
+        query: typing.Dict[str, str],
+        expected: typing.Dict[str, str],
+    ) -> None:
+        from urllib import parse
+
+        import tenants
+
+        mocker.patch(
+            "index.tenant_configs",
+            tenants.TenantConfigCache(
+                default=tenants.TenantConfig.from_raw(
+                    tenants.DEFAULT_TENANT,
                     {
-                        "id": 100,
-                        "name": "test user",
-                        "nulabAccount": {
-                            "nulabId": "snGjFs8agNSJeI4ZdeiVXsTiKJd0jPJAoD60apGa0VS8RPspt4",  # noqa
-                            "name": "matsu ( Yusuke Matsuura )",
-                            "uniqueId": "matsuzj",
-                        },
-                    }
-                ],
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 16,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "メンバーを変更",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TestProject (TEST)",
-                        "subtitle": "John Doe",
+                        "backlog_base_url": "https://backlog.com",
+                        "thread_updates": thread_updates,
                     },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "keyValue": {
-                                        "topLabel": "脱退",
-                                        "content": "test user",
-                                        "contentMultiline": True,
-                                        "icon": "PERSON",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "プロジェクトを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/projects/TEST",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
+                )
+            ),
+        )
         lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
+            backlog_event=event_corpus.load("delete_issue").event,
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
+        lambda_event["queryStringParameters"].update(query)
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
         self.assert_response(response, 200, {"message": "OK"})
+        url = mocked_session.post.call_args.kwargs["url"]
+        sent = dict(parse.parse_qsl(parse.urlsplit(url).query))
+        assert sent.pop("key") == "foo"
+        assert sent.pop("token") == "bar"
+        assert sent.get("threadKey") == expected.get("threadKey")
+        if thread_updates and not query:
+            assert sent["messageReplyOption"] == (
+                "REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD"
+            )
 
-    def test_create_pull_request(
+    @pytest.fixture
+    def stub_chat(self, mocker: MockerFixture, target):
+        root_dir = Path(__file__).resolve().parents[2]
+        sys.path.append(str(root_dir / "tools"))
+        from gchat_client import GoogleChatClient
+        from stub_chat import StubChatServer
+
+        with StubChatServer() as stub:
+            mocker.patch("index.chat_client", GoogleChatClient(stub.url))
+            yield stub
+
+    def _issue_update(
+        self, event_id: int, *changes: typing.Tuple[str, str, str]
+    ) -> typing.Dict[str, typing.Any]:
+        return {
+            **event_corpus.load("delete_issue").event,
+            "id": event_id,
+            "type": 2,
+            "content": {
+                "id": 100,
+                "key_id": 100,
+                "summary": "test issue",
+                "description": "test description",
+                "comment": None,
+                "changes": [
+                    {"field": field, "old_value": old, "new_value": new}
+                    for field, old, new in changes
+                ],
+            },
+        }
+
+    def test_edit_in_place(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -1711,293 +1231,369 @@ class TestHandler:
             typing.Dict[str, typing.Any],
         ],
         lambda_context: LambdaContext,
+        stub_chat: typing.Any,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:10:23Z",
-            "content": {
-                "comment": None,
-                "description": "test description",
-                "repository": {
-                    "description": "test description",
-                    "id": 100,
-                    "name": "test-repository",
-                },
-                "changes": [],
-                "number": 100,
-                "summary": "test pull request",
-                "assignee": {
-                    "name": "test",
-                    "id": 100000,
-                    "roleType": 1,
-                    "lang": None,
-                    "userId": "test",
-                },
-                "base": "master",
-                "branch": "feature",
-                "diff": None,
-                "issue": {
-                    "summary": "summary",
-                    "key_id": 100,
-                    "description": "description",
-                    "id": 100000,
-                },
-                "id": 100,
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 18,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "プルリクエストを作成",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST/test-repository#100 test pull request",
-                        "subtitle": "John Doe",
+        import edits
+        import tenants
+
+        now = [0.0]
+        mocker.patch("index.edit_store", edits.EditStore(clock=lambda: now[0]))
+        mocker.patch(
+            "index.tenant_configs",
+            tenants.TenantConfigCache(
+                default=tenants.TenantConfig.from_raw(
+                    tenants.DEFAULT_TENANT,
+                    {
+                        "backlog_base_url": "https://backlog.com",
+                        "edit_window": 60,
                     },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test description",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "担当者",
-                                        "content": "test",
-                                        "contentMultiline": True,
-                                        "icon": "PERSON",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "関連課題",
-                                        "content": "TEST-100 summary",
-                                        "contentMultiline": True,
-                                        "icon": "TICKET",
-                                        "button": {
-                                            "textButton": {
-                                                "text": "課題を開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/view/TEST-100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "プルリクエストを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/git/TEST/test-repository/pullRequests/100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
-        lambda_event = self._lambda_event_wrapper(
-            backlog_event=backlog_event,
-            webhook_key="foo",
-            webhook_token="bar",
-            space_id="xxxx",
+                )
+            ),
         )
 
-        mocked_requests = mocker.patch("index.requests")
-        response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
+        def post(backlog_event: typing.Dict[str, typing.Any]) -> None:
+            response = target(
+                self._lambda_event_wrapper(
+                    backlog_event=backlog_event,
+                    webhook_key="foo",
+                    webhook_token="bar",
+                    space_id="xxxx",
+                ),
+                lambda_context,
+            )
+            self.assert_response(response, 200, {"message": "OK"})
+
+        def changes(name: str) -> typing.List[typing.Tuple[str, str]]:
+            widgets = stub_chat.messages[name]["cards"][0]["sections"][0][
+                "widgets"
+            ]
+            return [
+                (w["keyValue"]["topLabel"], w["keyValue"]["content"])
+                for w in widgets
+            ]
+
+        post(self._issue_update(1, ("status", "1", "2")))
+        post(self._issue_update(2, ("assigner", "", "John Doe")))
+        now[0] = 30.0
+        post(self._issue_update(3, ("status", "2", "3")))
+
+        first = "spaces/xxxx/messages/stub-1"
+        assert [(m.method, m.path) for m in stub_chat.received] == [
+            ("POST", "/v1/spaces/xxxx/messages"),
+            ("PATCH", f"/v1/{first}"),
+            ("PATCH", f"/v1/{first}"),
+        ]
+        assert stub_chat.received[1].query == {
+            "key": "foo",
+            "token": "bar",
+            "updateMask": "text,cards",
+        }
+        # one card from the first status to the last one
+        assert changes(first) == [
+            ("状態", "未対応 > 処理済み"),
+            ("担当者", "-- > John Doe"),
+        ]
+
+        # the window closes a minute after the first post
+        now[0] = 60.0
+        post(self._issue_update(4, ("status", "3", "4")))
+        second = "spaces/xxxx/messages/stub-4"
+        assert stub_chat.received[-1].method == "POST"
+        assert changes(second) == [("状態", "処理済み > 完了")]
+
+        # a deleted message is posted again with the merged changes
+        del stub_chat.messages[second]
+        post(self._issue_update(5, ("status", "4", "1")))
+        assert [m.method for m in stub_chat.received[-2:]] == ["PATCH", "POST"]
+        assert stub_chat.received[-2].status == 404
+        assert changes("spaces/xxxx/messages/stub-6") == [
+            ("状態", "処理済み > 未対応")
+        ]
+        post(self._issue_update(6, ("status", "1", "2")))
+        assert stub_chat.received[-1].path == (
+            "/v1/spaces/xxxx/messages/stub-6"
         )
 
-        self.assert_response(response, 200, {"message": "OK"})
-
-    def test_update_pull_request(
+    def test_failed_edit_spills(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
             [typing.Dict[str, typing.Any], LambdaContext],
             typing.Dict[str, typing.Any],
         ],
-        lambda_context: LambdaContext,
+        spill_queue: typing.Any,
+        breaker: typing.Any,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:10:27Z",
-            "content": {
-                "comment": None,
-                "description": "test description",
-                "repository": {
-                    "description": "test description",
-                    "id": 100,
-                    "name": "test-repository",
-                },
-                "changes": [
-                    {
-                        "field": "description",
-                        "old_value": "descriptions",
-                        "new_value": "descriptions\nadd",
-                    },
+        import edits
+        import requests
+        import tenants
+
+        mocker.patch("index.edit_store", edits.EditStore())
+        mocker.patch(
+            "index.tenant_configs",
+            tenants.TenantConfigCache(
+                default=tenants.TenantConfig.from_raw(
+                    tenants.DEFAULT_TENANT,
                     {
-                        "field": "assigner",
-                        "old_value": "John Doe",
-                        "new_value": "Jane Doe",
+                        "backlog_base_url": "https://backlog.com",
+                        "edit_window": 60,
                     },
+                )
+            ),
+        )
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.return_value.ok = True
+        mocked_session.post.return_value.json.return_value = {
+            "name": "spaces/xxxx/messages/m1"
+        }
+        mocked_session.patch.side_effect = requests.ConnectionError()
+
+        responses = [
+            target(
+                self._lambda_event_wrapper(
+                    backlog_event=self._issue_update(i, ("status", "1", "2")),
+                    webhook_key="foo",
+                    webhook_token="bar",
+                    space_id="xxxx",
+                ),
+                LambdaContext(aws_request_id=str(i)),
+            )
+            for i in range(2)
+        ]
+
+        mocked_session.post.assert_called_once()
+        mocked_session.patch.assert_called_once()
+        assert len(self._spilled_messages(*spill_queue)) == 1
+        for response in responses:
+            self.assert_response(response, 200, {"message": "OK"})
+
+    def test_edit_in_place_skips_comments(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        stub_chat: typing.Any,
+    ) -> None:
+        import edits
+        import tenants
+
+        mocker.patch("index.edit_store", edits.EditStore())
+        mocker.patch(
+            "index.tenant_configs",
+            tenants.TenantConfigCache(
+                default=tenants.TenantConfig.from_raw(
+                    tenants.DEFAULT_TENANT,
                     {
-                        "field": "issue",
-                        "old_value": "TEST-10",
-                        "new_value": "",
+                        "backlog_base_url": "https://backlog.com",
+                        "edit_window": 60,
                     },
+                )
+            ),
+        )
+        commented = self._issue_update(2, ("status", "2", "3"))
+        commented["content"]["comment"] = {"id": 1, "content": "done"}
+
+        for backlog_event in [
+            self._issue_update(1, ("status", "1", "2")),
+            commented,
+            self._issue_update(3, ("status", "3", "4")),
+        ]:
+            target(
+                self._lambda_event_wrapper(
+                    backlog_event=backlog_event,
+                    webhook_key="foo",
+                    webhook_token="bar",
+                    space_id="xxxx",
+                ),
+                lambda_context,
+            )
+
+        assert [m.method for m in stub_chat.received] == [
+            "POST",
+            "POST",
+            "PATCH",
+        ]
+
+    @pytest.fixture
+    def digest_store(self, mocker: MockerFixture, target):
+        import boto3
+        import digest
+        import tenants
+
+        mocker.patch(
+            "index.tenant_configs",
+            tenants.TenantConfigCache(
+                default=tenants.TenantConfig.from_raw(
+                    tenants.DEFAULT_TENANT,
                     {
-                        "field": "status",
-                        "old_value": "1",
-                        "new_value": "2",
-                    },
-                ],
-                "number": 100,
-                "summary": "test pull request",
-                "assignee": None,
-                "base": "master",
-                "branch": "feature",
-                "diff": "1c1\n<test description---\n>test",
-                "issue": None,
-                "id": 100,
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 19,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "プルリクエストを更新",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST/test-repository#100 test pull request",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test description",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "担当者",
-                                        "content": "John Doe > Jane Doe",
-                                        "contentMultiline": True,
-                                        "icon": "PERSON",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "関連課題",
-                                        "content": "TEST-10 > --",
-                                        "contentMultiline": True,
-                                        "icon": "TICKET",
-                                    },
-                                },
-                                {
-                                    "keyValue": {
-                                        "topLabel": "Status",
-                                        "content": "Open > Closed",
-                                        "contentMultiline": True,
-                                        "icon": "DESCRIPTION",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
+                        "backlog_base_url": "https://backlog.com",
+                        "rules": {
+                            "*": [
                                 {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "プルリクエストを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/git/TEST/test-repository/pullRequests/100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
+                                    "action": "digest",
+                                    "event_types": ["CREATE_WIKI"],
+                                }
+                            ]
                         },
-                    ],
-                },
-            ],
-        }
+                    },
+                )
+            ),
+        )
+        with mock_dynamodb():
+            client = boto3.client("dynamodb")
+            client.create_table(
+                TableName="digests",
+                KeySchema=[
+                    {"AttributeName": "digest_id", "KeyType": "HASH"},
+                    {"AttributeName": "entry_id", "KeyType": "RANGE"},
+                ],
+                AttributeDefinitions=[
+                    {"AttributeName": "digest_id", "AttributeType": "S"},
+                    {"AttributeName": "entry_id", "AttributeType": "S"},
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            with mock_kms():
+                kms_client = boto3.client("kms")
+                key_id = kms_client.create_key()["KeyMetadata"]["KeyId"]
+                yield mocker.patch(
+                    "index.digest_store",
+                    digest.DynamoDBDigestStore(
+                        "digests", key_id, client=client, kms_client=kms_client
+                    ),
+                )
+
+    def test_digest(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        digest_store: typing.Any,
+    ) -> None:
+        from index import digest_handler
+
+        mocked_session = mocker.patch("index.chat_client.session")
+        for event_id, event_type in [(10, 5), (11, 7), (12, 5)]:
+            backlog_event = self._wiki_event(event_type)
+            backlog_event["id"] = event_id
+            response = target(
+                self._lambda_event_wrapper(
+                    backlog_event=backlog_event,
+                    webhook_key="foo",
+                    webhook_token="bar",
+                    space_id="xxxx",
+                ),
+                lambda_context,
+            )
+            self.assert_response(response, 200, {"message": "OK"})
+
+        # only the deletion is posted right away
+        assert mocked_session.post.call_count == 1
+        assert len(digest_store.pending()["/v1/spaces/xxxx/messages"]) == 2
+
+        response = digest_handler({}, lambda_context)
+
+        assert response == {"flushed": 2}
+        assert mocked_session.post.call_count == 2
+        kwargs = mocked_session.post.call_args.kwargs
+        assert (
+            kwargs["url"]
+            == "https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar"  # noqa
+        )
+        message = json.loads(kwargs["data"])
+        assert message["text"] == "2 件の更新のまとめ"
+        assert [
+            widget["keyValue"]["topLabel"]
+            for widget in message["cards"][0]["sections"][0]["widgets"]
+        ] == ["Wiki を追加", "Wiki を追加"]
+        assert digest_store.pending() == {}
+
+    def test_digest_kept_when_unreachable(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+        digest_store: typing.Any,
+        breaker: typing.Any,
+    ) -> None:
+        import requests
+        from index import digest_handler
+
+        target(
+            self._lambda_event_wrapper(
+                backlog_event=self._wiki_event(5),
+                webhook_key="foo",
+                webhook_token="bar",
+                space_id="xxxx",
+            ),
+            lambda_context,
+        )
+        mocked_session = mocker.patch("index.chat_client.session")
+        mocked_session.post.side_effect = requests.ConnectionError()
+
+        assert digest_handler({}, lambda_context) == {"flushed": 0}
+        assert len(digest_store.pending()["/v1/spaces/xxxx/messages"]) == 1
+
+    def test_digest_handler_without_store(
+        self,
+        mocker: MockerFixture,
+        lambda_context: LambdaContext,
+        target: typing.Any,
+    ) -> None:
+        from index import digest_handler
+
+        mocker.patch("index.digest_store", None)
+        mocked_session = mocker.patch("index.chat_client.session")
+
+        assert digest_handler({}, lambda_context) == {"flushed": 0}
+        mocked_session.post.assert_not_called()
+
+    def test_long_fields_capped(
+        self,
+        mocker: MockerFixture,
+        target: typing.Callable[
+            [typing.Dict[str, typing.Any], LambdaContext],
+            typing.Dict[str, typing.Any],
+        ],
+        lambda_context: LambdaContext,
+    ) -> None:
+        import models
 
+        backlog_event = self._wiki_event(5)
+        backlog_event["content"]["content"] = "長い本文" * 1000
         lambda_event = self._lambda_event_wrapper(
             backlog_event=backlog_event,
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
+        mocker.patch.object(models.field_caps, "max_chars", 100)
+        record_capped_fields = mocker.spy(
+            sys.modules["telemetry"], "record_capped_fields"
+        )
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
+        mocked_session.post.assert_called_once()
+        message = json.loads(mocked_session.post.call_args.kwargs["data"])
+        text = message["cards"][0]["sections"][0]["widgets"][0][
+            "textParagraph"
+        ]["text"]
+        assert text == "長い本文" * 25 + "… (truncated)"
+        record_capped_fields.assert_called_once_with(1)
         self.assert_response(response, 200, {"message": "OK"})
 
-    def test_comment_pull_request(
+    def test_truncated_widget_opens_the_event(
         self,
         mocker: MockerFixture,
         target: typing.Callable[
@@ -2006,102 +1602,59 @@ class TestHandler:
         ],
         lambda_context: LambdaContext,
     ) -> None:
-        backlog_event = {
-            "project": {
-                "archived": False,
-                "name": "TestProject",
-                "chartEnabled": False,
-                "subtaskingEnabled": False,
-                "id": 100,
-                "projectKey": "TEST",
-            },
-            "created": "2017-07-20T16:10:32Z",
-            "content": {
-                "comment": {
-                    "content": "test comment",
-                    "id": 100,
-                },
-                "description": "test description",
-                "repository": {
-                    "description": "test description",
-                    "id": 100,
-                    "name": "test-repository",
-                },
-                "changes": [],
-                "number": 100,
-                "summary": "test pull request",
-                "assignee": None,
-                "base": "master",
-                "branch": "feature",
-                "diff": None,
-                "issue": None,
-                "id": 100,
-            },
-            "notifications": [],
-            "createdUser": {
-                "roleType": 1,
-                "name": "John Doe",
-                "userId": None,
-                "nulabAccount": None,
-                "mailAddress": None,
-                "id": 103640,
-            },
-            "type": 20,
-            "id": 10,
-        }
-        expected_chat_message = {
-            "text": "プルリクエストにコメント",
-            "cards": [
-                {
-                    "header": {
-                        "title": "TEST/test-repository#100 test pull request",
-                        "subtitle": "John Doe",
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": "test comment",
-                                    },
-                                },
-                            ],
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "プルリクエストを開く",
-                                                "onClick": {
-                                                    "openLink": {
-                                                        "url": "https://backlog.com/git/TEST/test-repository/pullRequests/100",  # noqa
-                                                    },
-                                                },
-                                            },
-                                        },
-                                    ],
-                                },
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
+        backlog_event = self._issue_update(
+            1, ("description", "説明", "長い説明" * 1000)
+        )
+        backlog_event["content"]["shared_files"] = [
+            {"id": 7, "name": "file.txt", "size": 1, "dir": "/"}
+        ]
         lambda_event = self._lambda_event_wrapper(
             backlog_event=backlog_event,
             webhook_key="foo",
             webhook_token="bar",
             space_id="xxxx",
         )
+        mocker.patch("index.max_message_bytes", 4_000)
 
-        mocked_requests = mocker.patch("index.requests")
+        mocked_session = mocker.patch("index.chat_client.session")
         response = target(lambda_event, lambda_context)
-        mocked_requests.post.assert_called_once_with(
-            url="https://api.example.com/v1/spaces/xxxx/messages?key=foo&token=bar",  # noqa
-            json=expected_chat_message,
-        )
 
         self.assert_response(response, 200, {"message": "OK"})
+        message = json.loads(mocked_session.post.call_args.kwargs["data"])
+        description, shared_file = message["cards"][0]["sections"][0]["widgets"]
+        assert description["keyValue"]["content"].endswith("… (truncated)")
+        # the file holds the first link of the card, not the issue
+        assert (
+            description["keyValue"]["button"]["textButton"]["onClick"][
+                "openLink"
+            ]["url"]
+            == "https://backlog.com/view/TEST-100"
+        )
+        assert shared_file["keyValue"]["button"]["textButton"]["onClick"][
+            "openLink"
+        ]["url"].endswith("sharedFileId=7")
+
+    @pytest.mark.parametrize(
+        "body, max_bytes, expected",
+        [
+            (None, 10, False),
+            ("", 10, False),
+            ("a" * 11, 10, True),
+            ("a" * 10, 10, False),
+            ("あ" * 4, 12, False),
+            ("あ" * 4, 11, True),
+        ],
+    )
+    def test_exceeds(
+        self,
+        target: typing.Any,
+        body: typing.Optional[str],
+        max_bytes: int,
+        expected: bool,
+    ) -> None:
+        from index import exceeds
+
+        assert exceeds(body, max_bytes) is expected
+        if body is not None:
+            encoded = base64.b64encode(body.encode("utf-8")).decode("ascii")
+            assert exceeds(encoded, max_bytes, True) is expected
@@ -0,0 +1,198 @@
+import dataclasses
+import datetime
+import sys
+import typing
+from pathlib import Path
+
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+fuzz_settings = settings(
+    max_examples=200,
+    deadline=None,
+    suppress_health_check=[
+        HealthCheck.function_scoped_fixture,
+        HealthCheck.too_slow,
+    ],
+)
+
+
+class TestModels:
+    @pytest.fixture
+    def models(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import models
+
+        yield models
+
+        sys.path = original_path
+
+    @pytest.fixture
+    def event_strategies(self, models):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "tools"))
+        import event_strategies
+
+        yield event_strategies
+
+        sys.path = original_path
+
+    @pytest.mark.parametrize(
+        "class_name, id, name",
+        [
+            ("Status", 2, "処理中"),
+            ("PullRequestStatus", 3, "Merged"),
+            ("Resolution", 0, "対応済み"),
+            ("Priority", 4, "低"),
+        ],
+    )
+    def test_from_id_returns_shared_instance(
+        self, models, class_name: str, id: int, name: str
+    ) -> None:
+        model = getattr(models, class_name)
+
+        instance = model.from_id(id)
+
+        assert instance is model.from_id(id)
+        assert instance == model(id=id, name=name)
+        assert str(instance) == name
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            instance.name = "changed"
+
+    def test_from_id_unknown(self, models) -> None:
+        with pytest.raises(KeyError):
+            models.Status.from_id(99)
+
+    def test_change_from_raw_uses_names(self, models) -> None:
+        change = models.Change.from_raw(
+            {"field": "status", "old_value": "1", "new_value": "4"}
+        )
+
+        assert change.old_value == "未対応"
+        assert change.new_value == "完了"
+
+    @pytest.mark.parametrize(
+        "date_str, expected",
+        [
+            ("2017-07-19", datetime.date(2017, 7, 19)),
+            ("2017-7-9", datetime.date(2017, 7, 9)),
+            ("", None),
+            ("null", None),
+        ],
+    )
+    def test_optional_date(self, models, date_str: str, expected) -> None:
+        assert models._optional_date(date_str) == expected
+
+    def test_field_caps(self, models) -> None:
+        caps = models.FieldCaps(max_chars=5)
+
+        assert caps("12345", "description") == "12345"
+        assert caps(None, "diff") is None
+        assert caps("123456", "description") == "12345… (truncated)"
+        assert caps("1234567", "diff") == "12345… (truncated)"
+        caps("123456", "description")
+
+        assert caps.drain() == {"description": 2, "diff": 1}
+        assert caps.drain() == {}
+
+    def test_from_raw_caps_long_fields(self, models, mocker) -> None:
+        mocker.patch.object(models.field_caps, "max_chars", 10)
+        models.field_caps.drain()
+
+        content = models.UpdateWikiContent.from_raw(
+            {
+                "id": 1,
+                "name": "wiki",
+                "content": "x" * 100,
+                "diff": "y" * 5,
+                "version": 2,
+            }
+        )
+        change = models.Change.from_raw(
+            {"field": "description", "old_value": "a" * 11, "new_value": "b"}
+        )
+
+        assert content.content == "x" * 10 + "… (truncated)"
+        assert content.diff == "yyyyy"
+        assert change.old_value == "a" * 10 + "… (truncated)"
+        assert change.new_value == "b"
+        assert models.field_caps.drain() == {"content": 1, "description": 1}
+
+    def _raw_event(self, **fields) -> typing.Dict[str, typing.Any]:
+        raw = {
+            "id": 1,
+            "type": 4,
+            "created": "2017-07-19T11:02:22Z",
+            "createdUser": {"id": 1, "name": "admin", "roleType": 1},
+            "content": {"id": 1, "key_id": 1},
+        }
+        raw.update(fields)
+        return {key: value for key, value in raw.items() if value is not None}
+
+    @pytest.mark.parametrize(
+        "fields, message",
+        [
+            ({"createdUser": None}, "missing 'createdUser'"),
+            ({"content": {"id": 1}}, "missing 'key_id'"),
+            ({"created": "yesterday"}, "malformed"),
+            ({"createdUser": []}, "malformed"),
+        ],
+    )
+    def test_from_raw_invalid_payload(
+        self, models, fields: typing.Dict[str, typing.Any], message: str
+    ) -> None:
+        from exceptions import InvalidPayload
+
+        with pytest.raises(InvalidPayload, match=message):
+            models.WebhookEvent.from_raw(self._raw_event(**fields))
+
+    @pytest.mark.parametrize("event_type", [8, 99, "1", None])
+    def test_from_raw_unsupported_event_type(self, models, event_type) -> None:
+        from exceptions import UnsupportedEventType
+
+        # the type is checked before the fields
+        with pytest.raises(UnsupportedEventType):
+            models.WebhookEvent.from_raw({"type": event_type})
+
+    @fuzz_settings
+    @given(data=st.data())
+    def test_from_raw_events(self, models, event_strategies, data) -> None:
+        raw = data.draw(event_strategies.events())
+
+        event = models.WebhookEvent.from_raw(raw)
+
+        assert event.type.value == raw["type"]
+        assert isinstance(event.content, models.CONTENT_CLASSES[event.type])
+
+    @fuzz_settings
+    @given(data=st.data())
+    def test_link(self, models, event_strategies, data) -> None:
+        event = models.WebhookEvent.from_raw(
+            data.draw(event_strategies.events())
+        )
+
+        link = event.link("https://backlog.com")
+
+        if event.project is None:
+            assert link is None
+        else:
+            assert link.startswith("https://backlog.com/")
+
+    @fuzz_settings
+    @given(data=st.data())
+    def test_from_raw_near_valid_events(
+        self, models, event_strategies, data
+    ) -> None:
+        from exceptions import InvalidPayload, UnsupportedEventType
+
+        raw = data.draw(event_strategies.near_valid_events())
+
+        try:
+            models.WebhookEvent.from_raw(raw)
+        except (InvalidPayload, UnsupportedEventType):
+            pass
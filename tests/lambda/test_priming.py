@@ -0,0 +1,92 @@
+import os
+import sys
+import types
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+
+class TestPriming:
+    @pytest.fixture
+    def index(self):
+        os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+        os.environ["GOOGLE_CHAT_API"] = "https://api.example.com"
+        os.environ["BACKLOG_BASE_URL"] = "https://backlog.com"
+        os.environ["POWERTOOLS_TRACE_DISABLED"] = "true"
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import index
+
+        yield index
+
+        sys.path = original_path
+
+    def test_prime_renders_sample_events(
+        self, mocker: MockerFixture, index
+    ) -> None:
+        import priming
+
+        mocked_session = mocker.patch.object(index.chat_client, "session")
+        render = mocker.spy(index.webhook, "render")
+
+        priming.prime(index.webhook)
+
+        assert render.call_count == len(priming.SAMPLE_EVENTS)
+        mocked_session.post.assert_not_called()
+
+    def test_register_on_demand(self, mocker: MockerFixture, index) -> None:
+        import priming
+
+        mocker.patch.dict(os.environ, {"AWS_LAMBDA_INITIALIZATION_TYPE": ""})
+        prime = mocker.patch("priming.prime")
+        warm_up = mocker.patch.object(index.chat_client, "warm_up")
+
+        priming.register(index.webhook, index.chat_client)
+
+        prime.assert_not_called()
+        warm_up.assert_not_called()
+
+    def test_register_provisioned_concurrency(
+        self, mocker: MockerFixture, index
+    ) -> None:
+        import priming
+
+        mocker.patch.dict(
+            os.environ,
+            {"AWS_LAMBDA_INITIALIZATION_TYPE": "provisioned-concurrency"},
+        )
+        prime = mocker.patch("priming.prime")
+        warm_up = mocker.patch.object(index.chat_client, "warm_up")
+
+        priming.register(index.webhook, index.chat_client)
+
+        prime.assert_called_once_with(index.webhook)
+        warm_up.assert_called_once_with()
+
+    def test_register_snap_start(self, mocker: MockerFixture, index) -> None:
+        import priming
+
+        hooks = {}
+        # snapshot_restore_py only exists in the Lambda runtime
+        runtime_hooks = types.ModuleType("snapshot_restore_py")
+        runtime_hooks.register_before_snapshot = hooks.setdefault(
+            "before", mocker.Mock()
+        )
+        runtime_hooks.register_after_restore = hooks.setdefault(
+            "after", mocker.Mock()
+        )
+        mocker.patch.dict(sys.modules, {"snapshot_restore_py": runtime_hooks})
+        mocker.patch.dict(
+            os.environ, {"AWS_LAMBDA_INITIALIZATION_TYPE": "snap-start"}
+        )
+        prime = mocker.patch("priming.prime")
+
+        priming.register(index.webhook, index.chat_client)
+
+        hooks["before"].call_args.args[0]()
+        prime.assert_called_once_with(index.webhook)
+        hooks["after"].assert_called_once_with(index.chat_client.reset)
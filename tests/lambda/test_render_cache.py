@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestRenderCache:
+    @pytest.fixture
+    def render_cache(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import render_cache
+
+        yield render_cache
+
+        sys.path = original_path
+
+    def test_key(self, render_cache) -> None:
+        event = {"id": 1, "type": 5, "content": {"name": "wiki"}}
+        key = render_cache.key(event, "https://acme.backlog.jp", 32_000)
+
+        assert key == render_cache.key(
+            {"content": {"name": "wiki"}, "type": 5, "id": 1},
+            "https://acme.backlog.jp",
+            32_000,
+        )
+        assert key != render_cache.key(
+            {**event, "id": 2}, "https://acme.backlog.jp", 32_000
+        )
+        assert key != render_cache.key(
+            event, "https://other.backlog.jp", 32_000
+        )
+        assert key != render_cache.key(event, "https://acme.backlog.jp", 4_000)
+        assert render_cache.key({}, "https://acme.backlog.jp", 32_000) is None
+        assert (
+            render_cache.key(
+                {**event, "id": "1"}, "https://acme.backlog.jp", 32_000
+            )
+            is None
+        )
+
+    def test_key_covers_the_whole_event(self, render_cache) -> None:
+        event = {"id": 1, "type": 5, "content": {"name": "wiki"}}
+        forged = {"id": 1, "type": 5, "content": {"name": "forged"}}
+
+        assert render_cache.key(
+            event, "https://acme.backlog.jp", 32_000
+        ) != render_cache.key(forged, "https://acme.backlog.jp", 32_000)
+
+    def test_get_put(self, render_cache) -> None:
+        cache = render_cache.RenderCache()
+
+        assert cache.get(("a",)) is None
+        cache.put(("a",), [b"1", b"2"])
+
+        assert cache.get(("a",)) == (b"1", b"2")
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_evicts_least_recently_used(self, render_cache) -> None:
+        cache = render_cache.RenderCache(max_entries=2)
+        cache.put(("a",), [b"1"])
+        cache.put(("b",), [b"2"])
+        cache.get(("a",))
+        cache.put(("c",), [b"3"])
+
+        assert len(cache) == 2
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) == (b"1",)
+        assert cache.get(("c",)) == (b"3",)
+
+    def test_evicts_over_max_bytes(self, render_cache) -> None:
+        cache = render_cache.RenderCache(max_bytes=10)
+        cache.put(("a",), [b"12345"])
+        cache.put(("b",), [b"1234", b"5"])
+        cache.put(("a",), [b"123"])
+        cache.put(("c",), [b"123"])
+
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) == (b"123",)
+        assert cache.get(("c",)) == (b"123",)
+
+        cache.put(("d",), [b"12345678901"])
+        assert cache.get(("d",)) is None
+        assert len(cache) == 2
+
+    def test_disabled(self, render_cache) -> None:
+        cache = render_cache.from_environ({"RENDER_CACHE_SIZE": "0"})
+        cache.put(("a",), [b"1"])
+
+        assert cache.get(("a",)) is None
+        assert len(cache) == 0
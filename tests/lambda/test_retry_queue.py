@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_sqs
+
+
+class TestRetryQueue:
+    @pytest.fixture
+    def retry_queue(self):
+        os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+        os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import retry_queue
+
+        yield retry_queue
+
+        sys.path = original_path
+
+    @pytest.fixture
+    def sqs(self):
+        with mock_sqs():
+            client = boto3.client("sqs")
+            queue_url = client.create_queue(
+                QueueName="retry.fifo", Attributes={"FifoQueue": "true"}
+            )["QueueUrl"]
+            yield client, queue_url
+
+    def test_spill(self, retry_queue, sqs) -> None:
+        client, queue_url = sqs
+        messages = [
+            retry_queue.SpilledMessage(
+                path="/v1/spaces/AAAA/messages",
+                query={"key": "k", "token": "t"},
+                body=json.dumps({"text": f"メッセージ {i}"}).encode("utf-8"),
+            )
+            for i in range(12)
+        ]
+
+        count = retry_queue.RetryQueue(queue_url, client=client).spill(
+            iter(messages),
+            group_id="/v1/spaces/AAAA/messages",
+            deduplication_id="r",
+        )
+
+        assert count == 12
+
+        received = []
+        while True:
+            response = client.receive_message(
+                QueueUrl=queue_url, MaxNumberOfMessages=10
+            )
+            if not response.get("Messages"):
+                break
+            for record in response["Messages"]:
+                received.append(
+                    retry_queue.SpilledMessage.from_raw(
+                        json.loads(record["Body"])
+                    )
+                )
+                client.delete_message(
+                    QueueUrl=queue_url, ReceiptHandle=record["ReceiptHandle"]
+                )
+        assert received == messages
+
+    def test_from_environ(self, retry_queue) -> None:
+        assert retry_queue.from_environ({}) is None
+        queue = retry_queue.from_environ(
+            {"RETRY_QUEUE_URL": "https://sqs.example.com/retry.fifo"}
+        )
+        assert queue.queue_url == "https://sqs.example.com/retry.fifo"
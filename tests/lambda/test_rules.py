@@ -0,0 +1,184 @@
+import sys
+import typing
+from pathlib import Path
+
+import pytest
+
+
+class TestRules:
+    @pytest.fixture
+    def rules(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import rules
+
+        yield rules
+
+        sys.path = original_path
+
+    def _issue_event(
+        self,
+        event_type: int = 2,
+        project_key: str = "TEST",
+        issue_type: str = "バグ",
+        assignee: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        changes: typing.Sequence[str] = ("status",),
+        summary: str = "test issue",
+    ) -> typing.Dict[str, typing.Any]:
+        return {
+            "type": event_type,
+            "project": {"projectKey": project_key},
+            "content": {
+                "summary": summary,
+                "issueType": {"name": issue_type},
+                "assignee": assignee,
+                "changes": [{"field": field} for field in changes],
+            },
+        }
+
+    @pytest.mark.parametrize(
+        "rule, event, matches",
+        [
+            ({}, {}, True),
+            ({"event_types": ["UPDATE_ISSUE"]}, {}, True),
+            ({"event_types": ["CREATE_ISSUE"]}, {}, False),
+            ({"project_keys": ["TEST", "OTHER"]}, {}, True),
+            ({"project_keys": "OTHER"}, {}, False),
+            ({"issue_types": ["バグ"]}, {}, True),
+            ({"issue_types": ["タスク"]}, {}, False),
+            (
+                {"assignees": ["John Doe"]},
+                {"assignee": {"name": "John Doe", "userId": "john"}},
+                True,
+            ),
+            (
+                {"assignees": ["john"]},
+                {"assignee": {"name": "John Doe", "userId": "john"}},
+                True,
+            ),
+            ({"assignees": ["john"]}, {}, False),
+            ({"changed_fields": ["assigner", "status"]}, {}, True),
+            ({"changed_fields": ["description"]}, {}, False),
+            (
+                {"only_changed_fields": ["startDate", "limitDate"]},
+                {"changes": ["startDate", "limitDate"]},
+                True,
+            ),
+            (
+                {"only_changed_fields": ["startDate", "limitDate"]},
+                {"changes": ["startDate", "status"]},
+                False,
+            ),
+            ({"only_changed_fields": ["startDate"]}, {"changes": []}, False),
+            (
+                {"changed_fields": ["pullRequestStatus"]},
+                {"event_type": 19},
+                True,
+            ),
+            ({"summary": r"^\[WIP\]"}, {"summary": "[WIP] test"}, True),
+            ({"summary": r"^\[WIP\]"}, {}, False),
+            (
+                {"project_keys": ["TEST"], "issue_types": ["タスク"]},
+                {},
+                False,
+            ),
+        ],
+    )
+    def test_rule(
+        self,
+        rules,
+        rule: typing.Dict[str, typing.Any],
+        event: typing.Dict[str, typing.Any],
+        matches: bool,
+    ) -> None:
+        rule_set = rules.compile_rules({"*": [rule]})
+
+        assert rule_set.allows("AAAA", self._issue_event(**event)) is (
+            not matches
+        )
+
+    def test_first_match_wins(self, rules) -> None:
+        rule_set = rules.compile_rules(
+            {
+                "AAAA": [
+                    {"action": "deliver", "summary": "障害"},
+                    {"project_keys": ["TEST"]},
+                ],
+                "*": [{"issue_types": ["バグ"]}],
+            }
+        )
+
+        assert rule_set.allows("AAAA", self._issue_event(summary="障害"))
+        assert not rule_set.allows("AAAA", self._issue_event())
+        assert not rule_set.allows(
+            "AAAA", self._issue_event(project_key="OTHER")
+        )
+        assert rule_set.allows(
+            "AAAA", self._issue_event(project_key="OTHER", issue_type="タスク")
+        )
+        # spaces without rules of their own only get the shared rules
+        assert rule_set.allows("BBBB", self._issue_event(issue_type="タスク"))
+        assert not rule_set.allows("BBBB", self._issue_event(issue_type="バグ"))
+
+    def test_digest_action(self, rules) -> None:
+        rule_set = rules.compile_rules(
+            {"*": [{"action": "digest", "event_types": ["JOIN_PROJECT"]}]}
+        )
+
+        assert rule_set.action("AAAA", {"type": 15}) == rules.DIGEST
+        assert rule_set.allows("AAAA", {"type": 15})
+        assert rule_set.action("AAAA", {"type": 1}) == rules.DELIVER
+
+    @pytest.mark.parametrize(
+        "event",
+        [
+            {},
+            {"type": 999, "content": []},
+            {"type": [2], "project": "TEST"},
+            {"type": 2, "content": {"changes": [None, "status"]}},
+            {"type": [], "project": {"projectKey": []}},
+            {"type": 2, "content": {"issueType": {"name": ["バグ"]}}},
+            {"type": 2, "content": {"changes": [{"field": ["x"]}]}},
+            {"type": 2, "content": {"assignee": {"name": {"id": 1}}}},
+        ],
+    )
+    def test_malformed_events(
+        self, rules, event: typing.Dict[str, typing.Any]
+    ) -> None:
+        rule_set = rules.compile_rules(
+            {
+                "*": [
+                    {"event_types": ["UPDATE_ISSUE"], "changed_fields": "x"},
+                    {"project_keys": ["TEST"], "summary": "x"},
+                    {"assignees": ["john"]},
+                    {"issue_types": ["バグ"]},
+                    {"only_changed_fields": ["x"]},
+                ]
+            }
+        )
+
+        assert rule_set.allows("AAAA", event)
+
+    def test_compiled_once(self, rules) -> None:
+        raw = {
+            "*": [{"project_keys": ["TEST"], "event_types": ["ADD_COMMENT"]}]
+        }
+
+        assert rules.compile_rules(raw) is rules.compile_rules(
+            {"*": [{"event_types": ["ADD_COMMENT"], "project_keys": ["TEST"]}]}
+        )
+        assert rules.compile_rules({}) is None
+        assert rules.compile_rules(None) is None
+
+    @pytest.mark.parametrize(
+        "rule",
+        [
+            {"action": "forward"},
+            {"event_types": ["UNKNOWN"]},
+        ],
+    )
+    def test_invalid_rule(self, rules, rule: typing.Dict[str, typing.Any]):
+        with pytest.raises((KeyError, ValueError)):
+            rules.compile_rules({"*": [rule]})
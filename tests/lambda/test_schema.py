@@ -0,0 +1,141 @@
+import sys
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pytest
+
+
+class TestSchema:
+    @pytest.fixture
+    def schema(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import schema
+
+        yield schema
+
+        sys.path = original_path
+
+    @pytest.mark.parametrize(
+        "name, expected",
+        [
+            ("id", "id"),
+            ("role_type", "roleType"),
+            ("release_due_date", "releaseDueDate"),
+        ],
+    )
+    def test_camel_case(self, schema, name: str, expected: str) -> None:
+        assert schema.camel_case(name) == expected
+        assert schema.required(name).key == expected
+
+    def test_parsed(self, schema) -> None:
+        @schema.parsed(
+            schema.required("id"),
+            schema.required("key_id", key="key_id"),
+            schema.required("size", int),
+            schema.required("label", str.rjust, 3, "0"),
+            schema.required("owner", str.upper, nullable=True),
+            schema.required("tags", str.upper, many=True),
+            schema.optional("user_id"),
+            schema.optional("lang", default="ja"),
+            schema.optional("archived", bool, default=False),
+            schema.optional("links", str.upper, many=True),
+        )
+        @dataclass
+        class Model:
+            id: int
+            key_id: int
+            size: int
+            label: str
+            owner: typing.Optional[str]
+            tags: typing.List[str]
+            user_id: typing.Optional[int] = None
+            lang: str = "en"
+            archived: bool = False
+            links: typing.List[str] = field(default_factory=list)
+
+        assert Model.from_raw(
+            {
+                "id": 1,
+                "key_id": 2,
+                "size": "3",
+                "label": "4",
+                "owner": "",
+                "tags": ["a", "b"],
+                "links": [],
+            }
+        ) == Model(
+            id=1,
+            key_id=2,
+            size=3,
+            label="004",
+            owner=None,
+            tags=["A", "B"],
+            user_id=None,
+            lang="ja",
+            archived=False,
+            links=[],
+        )
+        assert Model.from_raw(
+            {
+                "id": 1,
+                "key_id": 2,
+                "size": 3,
+                "label": "4",
+                "owner": "admin",
+                "tags": [],
+                "userId": 0,
+                "lang": "",
+                "archived": 1,
+                "links": ["c"],
+            }
+        ) == Model(
+            id=1,
+            key_id=2,
+            size=3,
+            label="004",
+            owner="ADMIN",
+            tags=[],
+            user_id=0,
+            lang="",
+            archived=True,
+            links=["C"],
+        )
+        assert [spec.name for spec in Model.__schema__][:2] == ["id", "key_id"]
+
+    def test_parsed_missing_required(self, schema) -> None:
+        @schema.parsed(schema.required("id"), schema.required("name"))
+        @dataclass
+        class Model:
+            id: int
+            name: str
+
+        with pytest.raises(KeyError, match="name"):
+            Model.from_raw({"id": 1})
+
+    def test_parsed_fields_in_class_order(self, schema) -> None:
+        @schema.parsed(schema.required("name"), schema.required("id"))
+        @dataclass
+        class Model:
+            id: int
+            name: str
+
+        assert Model.from_raw({"id": 1, "name": "a"}) == Model(id=1, name="a")
+
+    @pytest.mark.parametrize(
+        "fields",
+        [["id"], ["id", "name", "lang"], ["id", "id", "name"]],
+    )
+    def test_parsed_schema_mismatch(
+        self, schema, fields: typing.List[str]
+    ) -> None:
+        @dataclass
+        class Model:
+            id: int
+            name: str
+
+        with pytest.raises(TypeError, match="does not match"):
+            schema.parsed(*map(schema.required, fields))(Model)
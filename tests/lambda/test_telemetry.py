@@ -0,0 +1,52 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestTelemetry:
+    @pytest.fixture
+    def telemetry(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        os.environ["POWERTOOLS_TRACE_DISABLED"] = "true"
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import telemetry
+
+        telemetry.metrics.clear_metrics()
+        yield telemetry
+        telemetry.metrics.clear_metrics()
+
+        sys.path = original_path
+
+    def test_rollup_dimension_sets(self, telemetry) -> None:
+        metrics = telemetry.RollupMetrics(
+            namespace="Test", service="backlog-google-chat"
+        )
+        metrics.add_dimension(name="EventType", value="CREATE_ISSUE")
+        metrics.add_dimension(name="SpaceId", value="AAAA")
+        telemetry.count("Received")
+
+        emf = metrics.serialize_metric_set()
+
+        assert emf["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [
+            ["service"],
+            ["service", "EventType"],
+            ["EventType", "SpaceId", "service"],
+        ]
+        assert emf["EventsReceived"] == [1.0]
+        assert emf["SpaceId"] == "AAAA"
+
+    def test_space_dimension_without_allow_list(self, telemetry) -> None:
+        dimension = telemetry.SpaceDimension()
+
+        assert dimension.value("a") == telemetry.OTHER_SPACES
+        assert dimension.value("b") == telemetry.OTHER_SPACES
+
+    def test_space_dimension_allow_list(self, telemetry) -> None:
+        dimension = telemetry.SpaceDimension(allowed=["a"])
+
+        assert dimension.value("a") == "a"
+        assert dimension.value("b") == telemetry.OTHER_SPACES
@@ -0,0 +1,322 @@
+import json
+import os
+import sys
+import typing
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_dynamodb, mock_ssm
+
+
+class TestTenants:
+    @pytest.fixture
+    def tenants(self):
+        os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+        os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import tenants
+
+        yield tenants
+
+        sys.path = original_path
+
+    @pytest.fixture
+    def ssm(self):
+        with mock_ssm():
+            client = boto3.client("ssm")
+            client.put_parameter(
+                Name="/tenants/acme",
+                Type="String",
+                Value=json.dumps(
+                    {
+                        "backlog_base_url": "https://acme.backlog.jp/",
+                        "event_types": ["CREATE_ISSUE"],
+                    }
+                ),
+            )
+            yield client
+
+    def test_tenant_config_from_raw(self, tenants) -> None:
+        config = tenants.TenantConfig.from_raw(
+            "acme",
+            {
+                "backlog_base_url": "https://acme.backlog.jp/",
+                "event_types": ["CREATE_ISSUE", "ADD_COMMENT"],
+                "space_ids": ["AAAA"],
+            },
+        )
+
+        assert config.backlog_base_url == "https://acme.backlog.jp"
+        assert config.allows_event_type(1)
+        assert not config.allows_event_type(5)
+        assert not config.allows_event_type(999)
+        assert config.allows_space("AAAA")
+        assert not config.allows_space("BBBB")
+        assert config.rules is None
+        assert config.event_action("AAAA", {"type": 1}) == "deliver"
+
+    def test_tenant_config_rules(self, tenants) -> None:
+        config = tenants.TenantConfig.from_raw(
+            "acme",
+            {
+                "backlog_base_url": "https://acme.backlog.jp",
+                "rules": {"AAAA": [{"project_keys": ["TEST"]}]},
+            },
+        )
+        event = {"type": 1, "project": {"projectKey": "TEST"}}
+
+        assert config.event_action("AAAA", event) == "drop"
+        assert config.event_action("BBBB", event) == "deliver"
+
+    def test_ssm_store(self, tenants, ssm) -> None:
+        store = tenants.SsmTenantStore("/tenants/", client=ssm)
+
+        assert store.load("acme")["backlog_base_url"] == (
+            "https://acme.backlog.jp/"
+        )
+        assert store.load("unknown") is None
+
+    def test_dynamodb_store(self, tenants) -> None:
+        with mock_dynamodb():
+            client = boto3.client("dynamodb")
+            client.create_table(
+                TableName="tenants",
+                KeySchema=[{"AttributeName": "tenant_id", "KeyType": "HASH"}],
+                AttributeDefinitions=[
+                    {"AttributeName": "tenant_id", "AttributeType": "S"}
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            client.put_item(
+                TableName="tenants",
+                Item={
+                    "tenant_id": {"S": "acme"},
+                    "config": {
+                        "S": json.dumps(
+                            {"backlog_base_url": "https://acme.backlog.jp"}
+                        )
+                    },
+                },
+            )
+            store = tenants.DynamoDBTenantStore("tenants", client=client)
+
+            assert store.load("acme") == {
+                "backlog_base_url": "https://acme.backlog.jp"
+            }
+            assert store.load("unknown") is None
+
+    def test_cache_ttl(self, tenants, ssm, mocker) -> None:
+        now = [0.0]
+        store = tenants.SsmTenantStore("/tenants", client=ssm)
+        load = mocker.spy(store, "load")
+        cache = tenants.TenantConfigCache(
+            store=store, ttl=60, clock=lambda: now[0]
+        )
+
+        config = cache.get("acme")
+        assert cache.get("acme") is config
+        with pytest.raises(tenants.UnknownTenant):
+            cache.get("unknown")
+        with pytest.raises(tenants.UnknownTenant):
+            cache.get("unknown")
+        assert load.call_count == 2
+
+        now[0] = 61
+        assert cache.get("acme") == config
+        assert load.call_count == 3
+
+    def test_cache_serves_stale_config_on_store_error(
+        self, tenants, ssm, mocker
+    ) -> None:
+        now = [0.0]
+        cache = tenants.TenantConfigCache(
+            store=tenants.SsmTenantStore("/tenants", client=ssm),
+            ttl=60,
+            clock=lambda: now[0],
+        )
+        config = cache.get("acme")
+
+        now[0] = 61
+        mocker.patch.object(
+            ssm,
+            "get_parameter",
+            side_effect=tenants.ClientError(
+                {"Error": {"Code": "ThrottlingException"}}, "GetParameter"
+            ),
+        )
+
+        assert cache.get("acme") is config
+
+    def test_cache_evicts_least_recently_used(
+        self, tenants, ssm, mocker
+    ) -> None:
+        for tenant_id in ["beta", "gamma"]:
+            ssm.put_parameter(
+                Name=f"/tenants/{tenant_id}",
+                Type="String",
+                Value=json.dumps(
+                    {"backlog_base_url": f"https://{tenant_id}.backlog.jp"}
+                ),
+            )
+        store = tenants.SsmTenantStore("/tenants", client=ssm)
+        load = mocker.spy(store, "load")
+        cache = tenants.TenantConfigCache(store=store, max_entries=2)
+
+        cache.get("acme")
+        cache.get("beta")
+        cache.get("acme")
+        cache.get("gamma")
+        assert len(cache) == 2
+        assert load.call_count == 3
+
+        # beta was the least recently used
+        cache.get("acme")
+        assert load.call_count == 3
+        cache.get("beta")
+        assert load.call_count == 4
+
+    def test_cache_misses_kept_apart(self, tenants, ssm, mocker) -> None:
+        store = tenants.SsmTenantStore("/tenants", client=ssm)
+        load = mocker.spy(store, "load")
+        cache = tenants.TenantConfigCache(
+            store=store, max_entries=1, max_misses=2
+        )
+        config = cache.get("acme")
+
+        for tenant_id in ["unknown-1", "unknown-2", "unknown-3"]:
+            with pytest.raises(tenants.UnknownTenant):
+                cache.get(tenant_id)
+        assert load.call_count == 4
+
+        # unknown tenants push neither the config nor the last misses out
+        assert cache.get("acme") is config
+        with pytest.raises(tenants.UnknownTenant):
+            cache.get("unknown-3")
+        assert load.call_count == 4
+        with pytest.raises(tenants.UnknownTenant):
+            cache.get("unknown-1")
+        assert load.call_count == 5
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "{not json",
+            json.dumps(["https://broken.backlog.jp"]),
+            json.dumps({"event_types": ["CREATE_ISSUE"]}),
+            json.dumps(
+                {
+                    "backlog_base_url": "https://broken.backlog.jp",
+                    "event_types": ["NO_SUCH_EVENT"],
+                }
+            ),
+            json.dumps(
+                {
+                    "backlog_base_url": "https://broken.backlog.jp",
+                    "rules": {"*": [{"action": "digest", "summary": "("}]},
+                }
+            ),
+        ],
+    )
+    def test_cache_malformed_config_is_unknown(
+        self, tenants, ssm, mocker, value: str
+    ) -> None:
+        ssm.put_parameter(Name="/tenants/broken", Type="String", Value=value)
+        store = tenants.SsmTenantStore("/tenants", client=ssm)
+        load = mocker.spy(store, "load")
+        cache = tenants.TenantConfigCache(store=store)
+
+        for _ in range(2):
+            with pytest.raises(tenants.UnknownTenant):
+                cache.get("broken")
+        assert load.call_count == 1
+
+    def test_cache_serves_last_good_config_when_malformed(
+        self, tenants, ssm
+    ) -> None:
+        now = [0.0]
+        cache = tenants.TenantConfigCache(
+            store=tenants.SsmTenantStore("/tenants", client=ssm),
+            ttl=60,
+            clock=lambda: now[0],
+        )
+        config = cache.get("acme")
+
+        ssm.put_parameter(
+            Name="/tenants/acme",
+            Type="String",
+            Value=json.dumps({"event_types": ["CREATE_ISSUE"]}),
+            Overwrite=True,
+        )
+        now[0] = 61
+
+        assert cache.get("acme") is config
+
+    @pytest.mark.parametrize("tenant_id", ["../acme", "acme/x", ""])
+    def test_cache_rejects_invalid_tenant_ids(
+        self, tenants, ssm, tenant_id: str
+    ) -> None:
+        cache = tenants.TenantConfigCache(
+            store=tenants.SsmTenantStore("/tenants", client=ssm)
+        )
+
+        with pytest.raises(tenants.UnknownTenant):
+            cache.get(tenant_id)
+
+    def test_from_environ_default_tenant(self, tenants) -> None:
+        cache = tenants.from_environ(
+            {"BACKLOG_BASE_URL": "https://example.backlog.com/"}
+        )
+
+        assert cache.store is None
+        assert (
+            cache.get(tenants.DEFAULT_TENANT).backlog_base_url
+            == "https://example.backlog.com"
+        )
+        with pytest.raises(tenants.UnknownTenant):
+            cache.get("acme")
+
+    def test_from_environ_event_rules(self, tenants) -> None:
+        cache = tenants.from_environ(
+            {
+                "BACKLOG_BASE_URL": "https://example.backlog.com",
+                "EVENT_RULES": '{"*": [{"event_types": ["DELETE_ISSUE"]}]}',
+            }
+        )
+        config = cache.get(tenants.DEFAULT_TENANT)
+
+        assert config.event_action("AAAA", {"type": 4}) == "drop"
+        assert config.event_action("AAAA", {"type": 1}) == "deliver"
+
+    @pytest.mark.parametrize(
+        "environ, expected",
+        [({"THREAD_UPDATES": "true"}, True), ({}, False)],
+    )
+    def test_from_environ_thread_updates(
+        self, tenants, environ: typing.Dict[str, str], expected: bool
+    ) -> None:
+        cache = tenants.from_environ(
+            {"BACKLOG_BASE_URL": "https://example.backlog.com", **environ}
+        )
+
+        assert cache.get(tenants.DEFAULT_TENANT).thread_updates is expected
+
+    def test_edit_window(self, tenants) -> None:
+        cache = tenants.from_environ(
+            {
+                "BACKLOG_BASE_URL": "https://example.backlog.com",
+                "EDIT_WINDOW": "90",
+            }
+        )
+
+        assert cache.get(tenants.DEFAULT_TENANT).edit_window == 90.0
+        assert (
+            tenants.TenantConfig.from_raw(
+                "acme", {"backlog_base_url": "https://acme.backlog.com"}
+            ).edit_window
+            == 0.0
+        )
@@ -0,0 +1,88 @@
+import sys
+import typing
+from pathlib import Path
+
+import pytest
+
+
+class TestThreads:
+    @pytest.fixture
+    def threads(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import threads
+
+        yield threads
+
+        sys.path = original_path
+
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            (
+                {
+                    "type": 2,
+                    "project": {"projectKey": "TEST"},
+                    "content": {"key_id": 100},
+                },
+                "TEST-100",
+            ),
+            (
+                {
+                    "type": 3,
+                    "project": {"projectKey": "TEST"},
+                    "content": {"key_id": 100, "comment": {"id": 1}},
+                },
+                "TEST-100",
+            ),
+            (
+                {
+                    "type": 20,
+                    "project": {"projectKey": "TEST"},
+                    "content": {"number": 3, "repository": {"name": "app"}},
+                },
+                "TEST/app#3",
+            ),
+            (
+                {
+                    "type": 5,
+                    "project": {"projectKey": "TEST"},
+                    "content": {"id": 1},
+                },
+                None,
+            ),
+            ({"type": 2, "project": None, "content": {"key_id": 1}}, None),
+            ({"type": 2, "project": {"projectKey": "TEST"}}, None),
+            (
+                {
+                    "type": 19,
+                    "project": {"projectKey": "TEST"},
+                    "content": {"number": "3", "repository": []},
+                },
+                None,
+            ),
+        ],
+    )
+    def test_thread_key(
+        self,
+        threads,
+        raw: typing.Dict[str, typing.Any],
+        expected: typing.Optional[str],
+    ) -> None:
+        assert threads.thread_key(raw) == expected
+
+    def test_in_thread(self, threads) -> None:
+        query = {"key": "foo", "token": "bar"}
+
+        assert threads.in_thread(query, "TEST-1") == {
+            "key": "foo",
+            "token": "bar",
+            "threadKey": "TEST-1",
+            "messageReplyOption": "REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD",
+        }
+        assert threads.in_thread(query, None) is query
+        # threads given in the webhook URL win
+        own = {**query, "threadKey": "all"}
+        assert threads.in_thread(own, "TEST-1") is own
@@ -0,0 +1,73 @@
+import sys
+import typing
+from pathlib import Path
+
+import pytest
+
+
+class TestWebhookApp:
+    @pytest.fixture
+    def webhook(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import webhook
+
+        yield webhook
+
+        sys.path = original_path
+
+    def _wiki_event(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "id": 1,
+            "type": 5,
+            "created": "2017-07-19T12:00:42Z",
+            "createdUser": {"id": 1, "name": "John Doe", "roleType": 1},
+            "content": {"id": 100, "name": "test wiki", "content": "test"},
+        }
+
+    def test_handle(self, webhook) -> None:
+        app = webhook.WebhookApp()
+
+        @app.create_wiki
+        def create_wiki():
+            return (app.event.content.name, app.base_url)
+
+        assert app.handle(self._wiki_event(), "https://backlog.com") == (
+            "test wiki",
+            "https://backlog.com",
+        )
+
+    def test_handler_missing(self, webhook) -> None:
+        from exceptions import UnsupportedEventType
+
+        app = webhook.WebhookApp()
+
+        with pytest.raises(UnsupportedEventType):
+            app.handle(self._wiki_event())
+
+    def test_handler_failing_on_malformed_field(self, webhook) -> None:
+        from exceptions import InvalidPayload
+
+        app = webhook.WebhookApp()
+
+        @app.create_wiki
+        def create_wiki():
+            return app.event.content.name.split()
+
+        raw = self._wiki_event()
+        raw["content"]["name"] = 1
+
+        with pytest.raises(InvalidPayload, match="cannot be rendered"):
+            app.handle(raw)
+
+    def test_handler_bug_not_hidden(self, webhook) -> None:
+        app = webhook.WebhookApp()
+
+        @app.create_wiki
+        def create_wiki():
+            raise RuntimeError("bug")
+
+        with pytest.raises(RuntimeError):
+            app.handle(self._wiki_event())
@@ -1,5 +1,6 @@
 import json
 import os
+import typing
 
 import pytest
 from aws_cdk import assertions, core as cdk
@@ -49,3 +50,341 @@ class TestApp:
             ),
             "backlog_google_chat_stack.json",
         )
+
+    @pytest.mark.parametrize(
+        "name, options",
+        [
+            pytest.param("arm64", {"architecture": "arm64"}, id="arm64"),
+            pytest.param("memory_size", {"memory_size": 512}, id="memory_size"),
+            pytest.param(
+                "max_request_bytes",
+                {"max_request_bytes": 262_144},
+                id="max_request_bytes",
+            ),
+            pytest.param(
+                "provisioned_concurrency",
+                {
+                    "provisioned_concurrency": 1,
+                    "provisioned_concurrency_schedule": {
+                        "cron(0 0 ? * MON-FRI *)": 5,
+                        "cron(0 10 ? * MON-FRI *)": 1,
+                    },
+                },
+                id="provisioned_concurrency",
+            ),
+            pytest.param("snap_start", {"snap_start": True}, id="snap_start"),
+            pytest.param(
+                "http_api",
+                {
+                    "frontend": "http",
+                    "domain_name": "webhook.example.com",
+                    "certificate_arn": "arn:aws:acm:us-east-1:123456789012:certificate/xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx",  # noqa
+                    "hosted_zone_id": "xxxxxxxxxxxx",
+                    "zone_name": "example.com",
+                },
+                id="http_api",
+            ),
+            pytest.param(
+                "function_url",
+                {"frontend": "function_url", "provisioned_concurrency": 1},
+                id="function_url",
+            ),
+        ],
+    )
+    def test_backlog_google_chat_stack_options_snapshot(
+        self,
+        snapshot: Snapshot,
+        app: cdk.App,
+        env: cdk.Environment,
+        name: str,
+        options: typing.Dict[str, typing.Any],
+    ) -> None:
+        stack = BacklogGoogleChatStack(
+            app,
+            "BacklogGoogleChat",
+            backlog_base_url="https://backlog.com",
+            **options,
+        )
+
+        snapshot.assert_match(
+            json.dumps(
+                assertions.Template.from_stack(stack).to_json(),
+                indent=2,
+            ),
+            f"backlog_google_chat_stack_{name}.json",
+        )
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"architecture": "mips"},
+            {"snap_start": True, "provisioned_concurrency": 1},
+            {"provisioned_concurrency_schedule": {"cron(0 0 * * ? *)": 1}},
+            {"frontend": "grpc"},
+            {"frontend": "function_url", "domain_name": "webhook.example.com"},
+        ],
+    )
+    def test_backlog_google_chat_stack_invalid_options(
+        self, app: cdk.App, options: typing.Dict[str, typing.Any]
+    ) -> None:
+        with pytest.raises(ValueError):
+            BacklogGoogleChatStack(app, "BacklogGoogleChat", **options)
+
+    def test_backlog_google_chat_stack_tenants(
+        self, app: cdk.App, env: cdk.Environment
+    ) -> None:
+        stack = BacklogGoogleChatStack(
+            app,
+            "BacklogGoogleChat",
+            backlog_base_url="https://backlog.com",
+            tenant_ssm_prefix="/backlog-google-chat/tenants",
+        )
+
+        template = assertions.Template.from_stack(stack)
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {"TENANT_SSM_PREFIX": "/backlog-google-chat/tenants"}
+                    )
+                }
+            },
+        )
+        template.has_resource_properties(
+            "AWS::IAM::Policy",
+            {
+                "PolicyDocument": {
+                    "Statement": assertions.Match.array_with(
+                        [
+                            assertions.Match.object_like(
+                                {"Action": "ssm:GetParameter"}
+                            )
+                        ]
+                    )
+                }
+            },
+        )
+        template.has_resource_properties(
+            "AWS::ApiGateway::Resource", {"PathPart": "{tenant_id}"}
+        )
+
+    def test_backlog_google_chat_stack_retry_queue(
+        self, app: cdk.App, env: cdk.Environment
+    ) -> None:
+        stack = BacklogGoogleChatStack(
+            app,
+            "BacklogGoogleChat",
+            backlog_base_url="https://backlog.com",
+            retry_queue=True,
+        )
+
+        template = assertions.Template.from_stack(stack)
+        template.resource_count_is("AWS::SQS::Queue", 2)
+        template.has_resource_properties(
+            "AWS::SQS::Queue",
+            {"FifoQueue": True, "RedrivePolicy": {"maxReceiveCount": 5}},
+        )
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "index.lambda_handler",
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {
+                            "RETRY_QUEUE_URL": assertions.Match.not_(
+                                assertions.Match.absent_property()
+                            )
+                        }
+                    )
+                },
+            },
+        )
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {"Handler": "index.retry_handler", "Timeout": 30},
+        )
+        template.has_resource_properties(
+            "AWS::Lambda::EventSourceMapping",
+            {
+                "BatchSize": 10,
+                "FunctionResponseTypes": ["ReportBatchItemFailures"],
+            },
+        )
+
+    def test_backlog_google_chat_stack_circuit_breaker(
+        self, app: cdk.App, env: cdk.Environment
+    ) -> None:
+        stack = BacklogGoogleChatStack(
+            app,
+            "BacklogGoogleChat",
+            backlog_base_url="https://backlog.com",
+            retry_queue=True,
+            circuit_breaker_table_name="backlog-google-chat-breakers",
+        )
+
+        template = assertions.Template.from_stack(stack)
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {
+                            "CIRCUIT_BREAKER_TABLE_NAME": (
+                                "backlog-google-chat-breakers"
+                            )
+                        }
+                    )
+                }
+            },
+        )
+        policies = template.find_resources(
+            "AWS::IAM::Policy",
+            {
+                "Properties": {
+                    "PolicyDocument": {
+                        "Statement": assertions.Match.array_with(
+                            [
+                                assertions.Match.object_like(
+                                    {
+                                        "Action": [
+                                            "dynamodb:GetItem",
+                                            "dynamodb:PutItem",
+                                        ]
+                                    }
+                                )
+                            ]
+                        )
+                    }
+                }
+            },
+        )
+        assert len(policies) == 2
+
+    def test_backlog_google_chat_stack_digest(
+        self, app: cdk.App, env: cdk.Environment
+    ) -> None:
+        stack = BacklogGoogleChatStack(
+            app,
+            "BacklogGoogleChat",
+            backlog_base_url="https://backlog.com",
+            digest_table_name="backlog-google-chat-digests",
+            digest_schedule="cron(0 9 * * ? *)",
+        )
+
+        template = assertions.Template.from_stack(stack)
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "index.digest_handler",
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {"DIGEST_TABLE_NAME": "backlog-google-chat-digests"}
+                    )
+                },
+            },
+        )
+        template.has_resource_properties(
+            "AWS::Events::Rule",
+            {
+                "ScheduleExpression": "cron(0 9 * * ? *)",
+                "Targets": [
+                    assertions.Match.object_like({"Id": "DigestFunction"})
+                ],
+            },
+        )
+        template.has_resource_properties(
+            "AWS::Lambda::Permission",
+            {"Principal": "events.amazonaws.com"},
+        )
+        (key_id,) = [
+            resource_id
+            for resource_id, resource in template.to_json()["Resources"].items()
+            if resource["Type"] == "AWS::KMS::Key"
+        ]
+        template.has_resource_properties(
+            "AWS::KMS::Key",
+            {
+                "EnableKeyRotation": True,
+                "KeyPolicy": {
+                    "Statement": assertions.Match.array_with(
+                        [
+                            assertions.Match.object_like({"Action": actions})
+                            for actions in [
+                                [
+                                    "kms:Encrypt",
+                                    "kms:ReEncrypt*",
+                                    "kms:GenerateDataKey*",
+                                ],
+                                "kms:Decrypt",
+                            ]
+                        ]
+                    )
+                },
+            },
+        )
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Handler": "index.digest_handler",
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {"DIGEST_KEY_ID": {"Fn::GetAtt": [key_id, "Arn"]}}
+                    )
+                },
+            },
+        )
+        for actions in [
+            "dynamodb:PutItem",
+            ["dynamodb:Scan", "dynamodb:BatchWriteItem"],
+        ]:
+            template.has_resource_properties(
+                "AWS::IAM::Policy",
+                {
+                    "PolicyDocument": {
+                        "Statement": assertions.Match.array_with(
+                            [assertions.Match.object_like({"Action": actions})]
+                        )
+                    }
+                },
+            )
+
+    def test_backlog_google_chat_stack_webhook_secrets(
+        self, app: cdk.App, env: cdk.Environment
+    ) -> None:
+        stack = BacklogGoogleChatStack(
+            app,
+            "BacklogGoogleChat",
+            backlog_base_url="https://backlog.com",
+            webhook_secret_ssm_prefix="/backlog-google-chat/secrets",
+        )
+
+        template = assertions.Template.from_stack(stack)
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {
+                "Environment": {
+                    "Variables": assertions.Match.object_like(
+                        {
+                            "WEBHOOK_SECRET_SSM_PREFIX": (
+                                "/backlog-google-chat/secrets"
+                            )
+                        }
+                    )
+                }
+            },
+        )
+        template.has_resource_properties(
+            "AWS::IAM::Policy",
+            {
+                "PolicyDocument": {
+                    "Statement": assertions.Match.array_with(
+                        [
+                            assertions.Match.object_like(
+                                {"Action": "ssm:GetParametersByPath"}
+                            )
+                        ]
+                    )
+                }
+            },
+        )
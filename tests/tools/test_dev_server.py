@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+
+class TestDevServer:
+    @pytest.fixture
+    def dev_server(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        original_environ = dict(os.environ)
+        sys.path.append(str(root_dir / "tools"))
+        sys.modules.pop("index", None)
+        import dev_server
+
+        yield dev_server
+
+        sys.modules.pop("index", None)
+        sys.path = original_path
+        os.environ.clear()
+        os.environ.update(original_environ)
+
+    @pytest.fixture
+    def event(self):
+        from event_generator import EventGenerator
+
+        return next(EventGenerator(seed=1).stream(1))
+
+    @pytest.mark.parametrize("frontend", ["rest", "http", "function_url"])
+    def test_post_message(self, dev_server, event, frontend: str) -> None:
+        with dev_server.DevServer(port=0, frontend=frontend) as server:
+            response = requests.post(
+                f"{server.url}/v1/spaces/AAAA/messages",
+                params={"key": "k", "token": "t"},
+                json=event,
+            )
+            received = requests.get(
+                f"{server.url}{dev_server.STUB_MESSAGES_PATH}"
+            ).json()
+
+        assert response.status_code == 200
+        assert response.json() == {"message": "OK"}
+        assert len(server.stub.delivered) == 1
+        assert len(received) == 1
+        assert received[0]["path"] == "/v1/spaces/AAAA/messages"
+        assert received[0]["query"] == {"key": "k", "token": "t"}
+        assert received[0]["status"] == 200
+
+    def test_unknown_route(self, dev_server) -> None:
+        with dev_server.DevServer(port=0) as server:
+            response = requests.get(f"{server.url}/v1/unknown")
+
+        assert response.status_code == 404
+        assert server.stub.received == []
+
+    def test_injected_rate_limit(self, dev_server, event) -> None:
+        with dev_server.DevServer(port=0) as server:
+            server.stub.fail_next(429)
+            response = requests.post(
+                f"{server.url}/v1/spaces/AAAA/messages",
+                params={"key": "k", "token": "t"},
+                json=event,
+            )
+
+        assert response.status_code == 200
+        assert [m.status for m in server.stub.received] == [429]
+        assert server.stub.delivered == []
+
+    def test_circuit_breaker(self, dev_server, event) -> None:
+        environ = {
+            "CIRCUIT_FAILURE_THRESHOLD": "2",
+            "CIRCUIT_RECOVERY_TIMEOUT": "0.5",
+        }
+        with dev_server.DevServer(port=0, environ=environ) as server:
+
+            def post() -> int:
+                return requests.post(
+                    f"{server.url}/v1/spaces/AAAA/messages",
+                    params={"key": "k", "token": "t"},
+                    json=event,
+                ).status_code
+
+            server.stub.fail_next(503, times=3)
+            assert [post() for _ in range(4)] == [200] * 4
+            assert [m.status for m in server.stub.received] == [503, 503]
+
+            # the first probe fails and opens the breaker again
+            time.sleep(0.5)
+            post()
+            post()
+            assert len(server.stub.received) == 3
+
+            time.sleep(0.5)
+            post()
+            post()
+
+        assert [m.status for m in server.stub.received] == [
+            503,
+            503,
+            503,
+            200,
+            200,
+        ]
+
+
+class TestStubChat:
+    @pytest.fixture
+    def stub_chat(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "tools"))
+        import stub_chat
+
+        yield stub_chat
+
+        sys.path = original_path
+
+    def _post(self, url: str) -> requests.Response:
+        return requests.post(
+            f"{url}/v1/spaces/AAAA/messages",
+            params={"key": "k", "token": "t"},
+            json={"text": "hello"},
+        )
+
+    def test_fail_next(self, stub_chat) -> None:
+        with stub_chat.StubChatServer(
+            faults=stub_chat.StubFaults(retry_after=7)
+        ) as stub:
+            stub.fail_next(429)
+            stub.fail_next(503, times=2)
+            responses = [self._post(stub.url) for _ in range(4)]
+
+        assert [r.status_code for r in responses] == [429, 503, 503, 200]
+        assert responses[0].headers["Retry-After"] == "7"
+        assert responses[0].json()["error"]["status"] == "RESOURCE_EXHAUSTED"
+        assert "Retry-After" not in responses[1].headers
+        assert responses[3].json()["name"] == "spaces/AAAA/messages/stub-4"
+        assert len(stub.received) == 4
+        assert len(stub.delivered) == 1
+
+    def test_error_ratios(self, stub_chat) -> None:
+        faults = stub_chat.StubFaults(
+            rate_limit_ratio=0.3, server_error_ratio=0.2, seed=1
+        )
+        with stub_chat.StubChatServer(faults=faults) as stub:
+            statuses = [self._post(stub.url).status_code for _ in range(50)]
+
+        assert set(statuses) == {200, 429, 503}
+        assert statuses.count(200) == len(stub.delivered)
+
+    def test_latency(self, stub_chat) -> None:
+        faults = stub_chat.StubFaults(latency_ms=50)
+        with stub_chat.StubChatServer(faults=faults) as stub:
+            start = time.perf_counter()
+            self._post(stub.url)
+            elapsed = time.perf_counter() - start
+
+        assert elapsed >= 0.05
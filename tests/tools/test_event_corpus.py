@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestEventCorpus:
+    @pytest.fixture
+    def event_corpus(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "tools"))
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import event_corpus
+
+        yield event_corpus
+
+        sys.path = original_path
+
+    def test_cases(self, event_corpus) -> None:
+        from events import EventType
+
+        names = event_corpus.names()
+
+        assert list(names) == sorted(set(names))
+        for case in event_corpus.cases():
+            assert EventType(case.event["type"])
+            assert case.messages
+
+    def test_load_is_memoized(self, event_corpus) -> None:
+        assert event_corpus.load("delete_issue") is event_corpus.load(
+            "delete_issue"
+        )
@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestEventGenerator:
+    @pytest.fixture
+    def env(self):
+        os.environ["BACKLOG_BASE_URL"] = "https://backlog.com"
+
+    @pytest.fixture
+    def generator_module(self, env):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        sys.path.append(str(root_dir / "tools"))
+        sys.path.append(str(root_dir / "src" / "messages"))
+        import event_generator
+
+        yield event_generator
+
+        sys.path = original_path
+
+    def test_supported_events_parse(self, generator_module) -> None:
+        from exceptions import UnsupportedEventType
+        from models import WebhookEvent
+
+        generator = generator_module.EventGenerator(seed=1)
+        for event_type in generator_module.SUPPORTED_EVENT_TYPES:
+            raw = json.loads(json.dumps(generator.generate(event_type)))
+            assert WebhookEvent.from_raw(raw).type == event_type
+
+        for event_type in generator_module.UNSUPPORTED_EVENT_TYPES:
+            with pytest.raises(UnsupportedEventType):
+                WebhookEvent.from_raw(generator.generate(event_type))
+
+    def test_seed_is_reproducible(self, generator_module) -> None:
+        first = list(generator_module.EventGenerator(seed=42).stream(50))
+        second = list(generator_module.EventGenerator(seed=42).stream(50))
+        assert first == second
+
+    def test_size_knobs(self, generator_module) -> None:
+        EventType = generator_module.EventType
+        options = generator_module.GeneratorOptions(
+            description_length=1000,
+            changes=7,
+            revisions=5,
+            links=300,
+            shared_files=4,
+            japanese_ratio=1.0,
+        )
+        generator = generator_module.EventGenerator(seed=1, options=options)
+
+        create_issue = generator.generate(EventType.CREATE_ISSUE)["content"]
+        assert len(create_issue["description"]) == 1000
+        assert all(
+            not c.isascii() or c == "\n" for c in create_issue["description"]
+        )
+
+        update_issue = generator.generate(EventType.UPDATE_ISSUE)["content"]
+        assert len(update_issue["changes"]) == 7
+        assert len(update_issue["shared_files"]) == 4
+
+        push_git = generator.generate(EventType.PUSH_GIT)["content"]
+        assert len(push_git["revisions"]) == 5
+
+        bulk = generator.generate(EventType.BULK_UPDATE_ISSUE)["content"]
+        assert len(bulk["link"]) == 300
+
+    def test_main_writes_jsonl(self, generator_module, tmp_path) -> None:
+        output = tmp_path / "events.jsonl"
+        generator_module.main(
+            ["--count", "20", "--seed", "3", "--output", str(output)]
+        )
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 20
+        assert all(json.loads(line)["type"] for line in lines)
@@ -0,0 +1,64 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TestLoadTest:
+    @pytest.fixture
+    def load_test(self):
+        root_dir = Path(__file__).resolve().parents[2]
+
+        original_path = sys.path
+        original_environ = dict(os.environ)
+        sys.path.append(str(root_dir / "tools"))
+        sys.modules.pop("index", None)
+        import load_test
+
+        yield load_test
+
+        sys.modules.pop("index", None)
+        sys.path = original_path
+        os.environ.clear()
+        os.environ.update(original_environ)
+
+    @pytest.mark.parametrize("frontend", ["rest", "http", "function_url"])
+    def test_run_against_stub(self, load_test, frontend: str) -> None:
+        events = list(load_test.EventGenerator(seed=1).stream(30))
+
+        with load_test.StubChatServer() as stub:
+            report = load_test.run(
+                events,
+                workers=4,
+                environ={
+                    "BACKLOG_BASE_URL": "https://example.backlog.com",
+                    "GOOGLE_CHAT_API": stub.url,
+                    "POWERTOOLS_TRACE_DISABLED": "true",
+                    "API_FRONTEND": frontend,
+                },
+                event_wrapper=load_test.EVENT_WRAPPERS[frontend],
+            )
+
+        assert report["total"]["count"] == 30
+        assert report["total"]["errors"] == 0
+        assert len(stub.received) == 30
+        assert all(
+            m.query == {"key": "key", "token": "token"} for m in stub.received
+        )
+        assert all(
+            m.path == "/v1/spaces/AAAAload/messages" for m in stub.received
+        )
+        assert (
+            sum(row["count"] for row in report["by_event_type"].values()) == 30
+        )
+        for row in report["by_event_type"].values():
+            assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+        assert 1 <= len(report["peak_rss_kb_by_worker"]) <= 4
+        assert all(kb > 0 for kb in report["peak_rss_kb_by_worker"])
+
+    def test_percentile(self, load_test) -> None:
+        values = [float(v) for v in range(1, 101)]
+        assert load_test.percentile(values, 50) == 51.0
+        assert load_test.percentile(values, 99) == 99.0
+        assert load_test.percentile([], 99) == 0.0
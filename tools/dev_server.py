@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Local development server for the Lambda app.
+
+HTTP requests are turned into API Gateway (or function URL) events and
+passed to ``index.lambda_handler``. Google Chat is replaced by an embedded
+stub that records the received cards and can inject latency, 429s and
+5xx errors, so nothing leaves the host.
+
+    $ python tools/dev_server.py --port 3000
+    $ curl -X POST -d @event.json \\
+        'http://127.0.0.1:3000/v1/spaces/AAAA/messages?key=k&token=t'
+    $ curl http://127.0.0.1:3000/_stub/messages
+
+The cards received by the stub are listed at ``/_stub/messages``.
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import threading
+import typing
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib import parse
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src" / "messages"))
+sys.path.append(str(ROOT_DIR / "tools"))
+
+from load_test import FakeLambdaContext  # noqa: E402
+from stub_chat import StubChatServer, StubFaults  # noqa: E402
+
+STUB_MESSAGES_PATH = "/_stub/messages"
+
+
+def rest_api_event(
+    method: str,
+    path: str,
+    query: typing.Dict[str, str],
+    headers: typing.Dict[str, str],
+    body: str,
+) -> typing.Dict[str, typing.Any]:
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": headers,
+        "multiValueHeaders": {k: [v] for k, v in headers.items()},
+        "queryStringParameters": query or None,
+        "multiValueQueryStringParameters": (
+            {k: [v] for k, v in query.items()} or None
+        ),
+        "pathParameters": None,
+        "stageVariables": None,
+        "requestContext": {
+            "resourcePath": path,
+            "httpMethod": method,
+            "path": path,
+            "stage": "dev",
+            "requestId": "dev-server",
+        },
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+def http_api_event(
+    method: str,
+    path: str,
+    query: typing.Dict[str, str],
+    headers: typing.Dict[str, str],
+    body: str,
+) -> typing.Dict[str, typing.Any]:
+    """Version 2.0 payload, shared by HTTP APIs and function URLs."""
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": parse.urlencode(query),
+        "headers": {k.lower(): v for k, v in headers.items()},
+        "queryStringParameters": query or None,
+        "requestContext": {
+            "http": {
+                "method": method,
+                "path": path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "127.0.0.1",
+                "userAgent": headers.get("User-Agent", ""),
+            },
+            "requestId": "dev-server",
+            "routeKey": "$default",
+            "stage": "$default",
+        },
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+EVENT_BUILDERS: typing.Dict[str, typing.Callable[..., typing.Dict]] = {
+    "rest": rest_api_event,
+    "http": http_api_event,
+    "function_url": http_api_event,
+}
+
+
+class DevServer:
+    """Serves ``index.lambda_handler`` over HTTP, backed by a stub chat."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 3000,
+        frontend: str = "rest",
+        faults: typing.Optional[StubFaults] = None,
+        environ: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> None:
+        self.frontend = frontend
+        self.stub = StubChatServer(faults=faults)
+        os.environ.update(
+            {
+                "BACKLOG_BASE_URL": "https://example.backlog.com",
+                "POWERTOOLS_TRACE_DISABLED": "true",
+                **(environ or {}),
+                "GOOGLE_CHAT_API": self.stub.url,
+                "API_FRONTEND": frontend,
+            }
+        )
+        from index import lambda_handler
+
+        self._handler = lambda_handler
+        # a Lambda container serves one invocation at a time
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "DevServer":
+        self.stub.start()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self.stub.stop()
+
+    def __enter__(self) -> "DevServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def invoke(
+        self,
+        method: str,
+        path: str,
+        query: typing.Dict[str, str],
+        headers: typing.Dict[str, str],
+        body: str,
+    ) -> typing.Dict[str, typing.Any]:
+        event = EVENT_BUILDERS[self.frontend](
+            method, path, query, headers, body
+        )
+        with self._lock:
+            return self._handler(event, FakeLambdaContext())
+
+    def _handler_class(self) -> typing.Type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                if parse.urlsplit(self.path).path != STUB_MESSAGES_PATH:
+                    self._proxy()
+                    return
+                data = json.dumps(
+                    [asdict(message) for message in server.stub.received],
+                    ensure_ascii=False,
+                ).encode("utf-8")
+                self._send(200, {"Content-Type": "application/json"}, data)
+
+            def do_POST(self) -> None:
+                self._proxy()
+
+            def _proxy(self) -> None:
+                url = parse.urlsplit(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                response = server.invoke(
+                    method=self.command,
+                    path=url.path,
+                    query=dict(parse.parse_qsl(url.query)),
+                    headers=dict(self.headers.items()),
+                    body=body,
+                )
+                data = response.get("body") or ""
+                if response.get("isBase64Encoded"):
+                    data = base64.b64decode(data)
+                else:
+                    data = data.encode("utf-8")
+                self._send(
+                    response["statusCode"], response.get("headers") or {}, data
+                )
+
+            def _send(
+                self, status: int, headers: typing.Dict[str, str], data: bytes
+            ) -> None:
+                self.send_response(status)
+                for key, value in headers.items():
+                    if key.lower() != "content-length":
+                        self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument(
+        "--frontend", choices=list(EVENT_BUILDERS), default="rest"
+    )
+    parser.add_argument("--backlog-base-url")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--server-error-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    environ = {"LOG_LEVEL": os.environ.get("LOG_LEVEL", "INFO")}
+    if args.backlog_base_url:
+        environ["BACKLOG_BASE_URL"] = args.backlog_base_url
+    server = DevServer(
+        host=args.host,
+        port=args.port,
+        frontend=args.frontend,
+        faults=StubFaults(
+            latency_ms=args.latency_ms,
+            rate_limit_ratio=args.rate_limit_ratio,
+            server_error_ratio=args.server_error_ratio,
+            seed=args.seed,
+        ),
+        environ=environ,
+    )
+    with server:
+        print(f"serving on {server.url} (stub chat on {server.stub.url})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
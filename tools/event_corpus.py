@@ -0,0 +1,41 @@
+"""Backlog webhook events with the Google Chat messages they render to.
+
+Each case is a JSON file ``{"event": ..., "messages": [...]}`` under
+``tests/fixtures/events``, named after the case. Cases are read once per
+process and shared, so callers must not modify them.
+"""
+
+import functools
+import json
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+CORPUS_DIR = (
+    Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "events"
+)
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    event: typing.Dict[str, typing.Any]
+    messages: typing.List[typing.Dict[str, typing.Any]]
+
+
+@functools.lru_cache(maxsize=None)
+def names(corpus_dir: Path = CORPUS_DIR) -> typing.Tuple[str, ...]:
+    """Names of the cases, sorted so that every pytest-xdist worker
+    collects the same tests in the same order."""
+    return tuple(sorted(path.stem for path in corpus_dir.glob("*.json")))
+
+
+@functools.lru_cache(maxsize=None)
+def load(name: str, corpus_dir: Path = CORPUS_DIR) -> Case:
+    with open(corpus_dir / f"{name}.json", encoding="utf-8") as fp:
+        raw = json.load(fp)
+    return Case(name=name, event=raw["event"], messages=raw["messages"])
+
+
+def cases(corpus_dir: Path = CORPUS_DIR) -> typing.List[Case]:
+    return [load(name, corpus_dir) for name in names(corpus_dir)]
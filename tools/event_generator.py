@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""Synthetic Backlog webhook payload generator.
+
+Produces raw webhook payloads shaped like the ones Backlog sends, for load
+and soak testing without a Backlog space.
+
+    $ python tools/event_generator.py --count 1000 --seed 1 > events.jsonl
+    $ python tools/event_generator.py --count 100 \\
+        --target "http://localhost:3000/v1/spaces/xxxx/messages?key=k&token=t"
+"""
+
+import argparse
+import json
+import random
+import sys
+import typing
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "messages"))
+
+from events import EventType  # noqa: E402
+
+SUPPORTED_EVENT_TYPES = [
+    EventType.CREATE_ISSUE,
+    EventType.UPDATE_ISSUE,
+    EventType.ADD_COMMENT,
+    EventType.DELETE_ISSUE,
+    EventType.CREATE_WIKI,
+    EventType.UPDATE_WIKI,
+    EventType.DELETE_WIKI,
+    EventType.COMMIT_SUBVERSION,
+    EventType.PUSH_GIT,
+    EventType.CREATE_GIT,
+    EventType.BULK_UPDATE_ISSUE,
+    EventType.JOIN_PROJECT,
+    EventType.LEAVE_PROJECT,
+    EventType.CREATE_PULL_REQUEST,
+    EventType.UPDATE_PULL_REQUEST,
+    EventType.COMMENT_PULL_REQUEST,
+]
+UNSUPPORTED_EVENT_TYPES = [
+    event_type
+    for event_type in EventType
+    if event_type not in SUPPORTED_EVENT_TYPES
+]
+
+# relative frequency of event types in a typical space
+DEFAULT_WEIGHTS = {
+    EventType.CREATE_ISSUE: 10,
+    EventType.UPDATE_ISSUE: 30,
+    EventType.ADD_COMMENT: 25,
+    EventType.DELETE_ISSUE: 1,
+    EventType.CREATE_WIKI: 2,
+    EventType.UPDATE_WIKI: 4,
+    EventType.DELETE_WIKI: 1,
+    EventType.COMMIT_SUBVERSION: 1,
+    EventType.PUSH_GIT: 8,
+    EventType.CREATE_GIT: 1,
+    EventType.BULK_UPDATE_ISSUE: 2,
+    EventType.JOIN_PROJECT: 1,
+    EventType.LEAVE_PROJECT: 1,
+    EventType.CREATE_PULL_REQUEST: 3,
+    EventType.UPDATE_PULL_REQUEST: 4,
+    EventType.COMMENT_PULL_REQUEST: 5,
+}
+
+_JAPANESE_WORDS = [
+    "課題",
+    "対応",
+    "確認",
+    "修正",
+    "仕様",
+    "お願いします",
+    "リリース",
+    "不具合",
+    "画面",
+    "検討中",
+    "テスト",
+    "資料",
+    "打ち合わせ",
+    "ご確認ください",
+    "よろしくお願いいたします",
+]
+_ASCII_WORDS = [
+    "fix",
+    "update",
+    "the",
+    "api",
+    "login",
+    "page",
+    "release",
+    "test",
+    "error",
+    "when",
+    "user",
+    "deploy",
+    "config",
+    "timeout",
+    "review",
+]
+
+# fields picked for generated `changes` entries
+_ISSUE_CHANGE_FIELDS = [
+    "summary",
+    "description",
+    "status",
+    "priority",
+    "resolution",
+    "milestone",
+    "category",
+    "versions",
+    "assignee",
+    "dueDate",
+    "issueType",
+    "parentIssue",
+]
+_PULL_REQUEST_CHANGE_FIELDS = [
+    "description",
+    "assigner",
+    "issue",
+    "status",
+]
+
+
+@dataclass
+class GeneratorOptions:
+    description_length: int = 200
+    changes: int = 3
+    revisions: int = 3
+    links: int = 10
+    shared_files: int = 0
+    japanese_ratio: float = 0.7
+    unsupported_ratio: float = 0.0
+    weights: typing.Dict[EventType, int] = field(
+        default_factory=lambda: dict(DEFAULT_WEIGHTS)
+    )
+
+
+class EventGenerator:
+    def __init__(
+        self,
+        seed: typing.Optional[int] = None,
+        options: typing.Optional[GeneratorOptions] = None,
+        project_key: str = "TEST",
+    ) -> None:
+        self.random = random.Random(seed)
+        self.options = options or GeneratorOptions()
+        self.project_key = project_key
+        self._event_id = 0
+        self._created = datetime(2021, 10, 1, tzinfo=timezone.utc)
+
+    def stream(
+        self, count: int
+    ) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        for _ in range(count):
+            yield self.generate(self._choose_event_type())
+
+    def generate(self, event_type: EventType) -> typing.Dict[str, typing.Any]:
+        self._event_id += 1
+        self._created += timedelta(seconds=self.random.randint(1, 120))
+        return {
+            "id": self._event_id,
+            "type": event_type.value,
+            "created": self._created.strftime(r"%Y-%m-%dT%H:%M:%SZ"),
+            "project": self._project(),
+            "content": self._content(event_type),
+            "notifications": [],
+            "createdUser": self._created_user(),
+        }
+
+    def _choose_event_type(self) -> EventType:
+        if (
+            UNSUPPORTED_EVENT_TYPES
+            and self.random.random() < self.options.unsupported_ratio
+        ):
+            return self.random.choice(UNSUPPORTED_EVENT_TYPES)
+        weights = self.options.weights
+        return self.random.choices(
+            list(weights.keys()), weights=list(weights.values())
+        )[0]
+
+    def _text(self, length: int) -> str:
+        words = []
+        size = 0
+        while size < length:
+            if self.random.random() < self.options.japanese_ratio:
+                word = self.random.choice(_JAPANESE_WORDS)
+            else:
+                word = self.random.choice(_ASCII_WORDS) + " "
+            if self.random.random() < 0.05:
+                word += "\n"
+            words.append(word)
+            size += len(word)
+        return "".join(words)[:length]
+
+    def _short_text(self) -> str:
+        return self._text(self.random.randint(8, 40)).strip() or "summary"
+
+    def _date(self) -> str:
+        day = date(2021, 1, 1) + timedelta(days=self.random.randint(0, 730))
+        return day.isoformat()
+
+    def _optional_date(self) -> str:
+        return self._date() if self.random.random() < 0.5 else "null"
+
+    def _id(self) -> int:
+        return self.random.randint(1, 10_000_000)
+
+    def _project(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "archived": False,
+            "projectKey": self.project_key,
+            "name": f"{self.project_key} プロジェクト",
+            "chartEnabled": False,
+            "id": 100,
+            "subtaskingEnabled": False,
+        }
+
+    def _user(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "id": self._id(),
+            "name": self._short_text(),
+            "nulabAccount": {
+                "nulabId": "".join(
+                    self.random.choices(
+                        "abcdefghijklmnopqrstuvwxyz0123456789", k=50
+                    )
+                ),
+                "name": self._short_text(),
+                "uniqueId": f"user{self._id()}",
+            },
+        }
+
+    def _created_user(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "nulabAccount": None,
+            "name": self._short_text(),
+            "mailAddress": None,
+            "id": self._id(),
+            "roleType": 1,
+            "userId": None,
+        }
+
+    def _assignee(self) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        if self.random.random() < 0.3:
+            return None
+        return {
+            "name": self._short_text(),
+            "id": self._id(),
+            "roleType": 1,
+            "lang": "ja",
+            "userId": f"user{self._id()}",
+        }
+
+    def _milestone(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "archived": "false",
+            "releaseDueDate": self._optional_date(),
+            "name": self._short_text(),
+            "displayOrder": None,
+            "description": self._text(40),
+            "id": self._id(),
+            "projectId": 100,
+            "startDate": self._optional_date(),
+        }
+
+    def _comment(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "id": self._id(),
+            "content": self._text(self.options.description_length),
+        }
+
+    def _change(self, field_name: str) -> typing.Dict[str, typing.Any]:
+        if field_name in ["status", "priority", "resolution"]:
+            choices = {
+                "status": ["1", "2", "3", "4"],
+                "priority": ["2", "3", "4"],
+                "resolution": ["0", "1", "2", "3", "4"],
+            }[field_name]
+            old_value, new_value = self.random.sample(choices, 2)
+        elif field_name == "dueDate":
+            old_value, new_value = self._date(), self._date()
+        elif field_name == "description":
+            old_value = self._text(self.options.description_length)
+            new_value = old_value + "\n" + self._text(40)
+        else:
+            old_value, new_value = self._short_text(), self._short_text()
+        return {
+            "field": field_name,
+            "old_value": old_value,
+            "new_value": new_value,
+            "type": "standard",
+        }
+
+    def _issue_changes(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        return [
+            self._change(self.random.choice(_ISSUE_CHANGE_FIELDS))
+            for _ in range(self.options.changes)
+        ]
+
+    def _pull_request_changes(
+        self,
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        changes = []
+        for _ in range(self.options.changes):
+            field_name = self.random.choice(_PULL_REQUEST_CHANGE_FIELDS)
+            change = self._change(field_name)
+            if field_name == "status":
+                change["old_value"], change["new_value"] = self.random.sample(
+                    ["1", "2", "3"], 2
+                )
+            changes.append(change)
+        return changes
+
+    def _shared_files(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        return [
+            {
+                "id": self._id(),
+                "name": f"file{i}.png",
+                "size": self.random.randint(1, 10_000_000),
+                "dir": "/資料",
+            }
+            for i in range(self.options.shared_files)
+        ]
+
+    def _repository(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "id": self._id(),
+            "name": self.random.choice(["app", "api", "infra", "web"]),
+            "description": self._text(60),
+        }
+
+    def _pull_request(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "id": self._id(),
+            "number": self.random.randint(1, 1000),
+            "summary": self._short_text(),
+            "description": self._text(self.options.description_length),
+            "repository": self._repository(),
+            "base": "main",
+            "branch": f"feature/{self.random.randint(1, 1000)}",
+            "comment": None,
+            "diff": None,
+            "issue": None,
+            "assignee": self._assignee(),
+            "changes": [],
+        }
+
+    def _content(self, event_type: EventType) -> typing.Dict[str, typing.Any]:
+        key_id = self.random.randint(1, 10000)
+        if event_type == EventType.CREATE_ISSUE:
+            return {
+                "id": self._id(),
+                "key_id": key_id,
+                "summary": self._short_text(),
+                "description": self._text(self.options.description_length),
+                "customFields": [],
+                "issueType": {
+                    "color": "#7ea800",
+                    "name": self.random.choice(["バグ", "タスク", "要望"]),
+                    "displayOrder": 0,
+                    "id": self._id(),
+                    "projectId": 100,
+                },
+                "status": {"id": 1, "name": "未対応"},
+                "priority": {"id": self.random.choice([2, 3, 4]), "name": ""},
+                "resolution": {"id": None, "name": ""},
+                "parentIssueId": None,
+                "startDate": self._date(),
+                "dueDate": self._date(),
+                "estimatedHours": None,
+                "actualHours": None,
+                "category": [{"id": self._id(), "name": self._short_text()}],
+                "milestone": [self._milestone()],
+                "versions": [self._milestone()],
+                "assignee": self._assignee(),
+            }
+        if event_type == EventType.UPDATE_ISSUE:
+            return {
+                "id": self._id(),
+                "key_id": key_id,
+                "summary": self._short_text(),
+                "description": self._text(self.options.description_length),
+                "comment": (
+                    self._comment() if self.random.random() < 0.5 else None
+                ),
+                "changes": self._issue_changes(),
+                "shared_files": self._shared_files(),
+            }
+        if event_type == EventType.ADD_COMMENT:
+            return {
+                "id": self._id(),
+                "key_id": key_id,
+                "summary": self._short_text(),
+                "description": self._text(self.options.description_length),
+                "comment": self._comment(),
+            }
+        if event_type == EventType.DELETE_ISSUE:
+            return {"id": self._id(), "key_id": key_id}
+        if event_type in [
+            EventType.CREATE_WIKI,
+            EventType.DELETE_WIKI,
+        ]:
+            return {
+                "id": self._id(),
+                "name": self._short_text(),
+                "content": self._text(self.options.description_length),
+            }
+        if event_type == EventType.UPDATE_WIKI:
+            return {
+                "id": self._id(),
+                "name": self._short_text(),
+                "content": self._text(self.options.description_length),
+                "diff": self._text(self.options.description_length),
+                "version": self.random.randint(2, 100),
+            }
+        if event_type == EventType.COMMIT_SUBVERSION:
+            return {
+                "rev": self.random.randint(1, 100000),
+                "comment": self._text(80),
+            }
+        if event_type == EventType.PUSH_GIT:
+            return {
+                "repository": self._repository(),
+                "ref": f"refs/heads/feature/{self.random.randint(1, 1000)}",
+                "change_type": "update",
+                "revision_count": self.options.revisions,
+                "revision_type": "commit",
+                "revisions": [
+                    {
+                        "rev": "%040x" % self.random.getrandbits(160),
+                        "comment": self._text(80),
+                    }
+                    for _ in range(self.options.revisions)
+                ],
+            }
+        if event_type == EventType.CREATE_GIT:
+            return {"repository": self._repository()}
+        if event_type == EventType.BULK_UPDATE_ISSUE:
+            return {
+                "tx_id": str(self._id()),
+                "link": [
+                    {
+                        "id": str(key_id + i),
+                        "key_id": str(key_id + i),
+                        "title": self._short_text(),
+                    }
+                    for i in range(self.options.links)
+                ],
+                "changes": self._issue_changes(),
+            }
+        if event_type == EventType.JOIN_PROJECT:
+            return {
+                "comment": self._text(40),
+                "users": [
+                    self._user() for _ in range(self.random.randint(1, 3))
+                ],
+            }
+        if event_type == EventType.LEAVE_PROJECT:
+            return {
+                "users": [
+                    self._user() for _ in range(self.random.randint(1, 3))
+                ],
+            }
+        if event_type == EventType.CREATE_PULL_REQUEST:
+            content = self._pull_request()
+            content["issue"] = {
+                "id": self._id(),
+                "key_id": key_id,
+                "summary": self._short_text(),
+                "description": self._text(80),
+            }
+            return content
+        if event_type == EventType.UPDATE_PULL_REQUEST:
+            content = self._pull_request()
+            content["diff"] = self._text(self.options.description_length)
+            content["changes"] = self._pull_request_changes()
+            return content
+        if event_type == EventType.COMMENT_PULL_REQUEST:
+            content = self._pull_request()
+            content["comment"] = self._comment()
+            return content
+        # unsupported event types only need a plausible content shape
+        return {
+            "id": self._id(),
+            "key_id": key_id,
+            "summary": self._short_text(),
+            "description": self._text(self.options.description_length),
+        }
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--project-key", default="TEST")
+    parser.add_argument("--description-length", type=int, default=200)
+    parser.add_argument("--changes", type=int, default=3)
+    parser.add_argument("--revisions", type=int, default=3)
+    parser.add_argument("--links", type=int, default=10)
+    parser.add_argument("--shared-files", type=int, default=0)
+    parser.add_argument("--japanese-ratio", type=float, default=0.7)
+    parser.add_argument("--unsupported-ratio", type=float, default=0.0)
+    parser.add_argument(
+        "--type",
+        dest="event_types",
+        action="append",
+        choices=[event_type.name for event_type in EventType],
+        help="restrict generation to the given event type (repeatable)",
+    )
+    parser.add_argument(
+        "--output",
+        type=argparse.FileType("w", encoding="utf-8"),
+        default=sys.stdout,
+        help="JSONL output file (default: stdout)",
+    )
+    parser.add_argument(
+        "--target",
+        help="POST each payload to this URL instead of writing JSONL",
+    )
+    args = parser.parse_args(argv)
+
+    options = GeneratorOptions(
+        description_length=args.description_length,
+        changes=args.changes,
+        revisions=args.revisions,
+        links=args.links,
+        shared_files=args.shared_files,
+        japanese_ratio=args.japanese_ratio,
+        unsupported_ratio=args.unsupported_ratio,
+    )
+    if args.event_types:
+        options.weights = {EventType[name]: 1 for name in args.event_types}
+    generator = EventGenerator(
+        seed=args.seed,
+        options=options,
+        project_key=args.project_key,
+    )
+
+    if args.target:
+        import requests
+
+        with requests.Session() as session:
+            for event in generator.stream(args.count):
+                response = session.post(url=args.target, json=event)
+                print(
+                    EventType(event["type"]).name,
+                    response.status_code,
+                    file=sys.stderr,
+                )
+        return
+
+    for event in generator.stream(args.count):
+        args.output.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
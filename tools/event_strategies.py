@@ -0,0 +1,86 @@
+"""Hypothesis strategies for Backlog webhook payloads.
+
+``events()`` draws well-formed events of every type with a content class,
+built by the event generator. ``near_valid_events()`` breaks one field of
+such an event: the field is removed, emptied, or replaced with a value of
+another type.
+"""
+
+import copy
+import typing
+
+from event_generator import EventGenerator, GeneratorOptions
+from events import EventType
+from hypothesis import strategies as st
+from models import CONTENT_CLASSES
+
+Path = typing.Tuple[typing.Union[str, int], ...]
+
+SUPPORTED_EVENT_TYPES = [
+    event_type for event_type in EventType if event_type in CONTENT_CLASSES
+]
+
+junk = st.one_of(
+    st.none(),
+    st.booleans(),
+    st.integers(min_value=-(2**63), max_value=2**63),
+    st.floats(allow_nan=False),
+    st.text(max_size=8),
+    st.sampled_from(["", "null", "0", "true", "2021-13-45", "2021-02-30"]),
+    st.lists(st.integers(), max_size=2),
+    st.dictionaries(st.text(max_size=4), st.integers(), max_size=2),
+)
+
+
+@st.composite
+def events(
+    draw: typing.Callable[..., typing.Any],
+    event_types: typing.Sequence[EventType] = tuple(SUPPORTED_EVENT_TYPES),
+) -> typing.Dict[str, typing.Any]:
+    generator = EventGenerator(
+        seed=draw(st.integers(min_value=0, max_value=2**32 - 1)),
+        options=GeneratorOptions(
+            description_length=draw(st.integers(0, 200)),
+            changes=draw(st.integers(0, 4)),
+            revisions=draw(st.integers(0, 3)),
+            links=draw(st.integers(0, 3)),
+            shared_files=draw(st.integers(0, 2)),
+        ),
+    )
+    return generator.generate(draw(st.sampled_from(list(event_types))))
+
+
+def paths(raw: typing.Any, prefix: Path = ()) -> typing.Iterator[Path]:
+    """Paths of every value nested in ``raw``."""
+    if isinstance(raw, dict):
+        items: typing.Iterable[typing.Tuple[typing.Any, typing.Any]] = (
+            raw.items()
+        )
+    elif isinstance(raw, list):
+        items = enumerate(raw)
+    else:
+        return
+    for key, value in items:
+        yield prefix + (key,)
+        yield from paths(value, prefix + (key,))
+
+
+def _parent(raw: typing.Any, path: Path) -> typing.Any:
+    for key in path[:-1]:
+        raw = raw[key]
+    return raw
+
+
+@st.composite
+def near_valid_events(
+    draw: typing.Callable[..., typing.Any],
+    event_types: typing.Sequence[EventType] = tuple(SUPPORTED_EVENT_TYPES),
+) -> typing.Dict[str, typing.Any]:
+    raw = copy.deepcopy(draw(events(event_types)))
+    path = draw(st.sampled_from(list(paths(raw))))
+    parent = _parent(raw, path)
+    if isinstance(parent, dict) and draw(st.booleans()):
+        del parent[path[-1]]
+    else:
+        parent[path[-1]] = draw(junk)
+    return raw
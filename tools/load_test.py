@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""Local load test driving lambda_handler with API Gateway events.
+
+``--frontend`` picks the REST API, HTTP API or function URL payload.
+
+Google Chat is replaced by an in-process stub, so nothing leaves the host.
+
+Each worker is a process with its own copy of the function, like a
+Lambda execution environment: the function keeps per-request state in
+module globals, so it cannot be shared between threads.
+
+    $ python tools/load_test.py --count 2000 --rps 200 --workers 16
+    $ python tools/load_test.py --events events.jsonl
+    $ python tools/load_test.py --frontend function_url
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import typing
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src" / "messages"))
+sys.path.append(str(ROOT_DIR / "tools"))
+
+from event_generator import EventGenerator  # noqa: E402
+from events import EventType  # noqa: E402
+from stub_chat import StubChatServer  # noqa: E402
+
+
+@dataclass
+class FakeLambdaContext:
+    function_name: str = "load-test"
+    memory_limit_in_mb: int = 128
+    invoked_function_arn: str = (
+        "arn:aws:lambda:ap-northeast-1:123456789012:function:load-test"
+    )
+    aws_request_id: str = "00000000-0000-0000-0000-000000000000"
+    timeout_ms: int = 30_000
+    _started: float = field(default_factory=time.monotonic)
+
+    def get_remaining_time_in_millis(self) -> int:
+        elapsed_ms = int((time.monotonic() - self._started) * 1000)
+        return max(self.timeout_ms - elapsed_ms, 0)
+
+
+def api_gateway_event(
+    backlog_event: typing.Dict[str, typing.Any],
+    space_id: str = "AAAAload",
+    webhook_key: str = "key",
+    webhook_token: str = "token",
+) -> typing.Dict[str, typing.Any]:
+    path = f"/v1/spaces/{space_id}/messages"
+    return {
+        "resource": "/v1/spaces/{space_id}/messages",
+        "path": path,
+        "httpMethod": "POST",
+        "headers": {"Content-Type": "application/json"},
+        "multiValueHeaders": {"Content-Type": ["application/json"]},
+        "queryStringParameters": {
+            "key": webhook_key,
+            "token": webhook_token,
+        },
+        "multiValueQueryStringParameters": {
+            "key": [webhook_key],
+            "token": [webhook_token],
+        },
+        "pathParameters": {"space_id": space_id},
+        "stageVariables": None,
+        "requestContext": {
+            "resourcePath": "/v1/spaces/{space_id}/messages",
+            "httpMethod": "POST",
+            "path": path,
+            "stage": "load",
+            "requestId": "load-test",
+        },
+        "body": json.dumps(backlog_event, ensure_ascii=False),
+        "isBase64Encoded": False,
+    }
+
+
+def http_api_event(
+    backlog_event: typing.Dict[str, typing.Any],
+    space_id: str = "AAAAload",
+    webhook_key: str = "key",
+    webhook_token: str = "token",
+    route_key: str = "POST /v1/spaces/{space_id}/messages",
+    domain_name: str = "load.execute-api.ap-northeast-1.amazonaws.com",
+) -> typing.Dict[str, typing.Any]:
+    """Version 2.0 payload, as sent by HTTP APIs and function URLs."""
+    path = f"/v1/spaces/{space_id}/messages"
+    return {
+        "version": "2.0",
+        "routeKey": route_key,
+        "rawPath": path,
+        "rawQueryString": f"key={webhook_key}&token={webhook_token}",
+        "headers": {"content-type": "application/json"},
+        "queryStringParameters": {
+            "key": webhook_key,
+            "token": webhook_token,
+        },
+        "pathParameters": (
+            {"space_id": space_id} if route_key != "$default" else None
+        ),
+        "requestContext": {
+            "domainName": domain_name,
+            "http": {
+                "method": "POST",
+                "path": path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "127.0.0.1",
+                "userAgent": "load-test",
+            },
+            "requestId": "load-test",
+            "routeKey": route_key,
+            "stage": "$default",
+        },
+        "body": json.dumps(backlog_event, ensure_ascii=False),
+        "isBase64Encoded": False,
+    }
+
+
+def function_url_event(
+    backlog_event: typing.Dict[str, typing.Any],
+    space_id: str = "AAAAload",
+    webhook_key: str = "key",
+    webhook_token: str = "token",
+) -> typing.Dict[str, typing.Any]:
+    return http_api_event(
+        backlog_event,
+        space_id=space_id,
+        webhook_key=webhook_key,
+        webhook_token=webhook_token,
+        route_key="$default",
+        domain_name="load.lambda-url.ap-northeast-1.on.aws",
+    )
+
+
+EVENT_WRAPPERS: typing.Dict[
+    str, typing.Callable[..., typing.Dict[str, typing.Any]]
+] = {
+    "rest": api_gateway_event,
+    "http": http_api_event,
+    "function_url": function_url_event,
+}
+
+
+@dataclass
+class Sample:
+    event_type: str
+    latency_ms: float
+    status_code: int
+    worker: int
+    max_rss_kb: int
+
+
+_handler: typing.Optional[typing.Callable] = None
+
+
+def _init_worker(environ: typing.Dict[str, str], quiet: bool = False) -> None:
+    global _handler
+    os.environ.update(environ)
+    if quiet:
+        # drop the EMF records the function prints for each invocation
+        sys.stdout = open(os.devnull, "w")
+    from index import lambda_handler
+
+    _handler = lambda_handler
+
+
+def _invoke(event_type: str, event: typing.Dict[str, typing.Any]) -> Sample:
+    assert _handler is not None
+    start = time.perf_counter()
+    try:
+        response = _handler(event, FakeLambdaContext())
+        status_code = response["statusCode"]
+    except Exception:
+        status_code = 0
+    latency_ms = (time.perf_counter() - start) * 1000
+    return Sample(
+        event_type=event_type,
+        latency_ms=latency_ms,
+        status_code=status_code,
+        worker=os.getpid(),
+        # peak of the whole worker process so far
+        max_rss_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    )
+
+
+def percentile(values: typing.List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(
+    samples: typing.List[Sample], elapsed: float
+) -> typing.Dict[str, typing.Any]:
+    by_type: typing.Dict[str, typing.List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_type[sample.event_type].append(sample)
+
+    def stats(group: typing.List[Sample]) -> typing.Dict[str, typing.Any]:
+        latencies = [s.latency_ms for s in group]
+        return {
+            "count": len(group),
+            "errors": sum(1 for s in group if s.status_code != 200),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+        }
+
+    peak_rss_kb: typing.Dict[int, int] = {}
+    for sample in samples:
+        peak_rss_kb[sample.worker] = max(
+            peak_rss_kb.get(sample.worker, 0), sample.max_rss_kb
+        )
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0,
+        "total": stats(samples) if samples else {},
+        "by_event_type": {
+            name: stats(group) for name, group in sorted(by_type.items())
+        },
+        "peak_rss_kb_by_worker": [
+            peak_rss_kb[worker] for worker in sorted(peak_rss_kb)
+        ],
+    }
+
+
+def print_report(report: typing.Dict[str, typing.Any]) -> None:
+    header = f"{'event type':<24}{'count':>7}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}"  # noqa
+    print(header)
+    print("-" * len(header))
+    rows = list(report["by_event_type"].items()) + [("TOTAL", report["total"])]
+    for name, row in rows:
+        print(
+            f"{name:<24}{row['count']:>7}{row['errors']:>5}"
+            f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+        )
+    rss = ", ".join(str(kb) for kb in report["peak_rss_kb_by_worker"])
+    print(f"\npeak RSS of each worker (KB): {rss}")
+    print(
+        f"{report['total']['count']} events in {report['elapsed_s']}s "
+        f"({report['throughput_rps']} events/s)"
+    )
+
+
+def run(
+    events: typing.Iterable[typing.Dict[str, typing.Any]],
+    rps: float = 0,
+    workers: int = 8,
+    environ: typing.Optional[typing.Dict[str, str]] = None,
+    event_wrapper: typing.Callable[..., typing.Dict[str, typing.Any]] = (
+        api_gateway_event
+    ),
+    quiet: bool = False,
+) -> typing.Dict[str, typing.Any]:
+    """Replay events through lambda_handler and return the latency report.
+
+    ``rps`` of 0 sends as fast as the workers allow. ``quiet`` discards what
+    the function prints, such as its metrics.
+    """
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(environ or {}, quiet),
+    )
+
+    futures: typing.List[Future] = []
+    interval = 1 / rps if rps else 0
+    start = time.perf_counter()
+    with executor:
+        for i, backlog_event in enumerate(events):
+            if interval:
+                delay = start + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(
+                executor.submit(
+                    _invoke,
+                    EventType(backlog_event["type"]).name,
+                    event_wrapper(backlog_event),
+                )
+            )
+        samples = [future.result() for future in futures]
+    return summarize(samples, time.perf_counter() - start)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", help="JSONL file from event_generator.py")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rps", type=float, default=0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--frontend", choices=list(EVENT_WRAPPERS), default="rest"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the report as JSON"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="keep the output of the function, such as its metrics",
+    )
+    args = parser.parse_args(argv)
+
+    if args.events:
+        with open(args.events, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    else:
+        events = list(EventGenerator(seed=args.seed).stream(args.count))
+
+    with StubChatServer() as stub:
+        environ = {
+            "BACKLOG_BASE_URL": "https://example.backlog.com",
+            "GOOGLE_CHAT_API": stub.url,
+            "LOG_LEVEL": "WARNING",
+            "POWERTOOLS_TRACE_DISABLED": "true",
+            "API_FRONTEND": args.frontend,
+        }
+        report = run(
+            events,
+            rps=args.rps,
+            workers=args.workers,
+            environ=environ,
+            event_wrapper=EVENT_WRAPPERS[args.frontend],
+            quiet=not args.verbose,
+        )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
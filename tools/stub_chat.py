@@ -0,0 +1,209 @@
+"""In-process stand-in for the Google Chat incoming webhook API."""
+
+import collections
+import json
+import random
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+
+_ERROR_STATUSES = {
+    404: "NOT_FOUND",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    502: "UNAVAILABLE",
+    503: "UNAVAILABLE",
+    504: "DEADLINE_EXCEEDED",
+}
+
+
+@dataclass
+class ReceivedMessage:
+    method: str
+    path: str
+    query: typing.Dict[str, str]
+    body: typing.Dict[str, typing.Any]
+    status: int = 200
+
+
+@dataclass
+class StubFaults:
+    """Faults injected into every response of the stub.
+
+    ``rate_limit_ratio`` and ``server_error_ratio`` are the share of
+    requests answered with 429 and 503. ``latency_ms`` is added before
+    each response.
+    """
+
+    latency_ms: float = 0.0
+    rate_limit_ratio: float = 0.0
+    server_error_ratio: float = 0.0
+    retry_after: int = 1
+    seed: typing.Optional[int] = None
+
+
+class StubChatServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: typing.Optional[StubFaults] = None,
+    ) -> None:
+        self.received: typing.List[ReceivedMessage] = []
+        # current content of the posted messages by name
+        self.messages: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        self.faults = faults or StubFaults()
+        self._random = random.Random(self.faults.seed)
+        self._scripted: typing.Deque[int] = collections.deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def delivered(self) -> typing.List[ReceivedMessage]:
+        return [message for message in self.received if message.status == 200]
+
+    def start(self) -> "StubChatServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubChatServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def fail_next(self, status: int, times: int = 1) -> None:
+        """Answer the next ``times`` messages with ``status``."""
+        with self._lock:
+            self._scripted.extend([status] * times)
+
+    def next_status(self) -> int:
+        with self._lock:
+            if self._scripted:
+                return self._scripted.popleft()
+            roll = self._random.random()
+        if roll < self.faults.rate_limit_ratio:
+            return 429
+        if roll < self.faults.rate_limit_ratio + self.faults.server_error_ratio:
+            return 503
+        return 200
+
+    def record(self, message: ReceivedMessage) -> int:
+        with self._lock:
+            self.received.append(message)
+            return len(self.received)
+
+    def _handler_class(self) -> typing.Type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                message, number = self._receive()
+                if message.status != 200:
+                    self._send_error(message.status)
+                    return
+                space = message.path.rsplit("/messages", 1)[0][len("/v1/") :]
+                name = f"{space}/messages/stub-{number}"
+                with stub._lock:
+                    stub.messages[name] = message.body
+                self._send_json(200, {**message.body, "name": name})
+
+            def do_PATCH(self) -> None:
+                message, _ = self._receive()
+                if message.status != 200:
+                    self._send_error(message.status)
+                    return
+                name = message.path[len("/v1/") :]
+                with stub._lock:
+                    current = stub.messages.get(name)
+                    if current is None:
+                        message.status = 404
+                    else:
+                        mask = message.query.get("updateMask", "")
+                        current = stub.messages[name] = {
+                            **current,
+                            **{
+                                field: message.body[field]
+                                for field in mask.split(",")
+                                if field in message.body
+                            },
+                        }
+                if current is None:
+                    self._send_error(message.status)
+                    return
+                self._send_json(200, {**current, "name": name})
+
+            def _receive(self) -> typing.Tuple[ReceivedMessage, int]:
+                url = parse.urlsplit(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if stub.faults.latency_ms:
+                    time.sleep(stub.faults.latency_ms / 1000)
+                message = ReceivedMessage(
+                    method=self.command,
+                    path=url.path,
+                    query=dict(parse.parse_qsl(url.query)),
+                    body=body,
+                    status=stub.next_status(),
+                )
+                return message, stub.record(message)
+
+            def do_HEAD(self) -> None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _send_error(self, status: int) -> None:
+                headers = {}
+                if status == 429:
+                    headers["Retry-After"] = str(stub.faults.retry_after)
+                self._send_json(
+                    status,
+                    {
+                        "error": {
+                            "code": status,
+                            "message": "injected by the stub",
+                            "status": _ERROR_STATUSES.get(status, "UNKNOWN"),
+                        }
+                    },
+                    headers,
+                )
+
+            def _send_json(
+                self,
+                status: int,
+                payload: typing.Dict[str, typing.Any],
+                headers: typing.Optional[typing.Dict[str, str]] = None,
+            ) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: typing.Any) -> None:
+                pass
+
+        return Handler